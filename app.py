@@ -1,14 +1,31 @@
 import threading
 import time
-import schedule
-from flask import Flask, render_template, jsonify
-from gold_agent import GoldAgent
+from flask import Flask, render_template, request, Response
+from dotenv import load_dotenv
+from metrics import metrics, TickProfiler
+from shared_state import LeaderLock, SharedRegion
+from market_calendar import MarketCalendar, parse_holidays
 import datetime
 import os
-import yfinance as yf
+import gzip
+import hashlib
+import struct
+from collections import namedtuple
+
+# Settings below are read from the environment, so .env has to be loaded first
+load_dotenv()
 
 app = Flask(__name__)
 
+def analysis():
+    """The analysis stack (gold_agent with pandas, numpy, yfinance, ...), imported on first use.
+
+    Only the process that computes pays for these imports; workers that just
+    serve the leader's snapshots start with Flask and the standard library.
+    """
+    import gold_agent
+    return gold_agent
+
 # Global storage for latest data to serve via API
 latest_data = {
     "price": None,
@@ -17,6 +34,96 @@ latest_data = {
     "trend": None
 }
 
+# Immutable, pre-serialized copy of latest_data that /api/latest serves as-is.
+# The SSE events (full state, and changes since the previous version) are encoded once here too.
+Snapshot = namedtuple("Snapshot", ["version", "etag", "body", "gzip_body", "data", "full_event", "delta_event"])
+
+def to_json(data):
+    return json.dumps(data, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+
+def sse_event(event, version, payload):
+    return f"id: {version}\nevent: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+def make_snapshot(data, version, previous=None):
+    body = to_json(data).encode("utf-8")
+    etag = f"{version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"
+    delta_event = None
+    if previous is not None:
+        changed = {k: v for k, v in data.items() if k not in previous.data or previous.data[k] != v}
+        delta = {"version": version, "base": previous.version, "changed": changed}
+        delta_event = sse_event("delta", version, to_json(delta))
+    return Snapshot(version, etag, body, gzip.compress(body, compresslevel=6), data,
+                    sse_event("snapshot", version, body.decode("utf-8")), delta_event)
+
+current_snapshot = None
+snapshot_version = 0
+
+# Notified on every publish so streaming clients wake up only when there is something new
+snapshot_changed = threading.Condition()
+
+# Held while a job runs so that cold-start requests wait on it instead of starting their own
+job_lock = threading.Lock()
+
+# With several processes (gunicorn workers) only the holder of the leader lock runs the
+# scheduler; it mirrors every snapshot into a memory-mapped file the other workers serve from
+SHARED_STATE_DIR = os.getenv("SHARED_STATE_DIR", "shared_state")
+leader_lock = LeaderLock(os.path.join(SHARED_STATE_DIR, "leader.lock"))
+shared_snapshot = SharedRegion(os.path.join(SHARED_STATE_DIR, "snapshot.mmap"))
+shared_metrics = SharedRegion(os.path.join(SHARED_STATE_DIR, "metrics.mmap"), capacity=1 << 16)
+
+# None until start_background() runs (and for good without it, e.g. under flask run, where requests compute
+# the snapshot themselves); "follower" from then until this process wins the leader lock, then "leader"
+role = None
+
+# Seconds between follower checks for a new snapshot, and between attempts to take over as leader
+FOLLOW_INTERVAL = 0.5
+LEADER_RETRY = 5
+
+# A pure web tier (GOLD_WEB_ONLY=1) never competes for the lock and never imports the analysis stack
+WEB_ONLY = os.getenv("GOLD_WEB_ONLY", "0") == "1"
+
+# version, then the lengths of etag, body, gzip body and delta event
+SHARED_SNAPSHOT_HEADER = struct.Struct("<Q4I")
+
+def pack_snapshot(snapshot):
+    fields = (snapshot.etag.encode("ascii"), snapshot.body, snapshot.gzip_body, snapshot.delta_event or b"")
+    return SHARED_SNAPSHOT_HEADER.pack(snapshot.version, *(len(f) for f in fields)) + b"".join(fields)
+
+def unpack_snapshot(payload):
+    version, *lengths = SHARED_SNAPSHOT_HEADER.unpack_from(payload)
+    fields, offset = [], SHARED_SNAPSHOT_HEADER.size
+    for length in lengths:
+        fields.append(payload[offset:offset + length])
+        offset += length
+    etag, body, gzip_body, delta_event = fields
+    return Snapshot(version, etag.decode("ascii"), body, gzip_body, json.loads(body),
+                    sse_event("snapshot", version, body.decode("utf-8")), delta_event or None)
+
+def publish_snapshot(data):
+    """Swaps in a new snapshot; readers never see a half-updated dict."""
+    global current_snapshot, snapshot_version
+    with snapshot_changed:
+        snapshot_version += 1
+        current_snapshot = make_snapshot(data, snapshot_version, current_snapshot)
+        if role == "leader":
+            shared_snapshot.write(pack_snapshot(current_snapshot))
+        snapshot_changed.notify_all()
+
+mirrored_seq = 0
+
+def mirror_shared_snapshot():
+    """Adopts the leader's latest snapshot if it changed since the last call."""
+    global current_snapshot, snapshot_version, latest_data, mirrored_seq
+    seq, payload = shared_snapshot.read()
+    if payload is None or seq == mirrored_seq:
+        return False
+    snapshot = unpack_snapshot(payload)
+    with snapshot_changed:
+        current_snapshot, snapshot_version, latest_data = snapshot, snapshot.version, snapshot.data
+        mirrored_seq = seq
+        snapshot_changed.notify_all()
+    return True
+
 # Track last email time
 last_email_time = None
 
@@ -32,63 +139,38 @@ locked_forecast = {
 news_cache = []
 last_news_refresh = 0
 
-# Add hourly snapshots storage (locked values at top of each hour)
+# Hourly snapshots (locked values at top of each hour) and the locked forecast live in SQLite
 import json
+from snapshot_store import SnapshotStore, HIT_TOLERANCE
 
-SNAPSHOTS_FILE = "snapshots.json"
-
-def load_snapshots():
-    if os.path.exists(SNAPSHOTS_FILE):
-        try:
-            with open(SNAPSHOTS_FILE, "r") as f:
-                data = json.load(f)
-                # Convert string keys back to floats (timestamps)
-                return {float(k): v for k, v in data.items()}
-        except:
-            return {}
-    return {}
-
-def save_snapshots(snapshots):
-    try:
-        # Convert float keys to strings for JSON
-        data = {str(k): v for k, v in snapshots.items()}
-        with open(SNAPSHOTS_FILE, "w") as f:
-            json.dump(data, f)
-    except Exception as e:
-        print(f"Error saving snapshots: {e}")
+# Raw hours are kept for SNAPSHOT_RAW_DAYS and daily rollups for ROLLUP_DAILY_DAYS (0 = forever); weekly rollups always
+snapshot_store = SnapshotStore(
+    os.getenv("GOLD_DB_PATH", "gold_agent.db"),
+    raw_days=int(os.getenv("SNAPSHOT_RAW_DAYS", "90")) or None,
+    daily_days=int(os.getenv("ROLLUP_DAILY_DAYS", "730")) or None,
+)
 
-hourly_snapshots = load_snapshots()
+# Rollups shown with the dashboard state
+HISTORY_DAYS = 30
+HISTORY_WEEKS = 26
 
-# Add locked forecast persistence
-FORECAST_FILE = "locked_forecast.json"
-
-def load_forecast():
-    if os.path.exists(FORECAST_FILE):
-        try:
-            with open(FORECAST_FILE, "r") as f:
-                return json.load(f)
-        except:
-            pass
+def rollup_history():
     return {
-        "price": None,
-        "target_hour": None,
-        "raw_trend": None,
-        "confidence": None
+        "daily": snapshot_store.rollups("daily", limit=HISTORY_DAYS),
+        "weekly": snapshot_store.rollups("weekly", limit=HISTORY_WEEKS),
     }
 
-def save_forecast(forecast):
-    try:
-        with open(FORECAST_FILE, "w") as f:
-            json.dump(forecast, f)
-    except Exception as e:
-        print(f"Error saving forecast: {e}")
-
-locked_forecast = load_forecast()
+locked_forecast = snapshot_store.load_forecast()
 
 def job():
-    global last_email_time, locked_forecast, news_cache, last_news_refresh, hourly_snapshots
+    """Runs one analysis tick."""
+    global last_email_time, news_cache, last_news_refresh, latest_data
     print(f"[{datetime.datetime.now()}] Running high-precision job...")
-    agent = GoldAgent()
+    # Build the next state on a copy and publish it in one step at the end
+    data = dict(latest_data)
+    # Every series is downloaded at most once in this tick, however long it runs
+    analysis().market_data.begin_tick()
+    agent = analysis().GoldAgent()
     
     # Force fresh news fetch every time to satisfy user request for frequent updates
     current_news = None
@@ -97,18 +179,23 @@ def job():
 
     # 1. Institutional Grade Analysis
     try:
-        precision_data = agent.institutional_grade_analysis(news_cache=current_news)
-        if precision_data and current_news is None: # We fetched fresh news
+        with metrics.timed("analysis"):
+            precision_data = agent.institutional_grade_analysis(news_cache=current_news)
+        if precision_data and current_news is None and "news" not in precision_data["stale_inputs"]: # We fetched fresh news
             news_cache = precision_data['market_news']
             last_news_refresh = now_ts
             # Use standard 12h format: e.g. "1:26 PM"
             bangkok_now = datetime.datetime.utcnow() + datetime.timedelta(hours=7)
-            latest_data["news_last_updated"] = bangkok_now.strftime('%-I:%M %p')
+            data["news_last_updated"] = bangkok_now.strftime('%-I:%M %p')
     except Exception as e:
         print(f"Institutional analysis error in job: {e}")
+        metrics.inc("job_failures_total", "Jobs that produced no analysis")
         return
 
-    accuracy, last_correct = agent.get_model_accuracy()
+    # Backtests come from the compute cache until the next bar closes
+    with metrics.timed("model_accuracy"):
+        accuracy, model_correct = agent.get_model_accuracy()
+    backtest = agent.get_backtest_data(n_points=12)
     
     if precision_data:
         current_price = precision_data['price']
@@ -118,31 +205,39 @@ def job():
         target_hour = (bangkok_now + datetime.timedelta(hours=1)).hour
         
         # HOURLY LOCK LOGIC: 
-        # Only update the 'predicted_price', 'trend', and 'confidence' once per hour
-        if locked_forecast["target_hour"] != target_hour or locked_forecast["price"] is None:
+        # Only update the 'predicted_price', 'trend', and 'confidence' once per hour.
+        # A GLD stand-in price is on another scale, so nothing is locked until GC=F is back.
+        substitute_price = precision_data['price_source']['substitute']
+        if not substitute_price and (locked_forecast["target_hour"] != target_hour or locked_forecast["price"] is None):
             # When we transition to a new hour (e.g., from 12:59 to 13:00)
             # 1. Snapshot the hour that just FINISHED (e.g., the 12:00 PM to 1:00 PM period)
-            if locked_forecast["target_hour"] is not None:
+            finished_hour_dt = bangkok_now.replace(minute=0, second=0, microsecond=0)
+            finished_hour_utc = (finished_hour_dt - datetime.timedelta(hours=7)).replace(tzinfo=datetime.timezone.utc)
+            finished_hour_ts = finished_hour_utc.timestamp()
+            # Only if that forecast targeted this very hour, not the same hour of the day
+            # before a market closure (forecasts locked before target_ts existed are trusted)
+            if locked_forecast["target_hour"] is not None and locked_forecast.get("target_ts", finished_hour_ts) == finished_hour_ts:
                 # The hour that just reached its target (e.g., 2:00 PM hits, we lock 2:00 PM result)
-                finished_hour_dt = bangkok_now.replace(minute=0, second=0, microsecond=0)
-                finished_hour_utc = (finished_hour_dt - datetime.timedelta(hours=7)).replace(tzinfo=datetime.timezone.utc)
-                finished_hour_ts = finished_hour_utc.timestamp()
-                
                 # We compare the current_price (at 2:00 PM) to the forecast we had for 2:00 PM
-                if finished_hour_ts not in hourly_snapshots:
-                    hourly_snapshots[finished_hour_ts] = {
-                        "actual": current_price,
-                        "predicted": locked_forecast["price"]
-                    }
-                    save_snapshots(hourly_snapshots)
+                with metrics.timed("snapshot_persist"):
+                    stored = snapshot_store.add(finished_hour_ts, current_price, locked_forecast["price"])
+                if stored:
                     print(f"🔒 HOUR REACHED & LOCKED: {finished_hour_dt.strftime('%H:%M')} -> Actual=${current_price:.2f}, Predicted=${locked_forecast['price']:.2f}")
+                    with metrics.timed("retention"):
+                        evicted, evicted_daily = snapshot_store.evict()
+                        data["history"] = rollup_history()
+                    if evicted or evicted_daily:
+                        metrics.inc("snapshots_evicted_total", "Raw hourly snapshots dropped by retention", value=evicted)
+                        metrics.inc("rollups_evicted_total", "Daily rollups dropped by retention", value=evicted_daily)
 
             # 2. Lock the NEW forecast for the upcoming hour (e.g., the 2:00 PM to 3:00 PM period)
             locked_forecast["price"] = precision_data.get('predicted_price', current_price)
             locked_forecast["target_hour"] = target_hour
+            locked_forecast["target_ts"] = finished_hour_ts + 3600
             locked_forecast["raw_trend"] = precision_data['prediction']
             locked_forecast["confidence"] = precision_data['confidence']
-            save_forecast(locked_forecast)
+            with metrics.timed("snapshot_persist"):
+                snapshot_store.save_forecast(locked_forecast)
             print(f">>> [{bangkok_now}] New Hourly Forecast LOCKED: {target_hour}:00 Target = ${locked_forecast['price']:.2f}")
 
         # Use the locked values for the dashboard
@@ -151,7 +246,7 @@ def job():
             
         # Update global state for API/Dashboard
         # Calculate overall accuracy based on the last 6 LOCKED snapshots (Performance 6H)
-        recent_snapshots = sorted(hourly_snapshots.items(), key=lambda x: x[0], reverse=True)[:6]
+        recent_snapshots = snapshot_store.recent(6)
         if len(recent_snapshots) > 0:
             total_acc = 0
             for ts, snap in recent_snapshots:
@@ -160,49 +255,56 @@ def job():
                 diff = abs(act - pre)
                 total_acc += max(0, 100 - (diff / act * 100))
             avg_accuracy = total_acc / len(recent_snapshots)
-            is_correct = abs(recent_snapshots[0][1]["actual"] - recent_snapshots[0][1]["predicted"]) < (recent_snapshots[0][1]["actual"] * 0.005) # Within 0.5%
+            is_correct = abs(recent_snapshots[0][1]["actual"] - recent_snapshots[0][1]["predicted"]) < (recent_snapshots[0][1]["actual"] * HIT_TOLERANCE) # Within 0.5%
             last_correct = "Correct" if is_correct else "Incorrect"
         else:
             # Fallback to model backtest if no snapshots yet
-            avg_accuracy, is_correct = agent.get_model_accuracy()
+            avg_accuracy, is_correct = accuracy, model_correct
             last_correct = "Correct" if is_correct else "Incorrect"
 
-        latest_data["price"] = current_price
-        latest_data["prediction_raw"] = final_trend 
-        latest_data["prediction"] = final_prediction_price
-        latest_data["pct_change"] = ((final_prediction_price - current_price) / current_price) * 100
-        latest_data["accuracy"] = avg_accuracy
-        latest_data["last_correct"] = last_correct
+        data["price"] = current_price
+        data["prediction_raw"] = final_trend 
+        data["prediction"] = final_prediction_price
+        data["pct_change"] = ((final_prediction_price - current_price) / current_price) * 100
+        data["accuracy"] = avg_accuracy
+        data["last_correct"] = last_correct
         
         # Performance Reasoning Logic
         if avg_accuracy >= 90:
-            latest_data["accuracy_reason"] = "โมเดลจับทิศทางตลาดได้แม่นยำสูงในสภาวะแนวโน้มชัดเจน"
+            data["accuracy_reason"] = "โมเดลจับทิศทางตลาดได้แม่นยำสูงในสภาวะแนวโน้มชัดเจน"
         elif avg_accuracy >= 70:
-            latest_data["accuracy_reason"] = "โมเดลทำงานได้ดีท่ามกลางความผันผวนปกติของตลาด"
+            data["accuracy_reason"] = "โมเดลทำงานได้ดีท่ามกลางความผันผวนปกติของตลาด"
         elif avg_accuracy >= 50:
-            latest_data["accuracy_reason"] = "ตลาดมีความผันผวนสูงกว่าปกติ กระทบต่อความแม่นยำรายชั่วโมง"
+            data["accuracy_reason"] = "ตลาดมีความผันผวนสูงกว่าปกติ กระทบต่อความแม่นยำรายชั่วโมง"
         else:
-            latest_data["accuracy_reason"] = "ตลาดอยู่ในช่วงเปลี่ยนเทรดรวดเร็ว โมเดลอยู่ระหว่างการเรียนรู้รูปแบบใหม่"
+            data["accuracy_reason"] = "ตลาดอยู่ในช่วงเปลี่ยนเทรดรวดเร็ว โมเดลอยู่ระหว่างการเรียนรู้รูปแบบใหม่"
 
-        latest_data["trend"] = precision_data['prediction']
-        latest_data["confidence"] = locked_forecast.get("confidence", precision_data['confidence'])  # Use locked confidence
-        latest_data["reasoning"] = precision_data['reasoning']
-        latest_data["market_news"] = precision_data['market_news']
-        latest_data["last_updated"] = bangkok_now.strftime('%H:%M:%S')
+        data["trend"] = precision_data['prediction']
+        data["confidence"] = locked_forecast.get("confidence", precision_data['confidence'])  # Use locked confidence
+        data["reasoning"] = precision_data['reasoning']
+        data["market_news"] = precision_data['market_news']
+        data["last_updated"] = bangkok_now.strftime('%H:%M:%S')
         
         # Calculate next hour for forecast display (Bangkok Time)
         next_hour_dt = (bangkok_now + datetime.timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
-        latest_data["forecast_time"] = next_hour_dt.strftime('%-I %p') # e.g. "10 PM"
+        data["forecast_time"] = next_hour_dt.strftime('%-I %p') # e.g. "10 PM"
         
         # Sentiment summary for frontend if needed
-        latest_data["sentiment"] = precision_data['sentiment']
-        latest_data["rsi"] = precision_data['rsi']
-
-        print(f"Updated at {latest_data['last_updated']}: Price={current_price}, Prediction={precision_data['prediction']}")
+        data["sentiment"] = precision_data['sentiment']
+        data["rsi"] = precision_data['rsi']
+        data["price_source"] = precision_data['price_source']
+        # 1h to 24h forecasts with prediction intervals; recomputed only when the bars change
+        data["forecast"] = agent.forecast_horizons()
+        # Inputs that missed the tick deadline and were filled from their last good value
+        data["stale_inputs"] = precision_data['stale_inputs']
+        for name in data["stale_inputs"]:
+            metrics.inc("stale_inputs_total", "Inputs filled from their last good value", input=name)
+
+        print(f"Updated at {data['last_updated']}: Price={current_price}, Prediction={precision_data['prediction']}")
         
         # 2. Fetch history and backtest for chart
         try:
-            labels, actuals, backtest_preds = agent.get_backtest_data(n_points=12)
+            labels, actuals, backtest_preds = backtest
             # Use the LOCKED model predicted price for consistency
             next_pred = locked_forecast["price"]
             
@@ -221,19 +323,14 @@ def job():
 
             # HOURLY SNAPSHOT FETCH (Keep it consistent with our manual snapshots)
             # We still fetch backtest for the chart points that aren't in our locked snapshots
-            for i in range(len(f_labels)):
-                label_dt = datetime.datetime.fromtimestamp(f_labels[i], tz=datetime.timezone.utc)
-                hour_ts = label_dt.replace(minute=0, second=0, microsecond=0).timestamp()
-                
-                # If we have a manually locked snapshot (more accurate for what user saw), use it
-                if hour_ts in hourly_snapshots:
-                    f_actuals[i] = hourly_snapshots[hour_ts]["actual"]
-                    f_backtest_preds[i] = hourly_snapshots[hour_ts]["predicted"]
-                else:
-                    # Otherwise, if we haven't locked it yet but it's clearly passed, 
-                    # we can use the backtest but we should really trust our snapshots more.
-                    pass
-
+            locked_snapshots = snapshot_store.range(f_labels[0] - 3600, f_labels[-1]) if f_labels else {}
+            # If we have a manually locked snapshot (more accurate for what user saw), use it;
+            # otherwise keep the backtest value for that hour
+            for i, label in enumerate(f_labels):
+                snap = locked_snapshots.get(label - label % 3600)
+                if snap is not None:
+                    f_actuals[i] = snap["actual"]
+                    f_backtest_preds[i] = snap["predicted"]
 
             # Get the locked forecast for the CURRENT hour (not next hour)
             current_hour_dt = bangkok_now.replace(minute=0, second=0, microsecond=0)
@@ -241,18 +338,34 @@ def job():
             current_hour_ts = current_hour_utc.timestamp()
             
             # Use locked forecast for current hour if available, otherwise use current price as fallback
-            current_hour_prediction = hourly_snapshots.get(current_hour_ts, {}).get("predicted", current_price)
+            current_hour_prediction = (snapshot_store.get(current_hour_ts) or {}).get("predicted", current_price)
+
+            # The band is the 1h prediction interval when there is one, otherwise a fixed ±3%
+            high_threshold, low_threshold = current_price * 1.03, current_price * 0.97
+            next_hour = (data["forecast"] or {}).get("horizons", [{}])[0]
+            if next_hour.get("hours") == 1 and next_hour.get("upper") is not None:
+                high_threshold, low_threshold = next_hour["upper"], next_hour["lower"]
 
-            latest_data["chart"] = {
+            data["chart"] = {
                 "labels": f_labels + [now_ts, forecast_ts],
                 "prices": f_actuals + [current_price, None], 
                 "prediction_point": f_backtest_preds + [current_hour_prediction, next_pred], 
-                "high_threshold": [current_price * 1.03] * (len(f_labels) + 2),
-                "low_threshold": [current_price * 0.97] * (len(f_labels) + 2)
+                "high_threshold": high_threshold,
+                "low_threshold": low_threshold
             }
         except Exception as e:
             print(f"Chart history error: {e}")
 
+        if "history" not in data:
+            data["history"] = rollup_history()
+
+        # Other metals, gold ETFs and gold in other currencies, scored in one batch
+        data["instruments"] = agent.analyze_watchlist(market_news=precision_data['market_news'])
+
+        latest_data = data
+        with metrics.timed("publish"):
+            publish_snapshot(data)
+
         # 3. Executive Briefing Email
         current_time = datetime.datetime.now()
         if last_email_time is None or (current_time - last_email_time).total_seconds() >= 3600:
@@ -260,35 +373,317 @@ def job():
             last_email_time = current_time
     else:
         print("High-precision job failed (Insufficient data or fetch error)")
+        metrics.inc("job_failures_total", "Jobs that produced no analysis")
+
+    stats = analysis().market_data.stats()
+    print(f"Market data cache: hits={stats['hits']} misses={stats['misses']} coalesced={stats['coalesced']}")
+    stats = analysis().compute_cache.stats()["all"]
+    print(f"Compute cache: hits={stats['hits']} misses={stats['misses']} hit_ratio={stats['hit_ratio']:.2f}")
+
+# Seconds between scheduled jobs
+TICK_INTERVAL = float(os.getenv("TICK_INTERVAL", "10"))
+
+# Samples every Nth tick with cProfile (0 = off) and keeps dumps of ticks slower than PROFILE_SLOW_TICK
+tick_profiler = TickProfiler(
+    directory=os.getenv("PROFILE_DIR", "profiles"),
+    threshold=float(os.getenv("PROFILE_SLOW_TICK", "5")),
+    sample_every=int(os.getenv("PROFILE_SAMPLE_EVERY", "0")),
+)
+
+# Jobs finished so far; lets a cold-start request tell whether a job ended while it waited
+jobs_finished = 0
+
+def tick():
+    """Runs one timed job; the caller holds job_lock."""
+    global jobs_finished
+    try:
+        with metrics.timed("tick") as timer:
+            _, dump = tick_profiler.run(job)
+    finally:
+        jobs_finished += 1
+    metrics.inc("ticks_total", "Jobs run")
+    if timer.elapsed > TICK_INTERVAL:
+        metrics.inc("tick_overruns_total", "Jobs that took longer than the tick interval")
+    if dump:
+        print(f"Slow tick ({timer.elapsed:.1f}s) profiled to {dump}")
+    if role == "leader":
+        # Followers serve the leader's numbers on /metrics
+        shared_metrics.write(metrics.render().encode("utf-8"))
+
+def run_job():
+    """Runs one job unless another one (e.g. a cold-start request's) is still running; returns whether it ran."""
+    if not job_lock.acquire(blocking=False):
+        metrics.inc("ticks_merged_total", "Scheduled ticks dropped because the previous job was still running")
+        return False
+    try:
+        tick()
+    finally:
+        job_lock.release()
+    return True
+
+# GC=F trading hours; no new bars arrive while the market is closed.
+# GOLD_IGNORE_MARKET_HOURS=1 ticks around the clock (replayed sessions, load tests)
+market_calendar = MarketCalendar(parse_holidays())
+IGNORE_MARKET_HOURS = os.getenv("GOLD_IGNORE_MARKET_HOURS", "0") == "1"
+
+# Longest single sleep while closed, so the scheduler stays responsive to clock changes
+MAX_CLOSED_SLEEP = 900
 
 def run_schedule():
-    """Runs the schedule loop."""
-    # Run once on startup
-    job()
-    # Update every 10 seconds for real-time feel
-    schedule.every(10).seconds.do(job)
+    """Ticks every TICK_INTERVAL while GC=F trades and sleeps while it is closed.
+
+    Ticks stay on a fixed grid: slots that pass while a slow job runs are
+    skipped rather than run back to back. Every tick runs the whole job; the
+    model fits and backtests in it are cached on the closed bars (see
+    compute_cache.py), so they only rerun on the first tick after a bar closes.
+    """
+    # Deliver briefings left in the outbox by a previous run
+    start_outbox = getattr(analysis().default_mailer, "start", None)
+    if start_outbox is not None:
+        start_outbox()
+    closed = False
+    next_tick = time.time()
+    while True:
+        now = time.time()
+        if not IGNORE_MARKET_HOURS and not market_calendar.is_open(now):
+            if not closed:
+                # One last tick picks up the closing bar (and gives a first snapshot when starting while closed)
+                closed = True
+                metrics.inc("market_closures_total", "Times the scheduler went to sleep for a market closure")
+                run_job()
+                reopen = market_calendar.next_open(time.time())
+                print(f"Market closed; sleeping until {datetime.datetime.fromtimestamp(reopen, datetime.timezone.utc):%Y-%m-%d %H:%M} UTC")
+            slept = max(0.0, min(market_calendar.next_open(time.time()) - time.time(), MAX_CLOSED_SLEEP))
+            time.sleep(slept)
+            metrics.inc("market_closed_sleep_seconds_total", "Seconds the scheduler slept through market closures", value=slept)
+            continue
+        if closed:
+            closed = False
+            next_tick = now
+            print("Market open; resuming ticks")
+
+        run_job()
+
+        next_tick += TICK_INTERVAL
+        now = time.time()
+        if now >= next_tick:
+            missed = int((now - next_tick) // TICK_INTERVAL) + 1
+            metrics.inc("ticks_skipped_total", "Scheduled ticks skipped because a job overran", value=missed)
+            next_tick += missed * TICK_INTERVAL
+        time.sleep(max(0.0, next_tick - now))
+
+def follow_leader():
+    """Mirrors the leader's snapshots until this process wins the leader lock."""
+    next_attempt = 0
     while True:
-        schedule.run_pending()
-        time.sleep(1)
+        if not WEB_ONLY and time.monotonic() >= next_attempt:
+            if leader_lock.try_acquire():
+                return
+            next_attempt = time.monotonic() + LEADER_RETRY
+        mirror_shared_snapshot()
+        time.sleep(FOLLOW_INTERVAL)
+
+def run_background():
+    global role, locked_forecast
+    follow_leader()
+    # First start, or the previous leader exited: continue from its last published state
+    mirror_shared_snapshot()
+    locked_forecast = snapshot_store.load_forecast()
+    role = "leader"
+    print(f"Process {os.getpid()} is the computing leader")
+    run_schedule()
+
+def start_background():
+    """Starts leader election; the winner runs the scheduler, every other process serves its snapshots."""
+    global role
+    # Set before the thread exists, so no request in between can take this process for the leader
+    role = "follower"
+    t = threading.Thread(target=run_background, name="scheduler")
+    t.daemon = True
+    t.start()
+    return t
 
 @app.route('/')
 def index():
     return render_template('dashboard.html')
 
+# Seconds a follower waits for the leader's first snapshot
+COLD_START_WAIT = 30
+
+def cold_start_snapshot():
+    """Returns the first snapshot, or None if the job all waiting requests shared produced none.
+
+    Requests that queue on job_lock behind a job take its outcome: if it
+    failed, they fail too instead of each running the job again in turn.
+    """
+    if role is None:
+        # No leader election in this process (flask run, or app imported without start_background()):
+        # serve what a leader elsewhere published, otherwise compute here like a leader would
+        mirror_shared_snapshot()
+        if current_snapshot is not None or WEB_ONLY:
+            return current_snapshot
+    elif role == "follower":
+        # Only the leader computes
+        with snapshot_changed:
+            snapshot_changed.wait_for(lambda: current_snapshot is not None, timeout=COLD_START_WAIT)
+        return current_snapshot
+    seen = jobs_finished
+    with job_lock:
+        if current_snapshot is None and jobs_finished == seen:
+            tick()
+    return current_snapshot
+
+def service_unavailable(message):
+    """A JSON 503 that tells the client to try again after about one tick."""
+    response = Response(to_json({"error": message}), status=503, mimetype="application/json")
+    response.headers["Retry-After"] = str(max(int(TICK_INTERVAL), 1))
+    return response
+
+NO_SNAPSHOT = "No analysis available yet; retry shortly"
+
+@app.route('/api/instruments')
+def get_instruments():
+    """Per-instrument results of the latest watchlist batch."""
+    snapshot = current_snapshot or cold_start_snapshot()
+    if snapshot is None:
+        return service_unavailable(NO_SNAPSHOT)
+    response = Response(to_json(snapshot.data.get("instruments", {})), mimetype="application/json")
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+# Seconds between SSE keep-alive comments on an idle stream
+STREAM_KEEPALIVE = 15
+
+# Each open stream holds a server thread for as long as the tab stays open (gunicorn has
+# GUNICORN_THREADS per worker), so streams past this cap get a 503 and the page polls instead
+MAX_STREAMS = int(os.getenv("MAX_STREAMS", "4"))
+open_streams = 0
+streams_lock = threading.Lock()
+
+def release_stream():
+    global open_streams
+    with streams_lock:
+        open_streams -= 1
+        metrics.set("streams_open", open_streams, "Open /api/stream connections")
+
+@app.route('/api/stream')
+def stream_latest():
+    """Server-Sent Events: the full state once, then only the fields that changed."""
+    global open_streams
+    snapshot = current_snapshot or cold_start_snapshot()
+    if snapshot is None:
+        return service_unavailable(NO_SNAPSHOT)
+    with streams_lock:
+        full = open_streams >= MAX_STREAMS
+        if not full:
+            open_streams += 1
+            metrics.set("streams_open", open_streams, "Open /api/stream connections")
+    if full:
+        metrics.inc("streams_rejected_total", "Streams refused because MAX_STREAMS were open")
+        return service_unavailable("Too many open streams; poll /api/latest")
+
+    last_event_id = request.headers.get("Last-Event-ID")
+    sent_version = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    def events():
+        nonlocal sent_version, snapshot
+        while True:
+            if snapshot.version != sent_version:
+                # A client that saw the previous version only needs the delta
+                if snapshot.delta_event is not None and sent_version == snapshot.version - 1:
+                    yield snapshot.delta_event
+                else:
+                    yield snapshot.full_event
+                sent_version = snapshot.version
+            with snapshot_changed:
+                snapshot_changed.wait_for(lambda: current_snapshot is not None and current_snapshot.version != sent_version,
+                                          timeout=STREAM_KEEPALIVE)
+            if current_snapshot is None or current_snapshot.version == sent_version:
+                yield b": keep-alive\n\n"
+            else:
+                snapshot = current_snapshot
+
+    response = Response(events(), mimetype="text/event-stream")
+    # Runs when the client goes away, even if the generator never started
+    response.call_on_close(release_stream)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
 @app.route('/api/latest')
 def get_latest():
-    # If no data yet (e.g. very first start), try to fetch immediately without waiting for scheduler
-    if latest_data["price"] is None:
-         # Quick fetch for immediate UI responsiveness (blocking but safe for first load)
-        job() 
-        
-    return jsonify(latest_data)
+    # If no data yet (e.g. very first start), fetch immediately; concurrent requests share that one job
+    snapshot = current_snapshot or cold_start_snapshot()
+    if snapshot is None:
+        return service_unavailable(NO_SNAPSHOT)
+
+    if request.if_none_match.contains(snapshot.etag):
+        response = Response(status=304)
+    elif "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = Response(snapshot.gzip_body, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(snapshot.body, mimetype="application/json")
+    response.set_etag(snapshot.etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+chart_history = None
+
+def get_chart_history():
+    """Range chart builder (chart_data, with numpy), created on first use."""
+    global chart_history
+    if chart_history is None:
+        from chart_data import ChartHistory
+        chart_history = ChartHistory(snapshot_store, os.getenv("BAR_STORE_DIR", "bar_store"))
+    return chart_history
+
+@app.route('/api/chart')
+def get_chart():
+    """Actual, locked and backtest prices over a time range, downsampled on the server."""
+    from chart_data import parse_range
+    try:
+        start, end, points = parse_range(request.args)
+    except ValueError as e:
+        return Response(to_json({"error": str(e)}), status=400, mimetype="application/json")
+    etag, body, gzip_body = get_chart_history().response(start, end, points)
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = Response(gzip_body, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@metrics.register
+def app_gauges():
+    return [
+        ("snapshot_version", "Version of the published dashboard snapshot", snapshot_version, {}),
+        ("snapshot_bytes", "Size of the published /api/latest body", len(current_snapshot.body) if current_snapshot else 0, {}),
+        ("locked_snapshots", "Hourly snapshots stored", snapshot_store.count(), {}),
+        ("market_open", "1 while GC=F trades, 0 while the scheduler sleeps", int(market_calendar.is_open(time.time())), {}),
+    ] + [
+        ("rollups", "Rollup buckets stored", count, {"period": period})
+        for period, count in snapshot_store.rollup_count().items()
+    ]
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus text exposition of stage timings, tick counters, cache and process stats."""
+    body = metrics.render().encode("utf-8")
+    if role == "follower":
+        body = shared_metrics.read()[1] or body
+    return Response(body, content_type="text/plain; version=0.0.4; charset=utf-8")
 
 if __name__ == '__main__':
-    # Start scheduler in a separate thread
-    t = threading.Thread(target=run_schedule)
-    t.daemon = True
-    t.start()
+    # Start scheduler in a separate thread (or follow the process that already runs it)
+    start_background()
     
     # Start Flask server
     import os
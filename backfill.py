@@ -0,0 +1,259 @@
+"""Bulk import of vendor OHLCV exports (CSV or Parquet) into the bar store.
+
+Years of intraday history can be loaded once and then read offline by the
+agent, the chart API and sweep.py:
+
+    python backfill.py --symbol GC=F --interval 1m exports/gc_*.csv
+    python backfill.py --symbol DX-Y.NYB --interval 1h --timestamp Date,Time --tz America/New_York dxy.csv
+    python backfill.py --symbol GLD --interval 1h --column Close="Adj Close" gld.parquet
+
+Parquet support is optional: it needs pyarrow, which requirements.txt does
+not install (pip install pyarrow).
+
+Files are split into chunks (byte ranges ending on a line break for CSV,
+row groups for Parquet) that are parsed by a process pool. Timestamps are
+normalized to UTC: offsets in the data are converted, naive values are
+localized to --tz first. The imported bars are merged with the stored
+series; where ranges overlap, files later on the command line win over
+earlier ones, and imports win over bars already stored.
+
+Run it while the app is stopped (or restart the app afterwards): a running
+leader keeps its own copy of each series and would write it back.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from bar_store import BarStore, COLUMNS
+
+
+# Header names (lower-cased) recognised without a --column mapping
+ALIASES = {
+    "Open": ("open", "o", "open price"),
+    "High": ("high", "h", "high price"),
+    "Low": ("low", "l", "low price"),
+    "Close": ("close", "c", "last", "price", "close price", "settle"),
+    "Volume": ("volume", "vol", "v", "tick volume"),
+}
+TIMESTAMP_ALIASES = ("datetime", "timestamp", "time", "date", "gmt time", "local time", "date time")
+
+NAT = np.iinfo(np.int64).min
+
+
+def resolve_columns(names, timestamp=None, overrides=None):
+    """Maps a file's column names to {"timestamp": [names], "Open": name, ...}; Close is required."""
+    lookup = {n.strip().lower(): n for n in names}
+    spec = {}
+    if timestamp:
+        parts = [p.strip() for p in timestamp.split(",")]
+        missing = [p for p in parts if p.lower() not in lookup]
+        if missing:
+            raise ValueError(f"Timestamp column(s) not found: {', '.join(missing)}")
+        spec["timestamp"] = [lookup[p.lower()] for p in parts]
+    elif "date" in lookup and "time" in lookup:
+        spec["timestamp"] = [lookup["date"], lookup["time"]]
+    else:
+        found = next((lookup[a] for a in TIMESTAMP_ALIASES if a in lookup), None)
+        if found is None:
+            raise ValueError("No timestamp column found; pass --timestamp")
+        spec["timestamp"] = [found]
+    for column in COLUMNS:
+        source = (overrides or {}).get(column)
+        if source is not None:
+            if source.lower() not in lookup:
+                raise ValueError(f"Column not found: {source}")
+            spec[column] = lookup[source.lower()]
+        else:
+            found = next((lookup[a] for a in ALIASES[column] if a in lookup), None)
+            if found is not None:
+                spec[column] = found
+    if "Close" not in spec:
+        raise ValueError("No close column found; pass --column Close=<name>")
+    return spec
+
+
+def to_utc_ns(frame, spec, tz="UTC", fmt=None, unit=None):
+    """Returns UTC epoch nanoseconds for the timestamp column(s) of `frame`, NaT as NAT.
+
+    Values with an offset are converted; naive values are taken as `tz`
+    local time, with DST-ambiguous hours inferred from their order.
+    """
+    columns = spec["timestamp"]
+    if len(columns) == 1:
+        values = frame[columns[0]]
+    else:
+        values = frame[columns[0]].astype(str).str.cat([frame[c].astype(str) for c in columns[1:]], sep=" ")
+    if unit:
+        stamps = pd.to_datetime(values, unit=unit, utc=True, errors="coerce")
+    else:
+        try:
+            stamps = pd.to_datetime(values, format=fmt, errors="coerce")
+        except ValueError:
+            # Offsets that differ from row to row (e.g. across DST) only parse straight to UTC
+            stamps = pd.to_datetime(values, format=fmt, errors="coerce", utc=True)
+        if stamps.dt.tz is None:
+            try:
+                stamps = stamps.dt.tz_localize(tz, ambiguous="infer", nonexistent="shift_forward")
+            except Exception:
+                # Chunk boundaries can split a repeated DST hour; drop those bars instead
+                stamps = stamps.dt.tz_localize(tz, ambiguous="NaT", nonexistent="shift_forward")
+        stamps = stamps.dt.tz_convert("UTC")
+    return pd.DatetimeIndex(stamps).as_unit("ns").asi8
+
+
+def _arrays(frame, spec, tz, fmt, unit):
+    timestamps = to_utc_ns(frame, spec, tz, fmt, unit)
+    columns = {c: pd.to_numeric(frame[spec[c]], errors="coerce").to_numpy(dtype=np.float64)
+               for c in COLUMNS if c in spec}
+    return timestamps, columns
+
+
+def parse_csv_chunk(path, start, end, names, spec, delimiter, tz, fmt, unit):
+    """Parses bytes [start, end) of a CSV file into (timestamps ns, {column: float64})."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    usecols = spec["timestamp"] + [spec[c] for c in COLUMNS if c in spec]
+    frame = pd.read_csv(io.BytesIO(data), header=None, names=names, usecols=usecols, sep=delimiter,
+                        dtype={c: str for c in spec["timestamp"]} if not unit else None, engine="c")
+    return _arrays(frame, spec, tz, fmt, unit)
+
+
+def parse_parquet_group(path, group, spec, tz, fmt, unit):
+    """Parses one row group of a Parquet file into (timestamps ns, {column: float64})."""
+    import pyarrow.parquet as pq
+    usecols = spec["timestamp"] + [spec[c] for c in COLUMNS if c in spec]
+    frame = pq.ParquetFile(path).read_row_group(group, columns=usecols).to_pandas()
+    return _arrays(frame, spec, tz, fmt, unit)
+
+
+def csv_chunks(path, chunk_bytes, delimiter=","):
+    """Returns (column names, [(start, end)]) with every range ending on a line break."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        ranges, start = [], f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    names = next(csv.reader([header.decode("utf-8-sig").strip()], delimiter=delimiter))
+    return names, ranges
+
+
+def plan(paths, args, overrides):
+    """Returns one (function, args) task per chunk, in file order."""
+    tasks = []
+    for path in paths:
+        if path.lower().endswith((".parquet", ".pq")):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise SystemExit("Parquet files need pyarrow (pip install pyarrow)")
+            meta = pq.ParquetFile(path)
+            spec = resolve_columns(meta.schema_arrow.names, args.timestamp, overrides)
+            tasks += [(parse_parquet_group, (path, g, spec, args.tz, args.format, args.unit))
+                      for g in range(meta.num_row_groups)]
+        else:
+            names, ranges = csv_chunks(path, args.chunk_mb << 20, args.delimiter)
+            spec = resolve_columns(names, args.timestamp, overrides)
+            tasks += [(parse_csv_chunk, (path, start, end, names, spec, args.delimiter, args.tz, args.format, args.unit))
+                      for start, end in ranges]
+    return tasks
+
+
+def merge(parts):
+    """Concatenates (timestamps, columns) parts, sorts by time and keeps the last part's bar per timestamp."""
+    timestamps = np.concatenate([t for t, _ in parts])
+    columns = {c: np.concatenate([cols.get(c, np.full(len(t), np.nan)) for t, cols in parts]) for c in COLUMNS}
+    keep = (timestamps != NAT) & ~np.isnan(columns["Close"])
+    timestamps = timestamps[keep]
+    columns = {c: v[keep] for c, v in columns.items()}
+    # Stable, so equal timestamps stay in part order and the last of each run is the newest source
+    order = np.argsort(timestamps, kind="stable")
+    timestamps = timestamps[order]
+    last = np.ones(len(timestamps), dtype=bool)
+    last[:-1] = timestamps[1:] != timestamps[:-1]
+    return timestamps[last], {c: v[order][last] for c, v in columns.items()}
+
+
+def run(paths, symbol, interval, root, args, overrides=None):
+    """Imports `paths` into the bar store; returns (rows read, bars stored)."""
+    tasks = plan(paths, args, overrides)
+    store = BarStore(root)
+    existing = None if args.replace else store.read(symbol, interval)
+    parts = []
+    if existing is not None:
+        parts.append((existing.index.as_unit("ns").asi8,
+                      {c: existing[c].to_numpy(dtype=np.float64) for c in COLUMNS}))
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(fn, *fn_args) for fn, fn_args in tasks]
+        for n, future in enumerate(futures, 1):
+            parts.append(future.result())
+            print(f"\r{n}/{len(tasks)} chunks, {time.perf_counter() - started:.1f}s", end="", file=sys.stderr)
+    print(file=sys.stderr)
+    read = sum(len(t) for t, _ in parts[len(parts) - len(tasks):])
+
+    timestamps, columns = merge(parts)
+    if not len(timestamps):
+        raise SystemExit("No bars with a timestamp and a close price were found")
+    tz = args.store_tz or (str(existing.index.tz) if existing is not None and existing.index.tz is not None else "UTC")
+    index = pd.DatetimeIndex(timestamps.view("datetime64[ns]"), tz="UTC").tz_convert(tz)
+    frame = pd.DataFrame(columns, index=index)
+    days = int((timestamps[-1] - timestamps[0]) // (86400 * 10**9)) + 1
+    store.replace(symbol, interval, frame, backfilled_days=days)
+    return read, len(frame)
+
+
+def parse_columns(specs):
+    overrides = {}
+    for spec in specs or []:
+        name, _, source = spec.partition("=")
+        if name not in COLUMNS or not source:
+            raise SystemExit(f"--column expects one of {', '.join(COLUMNS)}=<name>, got {spec}")
+        overrides[name] = source
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="CSV or Parquet (.parquet, needs pyarrow) files, oldest first")
+    parser.add_argument("--symbol", required=True, help="series to import into, e.g. GC=F")
+    parser.add_argument("--interval", required=True, help="bar interval of the files, e.g. 1m or 1h")
+    parser.add_argument("--bar-store", default=os.getenv("BAR_STORE_DIR", "bar_store"))
+    parser.add_argument("--timestamp", help="timestamp column, or Date,Time columns to join (default: detected)")
+    parser.add_argument("--format", help="strftime format of the timestamps (default: inferred)")
+    parser.add_argument("--unit", choices=("s", "ms", "us", "ns"), help="timestamps are epoch numbers in this unit")
+    parser.add_argument("--tz", default="UTC", help="time zone of timestamps without an offset")
+    parser.add_argument("--column", action="append", help="Open|High|Low|Close|Volume=<name in file> (repeatable)")
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--chunk-mb", type=int, default=64, help="CSV bytes per parallel chunk")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--store-tz", help="time zone of the stored index (default: the series' own, else UTC)")
+    parser.add_argument("--replace", action="store_true", help="drop bars already stored for the series")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        read, stored = run(args.files, args.symbol, args.interval, args.bar_store, args, parse_columns(args.column))
+    except ValueError as e:
+        raise SystemExit(str(e))
+    elapsed = time.perf_counter() - started
+    size = sum(os.path.getsize(p) for p in args.files) / (1 << 20)
+    print(f"Imported {read} rows ({size:.0f} MiB) into {args.symbol} {args.interval}: "
+          f"{stored} bars stored, {elapsed:.1f}s ({size / elapsed:.0f} MiB/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import numpy as np
+
+
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+
+class BarWindow:
+    """The last bars of a BarRing as read-only, contiguous NumPy views (no copies).
+
+    `timestamps` are UTC epoch nanoseconds. A window stays valid while fewer
+    than `capacity - len(window)` bars are appended to its ring; a revision of
+    the last bar shows up in it, like a still-forming bar in a DataFrame
+    fetched again.
+    """
+    def __init__(self, timestamps, columns, symbol=None, interval=None):
+        self.timestamps = timestamps
+        self.columns = columns
+        self.symbol = symbol
+        self.interval = interval
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    @property
+    def close(self):
+        return self.columns["Close"]
+
+    def head(self, n):
+        """The first n bars as another zero-copy window."""
+        return BarWindow(self.timestamps[:n], {c: v[:n] for c, v in self.columns.items()}, self.symbol, self.interval)
+
+    def tail(self, n):
+        """The last n bars as another zero-copy window."""
+        start = max(len(self) - n, 0)
+        return BarWindow(self.timestamps[start:], {c: v[start:] for c, v in self.columns.items()},
+                         self.symbol, self.interval)
+
+
+class BarRing:
+    """Fixed-capacity OHLCV history in contiguous NumPy arrays, appended one bar at a time.
+
+    Every bar is written twice, at slot i and i + capacity, so the newest n
+    bars are always one contiguous slice and window() never copies. Memory
+    is fixed at 2 * capacity bars per column however long the process runs.
+    Writes are not synchronized; callers serialize them per ring.
+    """
+    def __init__(self, capacity=4096, symbol=None, interval=None):
+        self.capacity = capacity
+        self.symbol = symbol
+        self.interval = interval
+        self._timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self._columns = {c: np.full(2 * capacity, np.nan) for c in COLUMNS}
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def last_timestamp(self):
+        return int(self._timestamps[self._next - 1 + self.capacity]) if self._count else None
+
+    def clear(self):
+        self._next = 0
+        self._count = 0
+
+    def _write(self, slot, timestamp, values):
+        for i in (slot, slot + self.capacity):
+            self._timestamps[i] = timestamp
+            for c, column in self._columns.items():
+                column[i] = values.get(c, np.nan)
+
+    def append(self, timestamp, **values):
+        """Adds one bar; the same timestamp as the last bar revises it in place."""
+        if self._count and timestamp == self.last_timestamp:
+            self._write((self._next - 1) % self.capacity, timestamp, values)
+            return
+        if self._count and timestamp < self.last_timestamp:
+            raise ValueError("Bars must be added in time order")
+        self._write(self._next, timestamp, values)
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def extend(self, timestamps, columns):
+        """Adds bars in time order from an int64 timestamp array and {column: array}; missing columns are NaN."""
+        n = len(timestamps)
+        if n == 0:
+            return
+        columns = {c: columns.get(c, np.full(n, np.nan)) for c in COLUMNS}
+        if self._count and timestamps[0] == self.last_timestamp:
+            self.append(int(timestamps[0]), **{c: v[0] for c, v in columns.items()})
+            timestamps, columns, n = timestamps[1:], {c: v[1:] for c, v in columns.items()}, n - 1
+        if n > self.capacity:
+            timestamps, columns, n = timestamps[-self.capacity:], {c: v[-self.capacity:] for c, v in columns.items()}, self.capacity
+        # At most two contiguous runs (before and after the wrap), each written to both halves
+        first = min(n, self.capacity - self._next)
+        for lo, hi, slot in ((0, first, self._next), (first, n, 0)):
+            if lo == hi:
+                continue
+            for base in (slot, slot + self.capacity):
+                self._timestamps[base:base + hi - lo] = timestamps[lo:hi]
+                for c, v in columns.items():
+                    self._columns[c][base:base + hi - lo] = v[lo:hi]
+        self._next = (self._next + n) % self.capacity
+        self._count = min(self._count + n, self.capacity)
+
+    def sync(self, frame):
+        """Brings the ring up to date with a DataFrame of bars (e.g. a fresh history fetch).
+
+        Only the bars from the last known timestamp onwards are written, so
+        the still-forming last bar is revised. If the frame does not contain
+        that bar (a gap, or another source), the ring is reloaded from it.
+        """
+        timestamps = frame.index.as_unit("ns").asi8
+        last = self.last_timestamp
+        start = None
+        if last is not None and len(timestamps) and timestamps[-1] >= last:
+            pos = int(np.searchsorted(timestamps, last))
+            if pos < len(timestamps) and timestamps[pos] == last:
+                start = pos
+        if start is None:
+            self.clear()
+            start = 0
+        self.extend(timestamps[start:], {c: frame[c].to_numpy(dtype=np.float64)[start:] for c in COLUMNS if c in frame.columns})
+        return self
+
+    def window(self, n=None):
+        """The newest n bars (all stored bars by default) as a BarWindow."""
+        n = self._count if n is None else min(n, self._count)
+        end = self._next + self.capacity
+        views = {"timestamps": self._timestamps[end - n:end]}
+        views.update({c: v[end - n:end] for c, v in self._columns.items()})
+        for view in views.values():
+            view.flags.writeable = False
+        timestamps = views.pop("timestamps")
+        return BarWindow(timestamps, views, self.symbol, self.interval)
@@ -0,0 +1,389 @@
+import json
+import os
+import re
+import threading
+import datetime
+import numpy as np
+import pandas as pd
+
+from market_calendar import session_days
+
+
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+# One completed bar per record, UTC epoch nanoseconds first; files only ever grow at the end
+RECORD = np.dtype([("ts", "<i8")] + [(c, "<f8") for c in COLUMNS])
+
+# How far back Yahoo will serve each intraday interval; older gaps need a full backfill
+MAX_LOOKBACK_DAYS = {"1m": 7, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "60m": 730, "90m": 60, "1h": 730}
+
+PERIOD_DAYS = {"d": 1, "wk": 7, "mo": 31, "y": 366}
+
+
+def period_days(period):
+    """Converts a yfinance period string such as '5d' or '1mo' into sessions to keep."""
+    if period in ("max", "ytd"):
+        return None
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    return int(match.group(1)) * PERIOD_DAYS[match.group(2)]
+
+
+def _base(root, symbol, interval):
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", symbol)
+    return os.path.join(root, f"{safe}_{interval}")
+
+
+def series_path(root, symbol, interval):
+    """The .bars file that holds the completed bars of one (symbol, interval) series under `root`."""
+    return _base(root, symbol, interval) + ".bars"
+
+
+def read_records(path, last=None, first=None):
+    """Returns the completed bars in a .bars file as RECORD rows: all, the newest `last` or the oldest `first`."""
+    if not os.path.exists(path):
+        return np.empty(0, dtype=RECORD)
+    count = os.path.getsize(path) // RECORD.itemsize
+    start = 0 if last is None else max(count - last, 0)
+    if first is not None:
+        count = min(count, first)
+    with open(path, "rb") as f:
+        f.seek(start * RECORD.itemsize)
+        return np.fromfile(f, dtype=RECORD, count=count - start)
+
+
+def last_timestamp(path):
+    """UTC epoch nanoseconds of the newest completed bar in a .bars file, or None; reads one record."""
+    records = read_records(path, last=1)
+    return int(records["ts"][0]) if len(records) else None
+
+
+def to_records(frame):
+    records = np.empty(len(frame), dtype=RECORD)
+    records["ts"] = frame.index.as_unit("ns").asi8
+    for c in COLUMNS:
+        records[c] = frame[c].to_numpy(dtype=np.float64) if c in frame.columns else np.nan
+    return records
+
+
+def to_frame(records, tz):
+    index = pd.DatetimeIndex(records["ts"].astype("datetime64[ns]"), tz="UTC").tz_convert(tz)
+    return pd.DataFrame({c: records[c] for c in COLUMNS}, index=index)
+
+
+def _index(timestamps, tz):
+    if tz is None:
+        return pd.DatetimeIndex(timestamps.view("datetime64[ns]"))
+    return pd.DatetimeIndex(timestamps.view("datetime64[ns]"), dtype=pd.DatetimeTZDtype("ns", "UTC")).tz_convert(tz)
+
+
+class _Window:
+    """The newest bars of one series in preallocated arrays that the in-memory DataFrame is a view of.
+
+    Room for `max_bars` more bars is kept past the window, so a new bar is
+    written into the arrays without copying the older ones; when the room
+    runs out, the newest `max_bars` move to new arrays, once per `max_bars`
+    bars. A revision of the forming bar is written in place and so also
+    shows up in frames handed out earlier, like a new fetch of that bar.
+    """
+    def __init__(self, frame, max_bars):
+        self.max_bars = max_bars
+        self.tz = frame.index.tz
+        self._allocate(frame.index.as_unit("ns").asi8, self._values(frame))
+
+    @staticmethod
+    def _values(frame):
+        return np.array([frame[c].to_numpy(dtype=np.float64) if c in frame.columns else np.full(len(frame), np.nan)
+                         for c in COLUMNS]).reshape(len(COLUMNS), len(frame))
+
+    def _allocate(self, timestamps, values):
+        keep = min(len(timestamps), self.max_bars)
+        self._timestamps = np.zeros(self.max_bars + max(keep, self.max_bars), dtype=np.int64)
+        self._columns = np.full((len(COLUMNS), len(self._timestamps)), np.nan)
+        self._timestamps[:keep] = timestamps[len(timestamps) - keep:]
+        self._columns[:, :keep] = values[:, len(timestamps) - keep:]
+        self._count = keep
+        self._frame = None
+
+    @property
+    def last_timestamp(self):
+        return int(self._timestamps[self._count - 1]) if self._count else None
+
+    def frame(self):
+        """The newest max_bars bars as a DataFrame over the arrays; the same object until a bar is added."""
+        if self._frame is None:
+            start = max(self._count - self.max_bars, 0)
+            self._frame = pd.DataFrame(self._columns[:, start:self._count].T, columns=list(COLUMNS),
+                                       index=_index(self._timestamps[start:self._count], self.tz), copy=False)
+        return self._frame
+
+    def merge(self, fresh):
+        """Writes fresh bars that start at or after the last one; returns False if they reach further back."""
+        if fresh.index.tz is not None and self.tz is not None:
+            fresh = fresh.tz_convert(self.tz)
+        fresh = fresh.sort_index()
+        fresh = fresh[~fresh.index.duplicated(keep="last")]
+        timestamps = fresh.index.as_unit("ns").asi8
+        last = self.last_timestamp
+        if last is not None and timestamps[0] < last:
+            return False
+        values = self._values(fresh)
+        if timestamps[0] == last:
+            self._columns[:, self._count - 1] = values[:, 0]
+            timestamps, values = timestamps[1:], values[:, 1:]
+        added = len(timestamps)
+        if not added:
+            return True
+        if self._count + added > len(self._timestamps):
+            start = max(self._count - self.max_bars, 0)
+            self._allocate(np.concatenate([self._timestamps[start:self._count], timestamps]),
+                           np.concatenate([self._columns[:, start:self._count], values], axis=1))
+        else:
+            self._timestamps[self._count:self._count + added] = timestamps
+            self._columns[:, self._count:self._count + added] = values
+            self._count += added
+        self._frame = None
+        return True
+
+
+class BarStore:
+    """Persistent OHLCV bars per (symbol, interval) that only downloads the delta.
+
+    Completed bars of each series go to an append-only .bars file of fixed
+    size records, with the time zone and backfill depth in a small .json
+    beside it. A bar counts as completed once a newer bar has arrived; the
+    still-forming bar lives in memory only, so the frequent revisions of it
+    never touch the disk. The first request backfills the whole period;
+    later requests ask Yahoo only for bars from the last known timestamp
+    onwards.
+
+    Memory holds only the newest `max_bars` of a series; the file keeps
+    every bar ever stored (e.g. years imported by backfill.py), which
+    read() returns.
+    """
+    def __init__(self, root="bar_store", max_bars=50000, fetcher=None):
+        self.root = root
+        self.max_bars = max_bars
+        self.fetcher = fetcher or self._download
+        self._frames = {}
+        self._windows = {}
+        self._backfilled = {}
+        self._tz = {}
+        self._on_disk = {}
+        self._sessions = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _download(symbol, **kwargs):
+        import yfinance as yf
+        return yf.Ticker(symbol).history(**kwargs)
+
+    def _path(self, symbol, interval):
+        return series_path(self.root, symbol, interval)
+
+    def _meta_path(self, symbol, interval):
+        return _base(self.root, symbol, interval) + ".json"
+
+    def _series_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def read(self, symbol, interval):
+        """Returns every completed bar stored for a series, straight from the file; None if there are none."""
+        key = (symbol, interval)
+        with self._series_lock(key):
+            self.load(symbol, interval)
+            if self._on_disk.get(key) is None:
+                return None
+            return to_frame(read_records(self._path(symbol, interval)), self._tz[key])
+
+    def load(self, symbol, interval):
+        """Returns the newest max_bars bars of a series, reading the file on first use."""
+        key = (symbol, interval)
+        if key in self._frames:
+            return self._frames[key]
+        frame, backfilled, tz, on_disk = None, 0, None, None
+        try:
+            meta_path = self._meta_path(symbol, interval)
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                tz, backfilled = meta["tz"], int(meta["backfilled_days"])
+                path = self._path(symbol, interval)
+                records = read_records(path, last=self.max_bars)
+                if len(records):
+                    frame = to_frame(records, tz)
+                    on_disk = (int(read_records(path, first=1)["ts"][0]), int(records["ts"][-1]))
+        except Exception as e:
+            print(f"Bar store read error ({self._path(symbol, interval)}): {e}")
+            frame, backfilled, tz, on_disk = None, 0, None, None
+        self._set_frame(key, frame)
+        self._backfilled[key] = backfilled
+        self._tz[key] = tz
+        self._on_disk[key] = on_disk
+        return frame
+
+    def _write_meta(self, symbol, interval):
+        key = (symbol, interval)
+        path = self._meta_path(symbol, interval)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"tz": self._tz[key], "backfilled_days": self._backfilled.get(key, 0)}, f)
+        os.replace(tmp, path)
+
+    def _rewrite(self, path, records):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            records.tofile(f)
+        os.replace(tmp, path)
+
+    def _append(self, path, records):
+        with open(path, "ab") as f:
+            # A record cut short by a crash would shift every later one
+            extra = f.tell() % RECORD.itemsize
+            if extra:
+                f.truncate(f.tell() - extra)
+                f.seek(0, os.SEEK_END)
+            records.tofile(f)
+
+    def save(self, symbol, interval):
+        """Writes the completed bars not yet on disk: appended after the newest, or prepended after a deeper backfill.
+
+        The last bar in memory may still be forming and is never written.
+        Only the bars newer than the file are converted, so a tick that just
+        revised the forming bar costs one binary search.
+        """
+        key = (symbol, interval)
+        frame = self._frames.get(key)
+        if frame is None or len(frame) < 2:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(symbol, interval)
+        try:
+            index = frame.index.as_unit("ns").asi8
+            on_disk = self._on_disk.get(key)
+            if on_disk is None:
+                self._rewrite(path, to_records(frame.iloc[:-1]))
+                self._write_meta(symbol, interval)
+                first, last = index[0], index[-2]
+            else:
+                first, last = on_disk
+                new_from = index.searchsorted(last, side="right")
+                if index[0] < first:
+                    # Only a backfill that reaches further back than the file; rare, so a rewrite is fine
+                    older = to_records(frame.iloc[:index.searchsorted(first)])
+                    newer = to_records(frame.iloc[new_from:-1])
+                    self._rewrite(path, np.concatenate([older, read_records(path), newer]))
+                    self._write_meta(symbol, interval)
+                    first = index[0]
+                elif new_from < len(index) - 1:
+                    self._append(path, to_records(frame.iloc[new_from:-1]))
+                else:
+                    return
+                last = max(last, index[-2])
+            self._on_disk[key] = (int(first), int(last))
+        except Exception as e:
+            print(f"Bar store write error ({path}): {e}")
+
+    def replace(self, symbol, interval, frame, backfilled_days=0):
+        """Makes `frame` the whole stored series and writes it, e.g. after a bulk import (see backfill.py).
+
+        Every bar of `frame` is taken as completed.
+        """
+        key = (symbol, interval)
+        with self._series_lock(key):
+            self.load(symbol, interval)
+            os.makedirs(self.root, exist_ok=True)
+            records = to_records(frame)
+            self._rewrite(self._path(symbol, interval), records)
+            self._set_frame(key, frame)
+            self._backfilled[key] = max(self._backfilled.get(key, 0), backfilled_days)
+            self._tz[key] = str(frame.index.tz or "UTC")
+            self._write_meta(symbol, interval)
+            self._on_disk[key] = (int(records["ts"][0]), int(records["ts"][-1])) if len(records) else None
+
+    def _set_frame(self, key, frame):
+        window = _Window(frame, self.max_bars) if frame is not None and not frame.empty else None
+        self._windows[key] = window
+        self._frames[key] = window.frame() if window is not None else None
+        return self._frames[key]
+
+    def _merge(self, key, fresh):
+        """Adds fresh bars, letting newer rows replace revised ones; trims the in-memory window, never the file.
+
+        A tick's fetch starts at the forming bar: that row is overwritten in
+        place and only bars after it are appended, so the frame is not
+        copied. A fetch reaching further back (a backfill) rebuilds the window.
+        """
+        fresh = fresh[[c for c in COLUMNS if c in fresh.columns]].astype(np.float64)
+        window = self._windows.get(key)
+        if window is not None and window.merge(fresh):
+            self._frames[key] = window.frame()
+            return self._frames[key]
+        frame = self._frames.get(key)
+        if frame is not None:
+            if fresh.index.tz is not None and frame.index.tz is not None:
+                fresh = fresh.tz_convert(frame.index.tz)
+            fresh = pd.concat([frame, fresh])
+            fresh = fresh[~fresh.index.duplicated(keep="last")].sort_index()
+        return self._set_frame(key, fresh)
+
+    def _needs_backfill(self, key, frame, days, interval):
+        if frame is None or frame.empty:
+            return True
+        if days is None or self._backfilled.get(key, 0) < days:
+            return True
+        limit = MAX_LOOKBACK_DAYS.get(interval)
+        if limit is not None:
+            age = datetime.datetime.now(datetime.timezone.utc) - frame.index[-1].to_pydatetime()
+            if age >= datetime.timedelta(days=limit - 1):
+                return True
+        return False
+
+    def update(self, symbol, period, interval):
+        """Brings a series up to date and returns the bars held in memory."""
+        key = (symbol, interval)
+        with self._series_lock(key):
+            frame = self.load(symbol, interval)
+            days = period_days(period)
+            backfilled = self._backfilled.get(key, 0)
+            if self._needs_backfill(key, frame, days, interval):
+                fresh = self.fetcher(symbol, period=period, interval=interval)
+                if fresh is not None and not fresh.empty:
+                    self._backfilled[key] = max(backfilled, days or 0)
+            else:
+                # Re-request the last known bar so a still-forming bar gets revised
+                fresh = self.fetcher(symbol, start=frame.index[-1].to_pydatetime(), interval=interval)
+            if fresh is not None and not fresh.empty:
+                frame = self._merge(key, fresh)
+                if self._tz.get(key) is None:
+                    self._tz[key] = str(frame.index.tz or "UTC")
+                if self._backfilled[key] != backfilled and self._on_disk.get(key) is not None:
+                    self._write_meta(symbol, interval)
+                self.save(symbol, interval)
+            return frame
+
+    def _session_starts(self, key, frame):
+        """Row positions where each trading session starts (18:00 New York); recomputed only when bars are added."""
+        index = frame.index
+        marker = (len(index), index[0].value, index[-1].value)
+        cached = self._sessions.get(key)
+        if cached is not None and cached[0] == marker:
+            return cached[1]
+        days = session_days(index)
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        self._sessions[key] = (marker, starts)
+        return starts
+
+    def history(self, symbol, period="1d", interval="1d"):
+        """Returns the bars of the last `period` trading sessions, like Ticker.history."""
+        frame = self.update(symbol, period, interval)
+        if frame is None or frame.empty:
+            return pd.DataFrame(columns=list(COLUMNS))
+        days = period_days(period)
+        if days is None:
+            return frame.copy()
+        starts = self._session_starts((symbol, interval), frame)
+        return frame.iloc[starts[-min(days, len(starts))]:]
@@ -0,0 +1,282 @@
+import os
+import re
+import time
+import numpy as np
+from compute_cache import INTERVAL_SECONDS
+
+
+# Metals, gold ETFs and gold priced in EUR/JPY. "A/B" and "A*B" build a
+# derived series from two downloaded legs aligned on A's timestamps.
+DEFAULT_WATCHLIST = "GC=F,SI=F,PL=F,PA=F,GLD,IAU,GC=F/EURUSD=X,GC=F*JPY=X"
+
+DXY_SYMBOL = "DX-Y.NYB"
+
+
+def parse_watchlist(spec=None):
+    """Returns [(name, [legs], op)] from a comma-separated watchlist string."""
+    spec = spec or os.getenv("WATCHLIST", DEFAULT_WATCHLIST)
+    instruments = []
+    for name in (s.strip() for s in spec.split(",")):
+        if not name:
+            continue
+        match = re.fullmatch(r"(.+?)([/*])(.+)", name)
+        if match:
+            instruments.append((name, [match.group(1), match.group(3)], match.group(2)))
+        else:
+            instruments.append((name, [name], None))
+    return instruments
+
+
+def derive_series(closes, legs, op):
+    """Builds one instrument's close series from its downloaded legs."""
+    base = closes.get(legs[0])
+    if base is None or op is None:
+        return base
+    other = closes.get(legs[1])
+    if other is None or other.empty:
+        return None
+    other = other.reindex(base.index, method="ffill")
+    series = base / other if op == "/" else base * other
+    return series.dropna()
+
+
+def closed_series(series, interval, now=None):
+    """A close series without its last bar while that bar is still forming, as closed_bars() does for BarWindows."""
+    seconds = INTERVAL_SECONDS.get(interval)
+    if series is None or series.empty or seconds is None:
+        return series
+    now = time.time() if now is None else now
+    return series.iloc[:-1] if series.index[-1].timestamp() + seconds > now else series
+
+
+def closes_key(closes):
+    """Identifies closed close series as bars_key() does a BarWindow: per symbol, its last bar, last close and length.
+
+    The last close is part of it because Yahoo can still revise a bar
+    shortly after it closed.
+    """
+    key = []
+    for symbol in sorted(closes):
+        series = closes[symbol]
+        if series is None or series.empty:
+            key.append((symbol, None, None, 0))
+            continue
+        close = float(series.iloc[-1])
+        key.append((symbol, series.index[-1].value, close if close == close else None, len(series)))
+    return tuple(key)
+
+
+def stack_closes(series_list, length):
+    """Stacks series into a (length, N) matrix, each right-aligned on its own last bar.
+
+    Every column holds that instrument's own bars, so indicators match a
+    per-symbol computation; shorter histories are NaN-padded at the top.
+    """
+    matrix = np.full((length, len(series_list)), np.nan)
+    counts = np.zeros(len(series_list), dtype=int)
+    for j, series in enumerate(series_list):
+        values = np.asarray(series, dtype=np.float64)[-length:]
+        matrix[length - len(values):, j] = values
+        counts[j] = len(values)
+    return matrix, counts
+
+
+def ema_matrix(Y, span):
+    """Column-wise ewm(span, adjust=False).mean(), starting at each column's first bar."""
+    alpha = 2.0 / (span + 1.0)
+    out = np.full_like(Y, np.nan)
+    ema = np.full(Y.shape[1], np.nan)
+    for t in range(Y.shape[0]):
+        x = Y[t]
+        ema = np.where(np.isnan(ema), x, (1.0 - alpha) * ema + alpha * x)
+        out[t] = ema
+    return out
+
+
+def rolling_mean_matrix(X, window, counts):
+    """Column-wise rolling(window).mean() over each column's own bars."""
+    T = X.shape[0]
+    csum = np.vstack([np.zeros(X.shape[1]), np.cumsum(np.nan_to_num(X), axis=0)])
+    out = np.full_like(X, np.nan)
+    out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    age = np.arange(T)[:, None] - (T - counts)[None, :] + 1
+    out[age < window] = np.nan
+    return out
+
+
+def rsi_matrix(Y, counts, window=14):
+    """Column-wise simple-average RSI for every bar: 100 - 100 / (1 + mean gain / mean loss) over `window` deltas."""
+    delta = np.vstack([np.full(Y.shape[1], np.nan), np.diff(Y, axis=0)])
+    # As with pandas' where(), the undefined first delta counts as 0
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = rolling_mean_matrix(gain, window, counts)
+    avg_loss = rolling_mean_matrix(loss, window, counts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def ema_crossover(ema_fast, ema_slow, counts, lookback=3):
+    """Vectorized GoldAgent.check_ema_crossover; returns (bullish mask, points)."""
+    n = ema_fast.shape[1]
+    bullish = ema_fast[-1] > ema_slow[-1]
+    points = np.zeros(n, dtype=int)
+    decided = np.zeros(n, dtype=bool)
+    for i in range(1, lookback + 1):
+        active = ~decided & (i < counts)
+        up = active & (ema_fast[-i] > ema_slow[-i]) & (ema_fast[-i - 1] <= ema_slow[-i - 1])
+        down = active & ~up & (ema_fast[-i] < ema_slow[-i]) & (ema_fast[-i - 1] >= ema_slow[-i - 1])
+        bullish = np.where(up, True, np.where(down, False, bullish))
+        points[up | down] = 50
+        decided |= up | down
+    return bullish, points
+
+
+def rsi_alignment(Y, rsi, counts, bullish):
+    """Vectorized GoldAgent.check_rsi_alignment; returns the RSI points per column."""
+    price_rising = Y[-1] > Y[-3]
+    # With at least three of the sampled RSI values available, the comparison
+    # is always between the latest RSI and the one from three bars earlier
+    rsi_rising = rsi[-1] > rsi[-4]
+    usable = counts - 3 >= 20
+    aligned = (bullish & price_rising & rsi_rising) | (~bullish & ~price_rising & ~rsi_rising)
+    return np.where(usable & aligned, 20, 0)
+
+
+def regression_forecast(Y, counts, sma_fast, sma_slow, window=48, warmup=19, recent_count=6, recent_weight=3.0):
+    """Vectorized GoldAgent.predict_next_price over the last `window` bars of every column."""
+    y = Y[-(window - warmup):]
+    rows = y.shape[0]
+    usable_rows = np.clip(np.minimum(counts, window) - warmup, 0, rows)
+    w = (np.arange(rows)[:, None] >= rows - usable_rows[None, :]).astype(np.float64)
+    w[-recent_count:] *= recent_weight
+    x = np.arange(rows, dtype=np.float64)[:, None]
+    y0 = np.nan_to_num(y)
+    sw = w.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = (w * x).sum(axis=0) / sw
+        y_mean = (w * y0).sum(axis=0) / sw
+        sxx = (w * (x - x_mean) ** 2).sum(axis=0)
+        slope = np.where(sxx > 0, (w * (x - x_mean) * (y0 - y_mean)).sum(axis=0) / sxx, 0.0)
+    is_up = (slope > 0) & (sma_fast[-1] > sma_slow[-1])
+    price = Y[-1]
+    predicted = price + np.where(is_up, slope, np.where(slope < 0, -np.abs(slope), -1.0))
+    valid = np.minimum(counts, window) >= 25
+    return np.where(valid, predicted, price), slope, is_up
+
+
+def news_sentiment(market_news):
+    """Same Supportive/Opposite/Neutral rule as GoldAgent.institutional_grade_analysis."""
+    pos_count = sum(1 for n in market_news if n['impact'] in ("Positive", "Bullish"))
+    neg_count = sum(1 for n in market_news if n['impact'] in ("Negative", "Caution/Bearish"))
+    if pos_count > neg_count:
+        return "Supportive"
+    if neg_count > pos_count:
+        return "Opposite"
+    return "Neutral"
+
+
+class BatchAnalyzer:
+    """Scores a watchlist in one bulk download and one vectorized pass.
+
+    All instruments are stacked into a (bars, instruments) matrix, so the
+    indicator, regression and scoring work is a handful of array operations
+    regardless of how many symbols are watched. Like GoldAgent's signals,
+    everything is computed on closed bars; a still-forming bar is left out.
+    """
+    def __init__(self, data_provider, instruments=None, period="5d", interval="1h", length=120):
+        self.data = data_provider
+        self.instruments = instruments or parse_watchlist()
+        self.period = period
+        self.interval = interval
+        self.length = length
+
+    def symbols(self):
+        legs = {leg for _, instrument_legs, _ in self.instruments for leg in instrument_legs}
+        return sorted(legs | {DXY_SYMBOL})
+
+    def fetch(self):
+        """Returns {symbol: closed-bar close series} for every leg and DXY, in one bulk download."""
+        closes = self.data.bulk_history(self.symbols(), period=self.period, interval=self.interval)
+        return {symbol: closed_series(series, self.interval) for symbol, series in closes.items()}
+
+    def signals(self, closes=None):
+        """Runs the indicator, trend and regression pass over all instruments; None without enough data.
+
+        Nothing here depends on the news, so the result holds until the next
+        bar closes and score() can be applied to it on every tick.
+        """
+        closes = self.fetch() if closes is None else closes
+
+        names, series_list = [], []
+        for name, legs, op in self.instruments:
+            series = derive_series(closes, legs, op)
+            if series is not None and len(series) >= 25:
+                names.append(name)
+                series_list.append(series)
+        if not names:
+            return None
+
+        Y, counts = stack_closes(series_list, self.length)
+        ema_9, ema_21 = ema_matrix(Y, 9), ema_matrix(Y, 21)
+        rsi = rsi_matrix(Y, counts)
+        sma_5 = rolling_mean_matrix(Y, 5, counts)
+        sma_20 = rolling_mean_matrix(Y, 20, counts)
+
+        bullish, trend_points = ema_crossover(ema_9, ema_21, counts)
+        rsi_points = rsi_alignment(Y, rsi, counts, bullish)
+        predicted, slope, _ = regression_forecast(Y, counts, sma_5, sma_20)
+
+        dxy = closes.get(DXY_SYMBOL)
+        dxy_trend = "Down" if (dxy is not None and len(dxy) > 1 and dxy.iloc[-1] < dxy.iloc[-2]) else "Up"
+        return {
+            "names": names,
+            "last_bars": [series.index[-1].timestamp() for series in series_list],
+            "prices": Y[-1],
+            "rsi": rsi[-1],
+            "bullish": bullish,
+            "trend_points": trend_points,
+            "rsi_points": rsi_points,
+            "predicted": predicted,
+            "slope": slope,
+            "dxy_points": np.where(bullish == (dxy_trend == "Down"), 15, 0),
+        }
+
+    def score(self, signals, market_news=None):
+        """Returns {instrument: result} from signals() and the current news."""
+        if signals is None:
+            return {}
+        bullish, trend_points, rsi_points = signals["bullish"], signals["trend_points"], signals["rsi_points"]
+        predicted, slope, rsi, dxy_points = signals["predicted"], signals["slope"], signals["rsi"], signals["dxy_points"]
+
+        sentiment = news_sentiment(market_news or [])
+        news_points = 0 if sentiment == "Opposite" else 15
+        hard_stop = (bullish & (sentiment == "Opposite")) | (~bullish & (sentiment == "Supportive"))
+
+        confidence = np.where(hard_stop, 0, trend_points + rsi_points + news_points + dxy_points)
+
+        results = {}
+        for j, name in enumerate(signals["names"]):
+            price = float(signals["prices"][j])
+            results[name] = {
+                "price": price,
+                "last_bar": signals["last_bars"][j],
+                "trend_signal": "BULLISH" if bullish[j] else "BEARISH",
+                "prediction": "Strong UP" if bullish[j] else "Strong DOWN",
+                "predicted_price": float(predicted[j]),
+                "pct_change": (float(predicted[j]) - price) / price * 100,
+                "slope": float(slope[j]),
+                "rsi": float(rsi[j]) if np.isfinite(rsi[j]) else None,
+                "confidence": int(confidence[j]),
+                "score_breakdown": {
+                    "trend": int(trend_points[j]),
+                    "rsi": int(rsi_points[j]),
+                    "news": 0 if hard_stop[j] else news_points,
+                    "dxy": 0 if hard_stop[j] else int(dxy_points[j]),
+                },
+            }
+        return results
+
+    def analyze(self, market_news=None):
+        """Returns {instrument: result} for every instrument with enough data."""
+        return self.score(self.signals(), market_news)
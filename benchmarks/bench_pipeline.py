@@ -0,0 +1,199 @@
+"""Offline benchmark of the analysis pipeline against recorded fixtures.
+
+Record a session once (live network, or --synthetic bars and headlines
+without it), then replay it as often as needed:
+
+    python benchmarks/bench_pipeline.py --record --ticks 3
+    python benchmarks/bench_pipeline.py --record --synthetic
+    python benchmarks/bench_pipeline.py --repeat 20 --output bench.json
+
+Each stage is timed over --repeat runs with every cache reset in between,
+then run once more under tracemalloc for allocation figures. Runs fail on
+a regression against benchmarks/baseline_pipeline.json (or --baseline),
+which was measured on --synthetic fixtures; refresh it with --output on
+the machine that runs the check.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_pipeline.json")
+
+BAR_SECONDS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+SYNTHETIC_FEED = b"""<?xml version="1.0"?><rss version="2.0"><channel><title>Gold</title>
+<item><title>Gold rises as dollar weakens ahead of Fed minutes</title><pubDate>Mon, 05 Jan 2026 10:00:00 GMT</pubDate></item>
+<item><title>Gold holds steady while traders await jobs data</title><pubDate>Mon, 05 Jan 2026 09:00:00 GMT</pubDate></item>
+<item><title>Central bank buying supports bullion demand</title><pubDate>Mon, 05 Jan 2026 08:00:00 GMT</pubDate></item>
+</channel></rss>"""
+
+
+class SyntheticSource:
+    """Deterministic random-walk bars up to the current time, standing in for Yahoo when recording offline."""
+    def history(self, symbol, period="1d", interval="1d", **kwargs):
+        import numpy as np
+        import pandas as pd
+        from bar_store import period_days
+        seconds = BAR_SECONDS[interval]
+        count = int((period_days(period) or 30) * 86400 / seconds)
+        # At most the bars a session of each interval holds, so 1m requests stay small
+        count = min(count, 1380 if interval == "1m" else count)
+        end = pd.Timestamp(time.time() // seconds * seconds, unit="s", tz="UTC")
+        index = pd.date_range(end=end, periods=count, freq=pd.Timedelta(seconds=seconds))
+        rng = np.random.default_rng(sum(map(ord, symbol)))
+        level = 100.0 if symbol.startswith("DX") else 2000.0 + 10 * (sum(map(ord, symbol)) % 50)
+        closes = level * np.exp(np.cumsum(rng.normal(0, 0.002 * math.sqrt(seconds / 3600), count)))
+        return pd.DataFrame({"Open": closes, "High": closes * 1.001, "Low": closes * 0.999, "Close": closes,
+                             "Volume": 0.0}, index=index)
+
+    def download(self, tickers, period="5d", interval="1h", **kwargs):
+        import pandas as pd
+        frames = {symbol: self.history(symbol, period=period, interval=interval) for symbol in tickers}
+        return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+
+class SyntheticNewsSource:
+    def fetch(self, url, headers=None, timeout=10):
+        return SYNTHETIC_FEED
+
+
+def load_pipeline(mode, fixtures):
+    """Imports the agent and app with providers switched to record/replay."""
+    os.environ["GOLD_PROVIDER_MODE"] = mode
+    os.environ["GOLD_FIXTURES_DIR"] = fixtures
+    # Keep the app's SQLite state out of the working tree
+    os.environ.setdefault("GOLD_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="gold-bench-"), "bench.db"))
+    import gold_agent
+    import app
+    gold_agent.use_providers(mode, fixtures)
+    return gold_agent, app
+
+
+def reset(gold_agent):
+    """Puts caches and the replay position back to a cold start."""
+    gold_agent.market_data.invalidate()
+    gold_agent._last_inputs.clear()
+    with gold_agent._indicator_lock:
+        gold_agent._indicator_engines.clear()
+    with gold_agent._bar_lock:
+        gold_agent._bar_rings.clear()
+    gold_agent.compute_cache.clear()
+    store = getattr(gold_agent.default_price_source, "store", None)
+    if store is not None:
+        store.rewind()
+    news_store = getattr(gold_agent.default_news_source, "store", None)
+    if news_store is not None:
+        news_store.rewind()
+
+
+def stages(gold_agent, app):
+    agent = lambda: gold_agent.GoldAgent()
+    return {
+        "fetch_current_price": lambda: agent().fetch_current_price(),
+        "institutional_grade_analysis": lambda: agent().institutional_grade_analysis(),
+        "get_backtest_data": lambda: agent().get_backtest_data(n_points=12),
+        "get_model_accuracy": lambda: agent().get_model_accuracy(),
+        "app.job": app.job,
+    }
+
+
+def measure(gold_agent, fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        reset(gold_agent)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    reset(gold_agent)
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size for stat in snapshot.statistics("filename"))
+
+    timings.sort()
+    return {
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "min_ms": timings[0],
+        "peak_kib": peak / 1024,
+        "retained_kib": allocated / 1024,
+    }
+
+
+def compare(results, baseline, tolerance, min_delta=0.0):
+    """Returns the stages whose mean latency regressed past the tolerance and by more than min_delta ms."""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base and stats["mean_ms"] > max(base["mean_ms"] * (1 + tolerance), base["mean_ms"] + min_delta):
+            regressions.append(f"{name}: {stats['mean_ms']:.2f}ms vs baseline {base['mean_ms']:.2f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default="fixtures", help="fixture directory")
+    parser.add_argument("--record", action="store_true", help="record live responses instead of benchmarking")
+    parser.add_argument("--ticks", type=int, default=1, help="jobs to record (with --record)")
+    parser.add_argument("--synthetic", action="store_true", help="record generated bars and headlines (no network)")
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per stage")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", default=BASELINE, help="fail if slower than this results file ('' to skip)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline")
+    parser.add_argument("--min-delta", type=float, default=1.0,
+                        help="slowdowns of fewer ms than this are noise, however large relative to a sub-ms stage")
+    args = parser.parse_args()
+
+    if args.record:
+        gold_agent, app = load_pipeline("record", args.fixtures)
+        if args.synthetic:
+            gold_agent.default_price_source.live = SyntheticSource()
+            gold_agent.default_news_source.live = SyntheticNewsSource()
+        for tick in range(args.ticks):
+            if tick:
+                time.sleep(10)
+            # The stages fetch the same series as the job, so one job records everything they replay
+            app.job()
+            gold_agent.market_data.invalidate()
+        print(f"Recorded {args.ticks} tick(s) into {args.fixtures}")
+        return 0
+
+    gold_agent, app = load_pipeline("replay", args.fixtures)
+    results = {name: measure(gold_agent, fn, args.repeat) for name, fn in stages(gold_agent, app).items()}
+
+    print(f"{'stage':32} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'peak KiB':>10} {'retained KiB':>13}")
+    for name, stats in results.items():
+        print(f"{name:32} {stats['mean_ms']:9.2f} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} "
+              f"{stats['peak_kib']:10.1f} {stats['retained_kib']:13.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
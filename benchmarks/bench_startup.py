@@ -0,0 +1,97 @@
+"""Startup benchmark: time from spawning a web process to its first `/` response.
+
+By default the benchmark holds the leader lock itself, so each spawned
+process starts the way an autoscaled extra worker does: as a follower that
+only serves shared snapshots. --as-leader measures a process that wins the
+election and starts the analysis as well.
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 5 --as-leader
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_index(port, proc, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as resp:
+                if resp.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.005)
+    raise TimeoutError(f"No response on port {port} within {timeout}s")
+
+
+def spawn_once(env, timeout):
+    port = free_port()
+    env = dict(env, PORT=str(port))
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "app.py"], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_index(port, proc, timeout)
+        return time.perf_counter() - started
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def import_time(env):
+    """Seconds to import app in a fresh interpreter, without serving."""
+    out = subprocess.run([sys.executable, "-c", "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--as-leader", action="store_true", help="let the spawned process become the leader")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="gold-startup-")
+    env = dict(os.environ,
+               SHARED_STATE_DIR=os.path.join(workdir, "shared_state"),
+               GOLD_DB_PATH=os.path.join(workdir, "bench.db"),
+               OUTBOX_DIR=os.path.join(workdir, "outbox"))
+
+    lock = None
+    if not args.as_leader:
+        from shared_state import LeaderLock
+        lock = LeaderLock(os.path.join(env["SHARED_STATE_DIR"], "leader.lock"))
+        lock.try_acquire()
+
+    imports = [import_time(env) for _ in range(args.runs)]
+    spawns = [spawn_once(env, args.timeout) for _ in range(args.runs)]
+    if lock is not None:
+        lock.release()
+
+    role = "leader" if args.as_leader else "follower"
+    print(f"import app:               median {statistics.median(imports) * 1000:8.1f} ms  min {min(imports) * 1000:8.1f} ms")
+    print(f"spawn -> first / ({role}): median {statistics.median(spawns) * 1000:8.1f} ms  min {min(spawns) * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
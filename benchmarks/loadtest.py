@@ -0,0 +1,342 @@
+"""HTTP load test of the dashboard against replayed data (no network).
+
+Starts the app under the dev server and/or gunicorn with replay providers,
+then has many concurrent clients request `/`, `/api/latest` and the static
+assets for a fixed time while --streams dashboards hold `/api/stream` open.
+Each server runs twice: "idle", where the scheduler has gone quiet after
+its first job, and "busy", where a job runs every --busy-tick seconds so
+requests compete with it for the GIL. In the busy phase every replayed
+price response moves the last bar a little, so each job really recomputes
+instead of hitting the compute cache.
+
+    python benchmarks/loadtest.py --clients 50 --duration 15 --output load.json
+    python benchmarks/loadtest.py --server gunicorn --workers 4 --baseline load.json
+
+Reports requests per second and p50/p99 latency per endpoint, and exits 1
+when throughput drops or p99 latency grows past the tolerance relative to
+benchmarks/baseline_load.json (or --baseline), or when any request fails.
+The committed baseline was measured with the defaults on --synthetic
+fixtures (see bench_pipeline.py); refresh it with --output on the machine
+that runs the check.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import pickle
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_startup import ROOT, free_port, wait_for_index
+
+# Relative weights of the requests one dashboard makes: it polls the state and (re)loads the page and its assets
+REQUEST_MIX = (
+    ("/api/latest", 6),
+    ("/", 1),
+    ("/static/script.js", 1),
+    ("/static/style.css", 1),
+)
+
+PHASES = {"idle": 3600, "busy": None}
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_load.json")
+
+
+def vary_fixtures(fixtures, target, count):
+    """Copies a fixture directory, giving every recorded price request `count` responses.
+
+    Response i is the last recorded one with the numbers of its final bar
+    scaled by a small factor that changes from one response to the next,
+    like a forming bar moving between ticks.
+    """
+    shutil.copytree(fixtures, target)
+    for kind in ("history", "download"):
+        root = os.path.join(target, kind)
+        if not os.path.isdir(root):
+            continue
+        for request in os.listdir(root):
+            path = os.path.join(root, request)
+            recorded = sorted(n for n in os.listdir(path) if n.endswith(".pkl"))
+            if not recorded:
+                continue
+            with open(os.path.join(path, recorded[-1]), "rb") as f:
+                frame = pickle.load(f)
+            if frame is None or frame.empty:
+                continue
+            numeric = frame.select_dtypes("floating").columns
+            last = frame[numeric].iloc[-1].copy()
+            for i in range(len(recorded), count):
+                frame.loc[frame.index[-1], numeric] = last * (1 + 0.001 * math.sin(i))
+                with open(os.path.join(path, f"{i:05d}.pkl"), "wb") as f:
+                    pickle.dump(frame, f)
+
+
+def start_server(kind, port, fixtures, tick_interval, workers, workdir):
+    env = dict(os.environ,
+               PORT=str(port),
+               GOLD_PROVIDER_MODE="replay",
+               GOLD_FIXTURES_DIR=fixtures,
+               GOLD_IGNORE_MARKET_HOURS="1",
+               TICK_INTERVAL=str(tick_interval),
+               SHARED_STATE_DIR=os.path.join(workdir, "shared_state"),
+               GOLD_DB_PATH=os.path.join(workdir, "load.db"),
+               OUTBOX_DIR=os.path.join(workdir, "outbox"),
+               PROFILE_DIR=os.path.join(workdir, "profiles"),
+               BAR_STORE_DIR=os.path.join(workdir, "bar_store"),
+               WEB_CONCURRENCY=str(workers))
+    if kind == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+    else:
+        command = [sys.executable, "app.py"]
+    return subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class Client(threading.Thread):
+    """One dashboard: a keep-alive connection issuing requests from REQUEST_MIX back to back."""
+    def __init__(self, port, deadline, warmup_until, seed):
+        super().__init__(daemon=True)
+        self.port = port
+        self.deadline = deadline
+        self.warmup_until = warmup_until
+        self.random = random.Random(seed)
+        self.paths, weights = zip(*REQUEST_MIX)
+        self.weights = weights
+        self.samples = {path: [] for path in self.paths}
+        self.errors = {path: 0 for path in self.paths}
+        self.conn = None
+
+    def request(self, path):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        self.conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+        response = self.conn.getresponse()
+        response.read()
+        if response.will_close:
+            self.conn.close()
+            self.conn = None
+        return response.status
+
+    def run(self):
+        while True:
+            path = self.random.choices(self.paths, self.weights)[0]
+            started = time.perf_counter()
+            if started >= self.deadline:
+                break
+            try:
+                status = self.request(path)
+                ok = status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+                if self.conn is not None:
+                    self.conn.close()
+                self.conn = None
+            if started < self.warmup_until:
+                continue
+            if ok:
+                self.samples[path].append((time.perf_counter() - started) * 1000)
+            else:
+                self.errors[path] += 1
+        if self.conn is not None:
+            self.conn.close()
+
+
+class StreamClient(threading.Thread):
+    """One dashboard on live updates: holds /api/stream open and counts the events it receives."""
+    def __init__(self, port):
+        super().__init__(daemon=True)
+        self.port = port
+        self.conn = None
+        self.status = None
+        self.events = 0
+
+    def run(self):
+        try:
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            self.conn.request("GET", "/api/stream")
+            response = self.conn.getresponse()
+            self.status = response.status
+            if response.status != 200:
+                response.read()
+                return
+            while True:
+                line = response.fp.readline()
+                if not line:
+                    break
+                if line.startswith(b"event:"):
+                    self.events += 1
+        except (OSError, http.client.HTTPException):
+            pass
+
+    def stop(self):
+        """Hangs up, which also ends the read loop."""
+        sock = self.conn.sock if self.conn is not None else None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.join(5)
+        if self.conn is not None:
+            self.conn.close()
+
+
+def summarize(latencies, errors, seconds):
+    latencies = sorted(latencies)
+    n = len(latencies)
+    return {
+        "requests": n,
+        "errors": errors,
+        "rps": n / seconds,
+        "p50_ms": latencies[n // 2] if n else None,
+        "p99_ms": latencies[min(n - 1, int(n * 0.99))] if n else None,
+    }
+
+
+def run_load(port, clients, duration, warmup, streams=0):
+    """Drives the server with `clients` concurrent clients while `streams` SSE connections stay open.
+
+    Returns {path: summary} plus "all", whose "streams" entry says how
+    many streams were accepted and refused and how many events they got.
+    """
+    listeners = [StreamClient(port) for _ in range(streams)]
+    for listener in listeners:
+        listener.start()
+    now = time.perf_counter()
+    workers = [Client(port, now + warmup + duration, now + warmup, seed) for seed in range(clients)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    for listener in listeners:
+        listener.stop()
+    results = {}
+    for path, _ in REQUEST_MIX:
+        results[path] = summarize([ms for w in workers for ms in w.samples[path]],
+                                  sum(w.errors[path] for w in workers), duration)
+    results["all"] = summarize([ms for w in workers for s in w.samples.values() for ms in s],
+                               sum(sum(w.errors.values()) for w in workers), duration)
+    results["all"]["streams"] = {
+        "open": sum(listener.status == 200 for listener in listeners),
+        "refused": sum(listener.status not in (None, 200) for listener in listeners),
+        "events": sum(listener.events for listener in listeners),
+    }
+    return results
+
+
+def jobs_run(port):
+    """Scheduler jobs the server has run so far, from its /metrics."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", "/metrics")
+    body = conn.getresponse().read().decode("utf-8")
+    conn.close()
+    return sum(int(float(line.rsplit(" ", 1)[1])) for line in body.splitlines() if line.startswith("gold_agent_ticks_total"))
+
+
+def run_case(kind, phase, args):
+    workdir = tempfile.mkdtemp(prefix="gold-load-")
+    port = free_port()
+    tick = PHASES[phase] or args.busy_tick
+    fixtures = os.path.abspath(args.fixtures)
+    if PHASES[phase] is None:
+        # Enough distinct responses for every job of the run, plus startup
+        fixtures = os.path.join(workdir, "fixtures")
+        vary_fixtures(os.path.abspath(args.fixtures), fixtures, int((args.warmup + args.duration) / tick) + 60)
+    proc = start_server(kind, port, fixtures, tick, args.workers, workdir)
+    try:
+        wait_for_index(port, proc, args.timeout)
+        # The first /api/latest waits for the first job, so the measured phase starts with data
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=args.timeout)
+        conn.request("GET", "/api/latest")
+        conn.getresponse().read()
+        conn.close()
+        jobs = jobs_run(port)
+        results = run_load(port, args.clients, args.duration, args.warmup, args.streams)
+        # Confirms the busy phase really overlapped jobs (and the idle one did not)
+        results["all"]["jobs"] = jobs_run(port) - jobs
+        return results
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            # gunicorn waits out its graceful timeout for streams still parked on their keep-alive wait
+            proc.kill()
+            proc.wait()
+
+
+def compare(results, baseline, tolerance):
+    """Returns the cases whose throughput or p99 latency regressed past the tolerance, and any failures."""
+    regressions = []
+    for case, endpoints in results.items():
+        for path, stats in endpoints.items():
+            if stats["errors"] and path != "all":
+                regressions.append(f"{case} {path}: {stats['errors']} failed requests")
+            base = baseline.get(case, {}).get(path)
+            if not base or not stats["requests"] or not base["requests"]:
+                continue
+            if stats["rps"] < base["rps"] * (1 - tolerance):
+                regressions.append(f"{case} {path}: {stats['rps']:.0f} req/s vs baseline {base['rps']:.0f} req/s")
+            if stats["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+                regressions.append(f"{case} {path}: p99 {stats['p99_ms']:.1f}ms vs baseline {base['p99_ms']:.1f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default="fixtures", help="fixture directory (see bench_pipeline.py --record)")
+    parser.add_argument("--server", choices=("dev", "gunicorn", "both"), default="both")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent dashboards")
+    parser.add_argument("--streams", type=int, default=4, help="dashboards holding /api/stream open during the run")
+    parser.add_argument("--duration", type=float, default=15, help="measured seconds per case")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds before each case")
+    parser.add_argument("--busy-tick", type=float, default=1, help="seconds between jobs in the busy phase")
+    parser.add_argument("--phase", choices=("idle", "busy", "both"), default="both")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for a server to come up")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", default=BASELINE, help="fail if worse than this results file ('' to skip)")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed throughput drop / p99 growth vs baseline (tail latency under load is noisy)")
+    args = parser.parse_args()
+
+    servers = ("dev", "gunicorn") if args.server == "both" else (args.server,)
+    phases = tuple(PHASES) if args.phase == "both" else (args.phase,)
+    results = {}
+    for kind in servers:
+        for phase in phases:
+            case = f"{kind}/{phase}"
+            print(f"Running {case}: {args.clients} clients for {args.duration:.0f}s...", file=sys.stderr)
+            results[case] = run_case(kind, phase, args)
+
+    print(f"{'case':16} {'endpoint':20} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for case, endpoints in results.items():
+        streams = endpoints["all"]["streams"]
+        print(f"{case:16} ({endpoints['all']['jobs']} scheduler jobs during the run; {streams['open']} streams open, "
+              f"{streams['refused']} refused, {streams['events']} events)")
+        for path, stats in endpoints.items():
+            p50 = f"{stats['p50_ms']:9.2f}" if stats["requests"] else f"{'-':>9}"
+            p99 = f"{stats['p99_ms']:9.2f}" if stats["requests"] else f"{'-':>9}"
+            print(f"{case:16} {path:20} {stats['rps']:9.1f} {p50} {p99} {stats['errors']:7d}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from bar_store import last_timestamp, read_records, series_path
+from metrics import metrics
+from regression import rolling_forecasts
+
+
+HOUR = 3600
+
+# Named views of /api/chart and the span (seconds) they cover up to now
+RANGES = {"day": 86400, "week": 7 * 86400, "month": 30 * 86400}
+
+DEFAULT_POINTS = 300
+MAX_POINTS = 2000
+
+# Hourly bars behind each backtest prediction, about the 5 sessions get_backtest_data trains on
+BACKTEST_WINDOW = 115
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the shape of (x, y).
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previous
+    pick and the mean of the next bucket, so peaks and troughs survive.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    picked = np.empty(threshold, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+            cx, cy = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        # Twice the triangle area, for every candidate of the bucket at once
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+
+def _values(array):
+    return [None if np.isnan(v) else float(v) for v in array]
+
+
+class ChartHistory:
+    """Time-range chart series from stored hourly bars and locked snapshots.
+
+    Actual prices come from the bar store, overridden by the locked snapshot
+    of the same hour like the live chart does; locked predictions from the
+    snapshot store; backtest predictions from a sliding-window OLS over the
+    bars. Ranges are cut at whole hours and end at the last completed bar,
+    so the encoded response for a (range, point count) only changes once an
+    hour and is cached until then.
+    """
+    def __init__(self, snapshot_store, bar_root="bar_store", symbol="GC=F", interval="1h",
+                 backtest_window=BACKTEST_WINDOW, cache_size=64):
+        self.snapshot_store = snapshot_store
+        self.path = series_path(bar_root, symbol, interval)
+        self.backtest_window = backtest_window
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._bars = (None, np.empty(0), np.empty(0), np.empty(0))
+        self._cache = OrderedDict()
+
+    def bars(self):
+        """Returns (version, timestamps, closes, backtest predictions), re-read when a bar completes.
+
+        The version is the timestamp of the last completed bar, read from the
+        end of the file, so ticks that only revise the forming bar keep it.
+        """
+        try:
+            version = last_timestamp(self.path)
+        except OSError:
+            version = None
+        if version is None:
+            return None, np.empty(0), np.empty(0), np.empty(0)
+        with self._lock:
+            if self._bars[0] == version:
+                return self._bars
+        try:
+            records = read_records(self.path)
+            timestamps = records["ts"] / 1e9
+            closes = records["Close"].copy()
+        except Exception as e:
+            print(f"Chart bar read error ({self.path}): {e}")
+            return None, np.empty(0), np.empty(0), np.empty(0)
+        bars = (version, timestamps, closes, rolling_forecasts(closes, self.backtest_window))
+        with self._lock:
+            self._bars = bars
+        return bars
+
+    def series(self, start, end, points):
+        """Builds the chart dict for bars with start <= ts < end, downsampled to at most `points`."""
+        _, timestamps, closes, backtest = self.bars()
+        lo, hi = np.searchsorted(timestamps, [start, end])
+        bar_ts = timestamps[lo:hi]
+        snapshots = self.snapshot_store.range(start, end - 1)
+
+        labels = np.union1d(bar_ts - bar_ts % HOUR, np.fromiter(snapshots, dtype=np.float64, count=len(snapshots)))
+        actual = np.full(len(labels), np.nan)
+        predicted = np.full(len(labels), np.nan)
+        backtested = np.full(len(labels), np.nan)
+        at = np.searchsorted(labels, bar_ts - bar_ts % HOUR)
+        actual[at] = closes[lo:hi]
+        backtested[at] = backtest[lo:hi]
+        for ts, snap in snapshots.items():
+            i = np.searchsorted(labels, ts)
+            actual[i] = snap["actual"]
+            predicted[i] = snap["predicted"]
+
+        picked = lttb(labels, actual, points)
+        return {
+            "start": start,
+            "end": end,
+            "source_points": len(labels),
+            "labels": labels[picked].tolist(),
+            "prices": _values(actual[picked]),
+            "locked_prediction": _values(predicted[picked]),
+            "backtest_prediction": _values(backtested[picked]),
+        }
+
+    def response(self, start, end, points):
+        """Returns (etag, json body, gzip body) for a range, from cache while its data is unchanged."""
+        start, end = start - start % HOUR, end - end % HOUR
+        recent = self.snapshot_store.recent(1)
+        key = (start, end, points, self.bars()[0], recent[0][0] if recent else None)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+        if cached is not None:
+            metrics.inc("chart_cache_hits_total", "Chart ranges served from cache")
+            return cached
+        metrics.inc("chart_cache_misses_total", "Chart ranges built")
+        with metrics.timed("chart_build"):
+            body = json.dumps(self.series(start, end, points)).encode("utf-8")
+        cached = (hashlib.blake2b(body, digest_size=8).hexdigest(), body, gzip.compress(body, compresslevel=6))
+        with self._lock:
+            self._cache[key] = cached
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return cached
+
+
+def parse_range(args, now=None):
+    """Reads (start, end, points) from request args: range=day|week|month, or start/end epoch seconds."""
+    now = time.time() if now is None else now
+    points = min(max(int(args.get("points", DEFAULT_POINTS)), 3), MAX_POINTS)
+    end = float(args.get("end", now))
+    if "start" in args:
+        start = float(args["start"])
+    else:
+        view = args.get("range", "day")
+        if view not in RANGES:
+            raise ValueError(f"Unknown range: {view}")
+        start = end - RANGES[view]
+    if not (math.isfinite(start) and math.isfinite(end)):
+        raise ValueError("start and end must be finite")
+    if start >= end:
+        raise ValueError("start must be before end")
+    return start, end, points
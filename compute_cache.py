@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from metrics import metrics
+
+
+# Bar length per yfinance interval, to tell a still-forming last bar from a closed one
+INTERVAL_SECONDS = {"1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "90m": 5400,
+                    "1h": 3600, "1d": 86400}
+
+
+def closed_bars(bars, now=None):
+    """The closed bars of a BarWindow: without the last bar while it is still forming (zero-copy)."""
+    seconds = INTERVAL_SECONDS.get(bars.interval)
+    if not len(bars) or seconds is None:
+        return bars
+    now = time.time() if now is None else now
+    if bars.timestamps[-1] / 1e9 + seconds > now:
+        return bars.head(len(bars) - 1)
+    return bars
+
+
+def bars_key(bars):
+    """Identifies the data in a BarWindow of closed bars: its series, first and last bar, last close and length.
+
+    Pass closed_bars(...): the forming bar's close moves on almost every
+    tick, so a result that depended on it would never be reused. With
+    closed bars the key only changes when a bar closes (or the window
+    slides), and every tick in between is a hit. The last close is part of
+    it because Yahoo can still revise a bar shortly after it closed.
+    """
+    if not len(bars):
+        return (bars.symbol, bars.interval, None, None, None, 0)
+    close = float(bars.close[-1])
+    return (bars.symbol, bars.interval, int(bars.timestamps[0]), int(bars.timestamps[-1]),
+            close if close == close else None, len(bars))
+
+
+class ComputeCache:
+    """Bounded LRU of computed results (fitted models, backtests, scores) keyed by their inputs.
+
+    Keys are (kind, bars_key(closed_bars(...)), parameters...), so a result
+    is reused for as long as no new bar closes: every 10s tick within an
+    hourly bar after the first. Results are shared between callers
+    and must not be modified. Exceptions are not cached.
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+        self.evictions = 0
+        metrics.register(self._gauges)
+
+    def get(self, key, compute):
+        """Returns the result stored for `key` (whose first item is its kind), or stores `compute()`."""
+        kind = key[0]
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits[kind] = self._hits.get(kind, 0) + 1
+                return self._entries[key]
+            self._misses[kind] = self._misses.get(kind, 0) + 1
+
+        result = compute()
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns {kind: {hits, misses, hit_ratio}} plus totals under "all"."""
+        with self._lock:
+            kinds = {kind: (self._hits.get(kind, 0), self._misses.get(kind, 0))
+                     for kind in set(self._hits) | set(self._misses)}
+            entries, evictions = len(self._entries), self.evictions
+        kinds["all"] = (sum(h for h, _ in kinds.values()), sum(m for _, m in kinds.values()))
+        stats = {kind: {"hits": hits, "misses": misses, "hit_ratio": hits / (hits + misses) if hits + misses else 0.0}
+                 for kind, (hits, misses) in kinds.items()}
+        stats["all"].update(entries=entries, evictions=evictions)
+        return stats
+
+    def _gauges(self):
+        gauges = []
+        for kind, entry in self.stats().items():
+            if kind == "all":
+                gauges.append(("compute_cache_entries", "Results held by the compute cache", entry["entries"], {}))
+                gauges.append(("compute_cache_evictions", "Results dropped as least recently used", entry["evictions"], {}))
+                continue
+            gauges.append(("compute_cache_hits", "Computations served from cache", entry["hits"], {"kind": kind}))
+            gauges.append(("compute_cache_misses", "Computations that ran", entry["misses"], {"kind": kind}))
+            gauges.append(("compute_cache_hit_ratio", "Share of computations served from cache", entry["hit_ratio"], {"kind": kind}))
+        return gauges
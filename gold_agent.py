@@ -1,22 +1,272 @@
-import yfinance as yf
 import pandas as pd
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 import datetime
 from dotenv import load_dotenv
 import numpy as np
-from sklearn.linear_model import LinearRegression
-import requests
-from bs4 import BeautifulSoup
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from bar_store import BarStore
+from regression import ols_fit, walk_forward_predictions, trend_forecasts
+from indicators import IndicatorEngine
+from bar_buffer import BarRing, BarWindow
+from batch_analysis import BatchAnalyzer, closes_key
+from providers import build_providers
+from metrics import metrics
+from news_feed import headlines
+from outbox import split_recipients
+from source_chain import SourceChain
+from compute_cache import ComputeCache, bars_key, closed_bars
 
 # Load environment variables
 load_dotenv()
 
-class GoldAgent:
+
+class _InFlight:
+    """A download in progress that other callers can wait on."""
     def __init__(self):
-        self.ticker = "GC=F"
+        self.event = threading.Event()
+        self.frame = None
+        self.error = None
+
+
+class MarketDataProvider:
+    """Shared yfinance history cache keyed by (symbol, period, interval).
+
+    Concurrent requests for the same key wait on a single download instead
+    of issuing their own. Once begin_tick() has been called, entries last
+    until the next call, so every series is downloaded at most once per
+    tick however long the tick runs; before that (scripts, benchmarks) they
+    expire after a per-interval TTL. When a BarStore is attached, a miss
+    only downloads the bars newer than those on disk.
+    """
+    # Only used without ticks; shorter than the 10s scheduler tick so a caller polling at that rate sees fresh bars
+    DEFAULT_TTLS = {"1m": 5, "1h": 5, "1d": 60}
+
+    def __init__(self, ttls=None, default_ttl=5, bar_store=None, source=None):
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.bar_store = bar_store
+        self.source = source or build_providers("live")[0]
+        self._cache = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def begin_tick(self):
+        """Starts a new tick: everything cached so far is stale, everything fetched from now on lasts until the next one."""
+        with self._lock:
+            self.generation += 1
+            self._cache.clear()
+
+    def _cached(self, key, ttl, load):
+        """Returns a cached value for `key`, or runs `load` once for all concurrent callers."""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and (self.generation or time.monotonic() - entry[0] < ttl):
+                self.hits += 1
+                return entry[1]
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = _InFlight()
+                self._inflight[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.frame
+
+        generation = self.generation
+        try:
+            frame = load()
+            flight.frame = frame
+            with self._lock:
+                # A download that straddled begin_tick() belongs to the previous tick
+                if generation == self.generation:
+                    self._cache[key] = (time.monotonic(), frame)
+            return frame
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.event.set()
+
+    def history(self, symbol, period="1d", interval="1d"):
+        """Returns the cached history frame for a series, downloading it if stale.
+
+        The returned DataFrame is shared between callers and must not be modified in place.
+        """
+        def load():
+            if self.bar_store is not None:
+                frame = self.bar_store.history(symbol, period=period, interval=interval)
+            else:
+                frame = self.source.history(symbol, period=period, interval=interval)
+            # Lets indicator state be tracked per series
+            frame.attrs.update(symbol=symbol, interval=interval)
+            return frame
+
+        return self._cached((symbol, period, interval), self.ttls.get(interval, self.default_ttl), load)
+
+    def bulk_history(self, symbols, period="5d", interval="1h"):
+        """Returns {symbol: Close series} for many symbols fetched in one yfinance request."""
+        symbols = tuple(sorted(set(symbols)))
+
+        def load():
+            frame = self.source.download(list(symbols), period=period, interval=interval, group_by="column",
+                                         auto_adjust=False, progress=False, threads=True)
+            closes = frame["Close"] if isinstance(frame.columns, pd.MultiIndex) else frame[["Close"]].set_axis(list(symbols), axis=1)
+            return {symbol: closes[symbol].dropna() for symbol in symbols if symbol in closes.columns}
+
+        return self._cached((symbols, period, interval), self.ttls.get(interval, self.default_ttl), load)
+
+    def invalidate(self, symbol=None):
+        """Drops cached entries for one symbol, or all of them."""
+        with self._lock:
+            for key in list(self._cache):
+                if symbol is None or key[0] == symbol or (isinstance(key[0], tuple) and symbol in key[0]):
+                    del self._cache[key]
+
+    def stats(self):
+        """Returns hit/miss counters for the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "entries": len(self._cache),
+            }
+
+
+# Where prices, news and email go: 'live', or 'record'/'replay' against fixture files
+PROVIDER_MODE = os.getenv("GOLD_PROVIDER_MODE", "live")
+default_price_source, default_news_source, default_mailer = build_providers(PROVIDER_MODE)
+
+
+def make_bar_store(mode, source):
+    # Delta requests depend on the wall clock, so recorded sessions bypass the bar store
+    if mode != "live":
+        return None
+    return BarStore(os.getenv("BAR_STORE_DIR", "bar_store"), max_bars=int(os.getenv("BAR_STORE_MAX_BARS", "50000")),
+                    fetcher=source.history)
+
+# Process-wide provider so that every GoldAgent created by the scheduler shares downloads
+market_data = MarketDataProvider(bar_store=make_bar_store(PROVIDER_MODE, default_price_source), source=default_price_source)
+
+
+@metrics.register
+def market_data_gauges():
+    stats = market_data.stats()
+    return [
+        ("market_data_cache_hits", "Market data requests served from cache", stats["hits"], {}),
+        ("market_data_cache_misses", "Market data requests that downloaded", stats["misses"], {}),
+        ("market_data_cache_coalesced", "Market data requests that joined an in-flight download", stats["coalesced"], {}),
+        ("market_data_cache_hit_ratio", "Share of market data requests not downloading", stats["hit_ratio"], {}),
+        ("market_data_cache_entries", "Cached market data series", stats["entries"], {}),
+    ]
+
+# Streaming indicator state per (symbol, interval), kept across scheduler ticks
+_indicator_engines = {}
+_indicator_lock = threading.Lock()
+
+# Bars per (symbol, interval) in fixed-size NumPy rings, kept across scheduler ticks
+_bar_rings = {}
+_bar_lock = threading.Lock()
+BAR_RING_CAPACITY = 4096
+
+# Leading rows without a full SMA_20 window, which the regression features leave out
+FEATURE_WARMUP = 19
+
+# Multi-horizon forecasts: hours ahead, central coverage of the intervals, and bars in the fit
+FORECAST_HORIZONS = tuple(int(h) for h in os.getenv("FORECAST_HORIZONS", "1,2,4,8,12,24").split(","))
+FORECAST_LEVEL = float(os.getenv("FORECAST_LEVEL", "0.8"))
+FORECAST_WINDOW = 29
+BAR_SECONDS = 3600
+
+# Regressions, backtests, accuracy and scores by the bars they were computed from, kept across ticks
+compute_cache = ComputeCache(int(os.getenv("COMPUTE_CACHE_SIZE", "256")))
+
+# Bounded pool for the independent fetches of one analysis tick
+_io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gold-io")
+
+# Overall time budget (seconds) for the I/O of one analysis tick
+TICK_DEADLINE = float(os.getenv("TICK_DEADLINE", "8"))
+
+# Inputs that may fall back to their last good value when they miss the deadline
+_last_inputs = {}
+STALE_FALLBACK = ("dxy", "news", "regression", "watchlist")
+
+
+def _remember_input(name, future):
+    """Keeps the last usable result of a fetch, including ones that finish after the deadline."""
+    if name not in STALE_FALLBACK or future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    if result is not None and result != []:
+        _last_inputs[name] = result
+
+
+# fetch_current_price needs at least this many bars from a source
+MIN_PRICE_ROWS = 24
+
+
+def price_sources(ticker):
+    """(symbol, period, interval) series for the current price, in order of preference; GLD stands in for the future."""
+    return [(ticker, "1d", "1m"), (ticker, "5d", "1h"), ("GLD", "1d", "1m"), ("GLD", "5d", "1h")]
+
+
+# One chain per ticker, so source health carries over from tick to tick
+_price_chains = {}
+_price_chains_lock = threading.Lock()
+
+
+def price_chain(ticker):
+    with _price_chains_lock:
+        chain = _price_chains.get(ticker)
+        if chain is None:
+            chain = _price_chains[ticker] = SourceChain(price_sources(ticker), label=lambda s: f"{s[0]} {s[2]}")
+        return chain
+
+
+def use_providers(mode, root=None):
+    """Switches the process to 'live', 'record' or 'replay' providers (see providers.py)."""
+    global PROVIDER_MODE, default_price_source, default_news_source, default_mailer
+    PROVIDER_MODE = mode
+    default_price_source, default_news_source, default_mailer = build_providers(mode, root)
+    market_data.source = default_price_source
+    market_data.bar_store = make_bar_store(mode, default_price_source)
+    market_data.invalidate()
+    _last_inputs.clear()
+    with _price_chains_lock:
+        for chain in _price_chains.values():
+            chain.reset()
+    with _indicator_lock:
+        _indicator_engines.clear()
+    with _bar_lock:
+        _bar_rings.clear()
+    compute_cache.clear()
+    return default_price_source, default_news_source, default_mailer
+
+
+class GoldAgent:
+    def __init__(self, data_provider=None, ticker="GC=F", news_source=None, mailer=None):
+        self.ticker = ticker
+        self.data = data_provider or market_data
+        self.news_source = news_source or default_news_source
+        self.mailer = mailer or default_mailer
         self.email_address = os.getenv("EMAIL_ADDRESS")
         self.email_password = os.getenv("EMAIL_PASSWORD")
         self.recipient_email = os.getenv("RECIPIENT_EMAIL")
@@ -25,45 +275,108 @@ class GoldAgent:
         """Placeholder for future sentiment analysis using NewsAPI or LLMs."""
         print("News analysis capability pending: Market sentiment data not yet integrated.")
 
-    def fetch_current_price(self):
-        """Fetches the latest Gold price and correlates with DXY."""
+    @metrics.timed("gold_fetch")
+    def fetch_current_price(self, deadline=None):
+        """Fetches the latest Gold price and correlates with DXY.
+
+        Returns (price, bars, dxy_price, source), where source is the
+        (symbol, period, interval) that produced the price. The sources of
+        price_sources() are raced with hedging (see SourceChain) instead of
+        being tried one after another; `deadline` is a time.monotonic() value.
+        """
+        chain = price_chain(self.ticker)
         try:
-            dxy = yf.Ticker("DX-Y.NYB")
-            dxy_data = dxy.history(period="1d")
-            dxy_price = dxy_data['Close'].iloc[-1] if not dxy_data.empty else None
-            
-            gold = yf.Ticker(self.ticker)
-            data = gold.history(period="1d", interval="1m")
-            
-            # If 1m data is insufficient (e.g. early morning), try 1h data
-            if data is None or len(data) < 24:
-                 data = gold.history(period="5d", interval="1h")
-            
-            # Fallback to GLD if primarty symbol is still insufficient
-            if data is None or len(data) < 24:
-                print(f"Ticker {self.ticker} data insufficient ({len(data) if data is not None else 0} rows), trying fallback GLD...")
-                gold = yf.Ticker("GLD")
-                data = gold.history(period="1d", interval="1m")
-                if data is None or len(data) < 24:
-                    data = gold.history(period="5d", interval="1h")
-            
+            dxy_future = chain.submit(self.data.history, "DX-Y.NYB", period="1d")
+            source, data = chain.fetch(
+                lambda s: self.data.history(s[0], period=s[1], interval=s[2]),
+                lambda frame: frame is not None and len(frame) >= MIN_PRICE_ROWS,
+                deadline,
+            )
+            if source is not None and source[0] != self.ticker:
+                print(f"Ticker {self.ticker} data insufficient, using {chain.label(source)}")
+            try:
+                dxy_data = dxy_future.result(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+                dxy_price = dxy_data['Close'].iloc[-1] if not dxy_data.empty else None
+            except Exception as e:
+                print(f"DXY price unavailable: {e}")
+                dxy_price = None
+
             if data is not None and not data.empty:
                 current_price = data["Close"].iloc[-1]
-                return current_price, data, dxy_price
+                return current_price, data, dxy_price, source
             else:
-                return None, None, None
+                return None, None, None, None
         except Exception as e:
             print(f"Error fetching price: {e}")
-            return None, None, None
+            return None, None, None, None
+
+    def bars(self, data):
+        """Returns a history DataFrame as a zero-copy BarWindow over its series' ring buffer.
+
+        Only bars the ring has not seen yet (and the still-forming last bar)
+        are copied in, so a tick allocates nothing in proportion to the history.
+        """
+        if isinstance(data, BarWindow):
+            return data
+        symbol, interval = data.attrs.get("symbol"), data.attrs.get("interval")
+        if symbol is None:
+            return BarRing(max(len(data), 1)).sync(data).window()
+        with _bar_lock:
+            ring = _bar_rings.get((symbol, interval))
+            if ring is None:
+                ring = _bar_rings[(symbol, interval)] = BarRing(BAR_RING_CAPACITY, symbol, interval)
+            return ring.sync(data).window(len(data))
+
+    @metrics.timed("indicators")
+    def indicators(self, data):
+        """Returns the streaming indicator state advanced to the last bar of `data` (a BarWindow or DataFrame)."""
+        if isinstance(data, BarWindow):
+            symbol, interval = data.symbol, data.interval
+        else:
+            symbol, interval = data.attrs.get("symbol"), data.attrs.get("interval")
+        if symbol is None:
+            return IndicatorEngine().sync(data)
+        with _indicator_lock:
+            engine = _indicator_engines.get((symbol, interval))
+            if engine is None:
+                engine = _indicator_engines[(symbol, interval)] = IndicatorEngine()
+            return engine.sync(data)
+
+    @metrics.timed("dxy_fetch")
+    def get_dxy_trend(self):
+        """Returns the hourly DXY direction ("Up" or "Down")."""
+        dxy_hist = self.data.history("DX-Y.NYB", period="1d", interval="1h")
+        return "Down" if (len(dxy_hist) > 1 and dxy_hist['Close'].iloc[-1] < dxy_hist['Close'].iloc[-2]) else "Up"
+
+    def fetch_inputs(self, tasks, deadline):
+        """Runs independent fetches concurrently until `deadline` (a time.monotonic() value).
+
+        Returns (results, stale): inputs that missed the deadline, failed or came
+        back empty use their last good value and are listed in `stale`.
+        """
+        futures = {}
+        for name, fn in tasks.items():
+            future = _io_pool.submit(fn)
+            future.add_done_callback(lambda f, name=name: _remember_input(name, f))
+            futures[name] = future
 
-    def get_rsi(self, data, window=14):
-        """Calculates RSI Indicator."""
-        delta = data['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi.iloc[-1]
+        results, stale = {}, []
+        for name, future in futures.items():
+            try:
+                result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                print(f"Input '{name}' missed the tick deadline")
+                result = None
+            except Exception as e:
+                print(f"Input '{name}' failed: {e}")
+                result = None
+            if (result is None or result == []) and name in _last_inputs:
+                result = _last_inputs[name]
+                stale.append(name)
+            elif result is None and name in STALE_FALLBACK:
+                stale.append(name)
+            results[name] = result
+        return results, stale
 
     def analyze_asian_market_logic(self):
         """Monitors Asian market factors (PBOC and Lunar New Year) specifically."""
@@ -112,51 +425,11 @@ class GoldAgent:
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
             }
-            resp = requests.get(url, headers=headers, timeout=10)
-            soup = BeautifulSoup(resp.content, "xml")
-            
-            entries = soup.find_all('item')[:5] # Get top 5 to ensure variety
-            
-            structured_news = []
-            pos_keywords = ['up', 'rise', 'cut', 'war', 'tension', 'higher', 'gain', 'safe-haven', 'surge', 'bullish', 'buying']
-            neg_keywords = ['fall', 'strong dollar', 'inflation', 'lower', 'negative', 'rate hike', 'hawk', 'drop', 'bearish', 'selling']
-            
-            for entry in entries:
-                title = entry.find('title').get_text()
-                link = entry.find('link').get_text() if entry.find('link') else '#'
-                
-                # Check impact
-                h_low = title.lower()
-                impact = "Neutral"
-                if any(kw in h_low for kw in pos_keywords): impact = "Positive"
-                elif any(kw in h_low for kw in neg_keywords): impact = "Negative"
-                
-                # Clean title (Google News often adds source at the end like "- Reuters")
-                clean_title = title.split(' - ')[0] if ' - ' in title else title
-                
-                # Dynamic Thai Summarization with more variety
-                summary_th = clean_title
-                if "Fed" in title or "Federal Reserve" in title:
-                    summary_th = "นโยบายดอกเบี้ยของ Fed กำลังส่งแรงกดดันต่อทิศทางราคาทองคำ"
-                elif "Dollar" in title:
-                    summary_th = "การเคลื่อนไหวของค่าเงินดอลลาร์สหรัฐ (DXY) กระทบต่อความต้องการทองคำ"
-                elif "Central Bank" in title:
-                    summary_th = "แรงซื้อจากธนาคารกลางต่างประเทศเป็นสัญญานเชิงบวกต่อราคา"
-                elif "Inflation" in title or "CPI" in title:
-                    summary_th = "ตัวเลขเงินเฟ้อสหรัฐฯ เป็นตัวแปรสำคัญที่นักลงทุนทองคำกำลังเฝ้าติดตาม"
-                elif "Geopolitical" in title or "War" in title or "Conflict" in title:
-                    summary_th = "ความเสี่ยงทางภูมิรัฐศาสตร์หนุนแรงซื้อทองคำในฐานะสินทรัพย์ปลอดภัย"
-                elif "RSI" in title or "Technical" in title:
-                    summary_th = "สัญญาณทางเทคนิคบ่งชี้ถึงโอกาสการปรับฐานหรือการไปต่อในระยะสั้น"
-                else:
-                    summary_th = f"จับตาประเด็น: {clean_title} ส่งผลต่อความผันผวนของตลาด"
-                
-                structured_news.append({
-                    "title": clean_title,
-                    "impact": impact,
-                    "summary_th": summary_th,
-                    "link": link
-                })
+            with metrics.timed("news_fetch"):
+                content = self.news_source.fetch(url, headers=headers, timeout=10)
+            # Top 5 items to ensure variety; unchanged feeds and headlines are served from memo
+            with metrics.timed("news_parse"):
+                structured_news = headlines(content, limit=5)
             
             # Combine with Asian insights
             asian_news = self.analyze_asian_market_logic()
@@ -175,164 +448,225 @@ class GoldAgent:
             print(f"Market sentiment analysis error: {e}")
             return []
 
-    def prepare_data(self, data):
-        """Prepares data with lag features and indicators."""
-        df = data.copy()
-        df['SMA_5'] = df['Close'].rolling(window=5).mean()
-        df['SMA_20'] = df['Close'].rolling(window=20).mean()
-        df['Lag_1'] = df['Close'].shift(1)
-        df['Lag_2'] = df['Close'].shift(2)
-        df['Lag_3'] = df['Close'].shift(3)
-        return df.dropna()
-
+    @metrics.timed("regression")
     def predict_next_price(self):
         """Predicts using Weighted Linear Regression and SMA logic."""
         try:
-            gold = yf.Ticker(self.ticker)
-            data = gold.history(period="5d", interval="1h").tail(48)
-            if len(data) < 25: return None
-            
-            df = self.prepare_data(data)
-            if df.empty: return None
+            history = self.bars(self.data.history(self.ticker, period="5d", interval="1h"))
+            closed = closed_bars(history)
 
-            X = np.arange(len(df)).reshape(-1, 1)
-            y = df['Close'].values
-            
-            weights = np.ones(len(df))
-            weights[-6:] = 3.0
-            
-            model = LinearRegression()
-            model.fit(X, y, sample_weight=weights)
-            
-            slope = model.coef_[0]
-            last_row = df.iloc[-1]
-            is_up = (slope > 0) and (last_row['SMA_5'] > last_row['SMA_20'])
-            
-            current_price = last_row['Close']
-            predicted_price = current_price + (slope if is_up else -abs(slope) if slope < 0 else -1.0)
-            
+            def fit():
+                data = closed.tail(48)
+                if len(data) < 25: return None
+                
+                # Only rows with a full SMA_20 window
+                y = data.close[FEATURE_WARMUP:]
+                y = y[~np.isnan(y)]
+                if len(y) == 0: return None
+                sma_5, sma_20 = float(np.mean(data.close[-5:])), float(np.mean(data.close[-20:]))
+
+                weights = np.ones(len(y))
+                weights[-6:] = 3.0
+                
+                # Weighted least squares on the time index, closed form
+                slope, _ = ols_fit(y, weights)
+                is_up = (slope > 0) and (sma_5 > sma_20)
+                return {
+                    "signal": "UP" if is_up else "DOWN",
+                    "slope": slope,
+                    "step": slope if is_up else -abs(slope) if slope < 0 else -1.0,
+                    "sma_5": sma_5,
+                    "sma_20": sma_20
+                }
+
+            # Refitted only when a bar closes, not on every tick
+            model = compute_cache.get(("regression", bars_key(closed)), fit)
+            if model is None: return None
+            # The live price moves every tick, so it is applied to the cached fit afterwards
+            current_price = float(history.close[-1])
             return {
-                "price": predicted_price,
-                "signal": "UP" if is_up else "DOWN",
-                "slope": slope,
-                "sma_5": last_row['SMA_5'],
-                "sma_20": last_row['SMA_20']
+                "price": current_price + model["step"],
+                "signal": model["signal"],
+                "slope": model["slope"],
+                "sma_5": model["sma_5"],
+                "sma_20": model["sma_20"]
             }
         except Exception as e:
             print(f"Error predicting price: {e}")
             return None
 
-    def get_backtest_data(self, n_points=6):
+    @metrics.timed("forecast")
+    def forecast_horizons(self, horizons=FORECAST_HORIZONS, level=FORECAST_LEVEL):
+        """Forecasts several hours ahead with empirical prediction intervals (see trend_forecasts).
+
+        Uses the same weighted trend as predict_next_price, fitted to closed
+        bars only, so the result is computed once per bar and served from
+        memory on the ticks in between.
+        """
+        try:
+            # The still-forming bar would change the fit on every tick
+            bars = closed_bars(self.bars(self.data.history(self.ticker, period="5d", interval="1h")))
+            closes, timestamps = bars.close, bars.timestamps
+            keep = ~np.isnan(closes)
+            closes, timestamps = closes[keep], timestamps[keep]
+            if len(closes) < FORECAST_WINDOW + 1: return None
+
+            last_ts = int(timestamps[-1])
+
+            def forecast():
+                points, lower, upper = trend_forecasts(closes, FORECAST_WINDOW, horizons,
+                                                       recent_count=6, recent_weight=3.0, level=level)
+                # The last closed bar closes an hour after its timestamp; horizon h is h hours after that
+                closed_at = last_ts / 1e9 + BAR_SECONDS
+                return {
+                    "level": level,
+                    "base_ts": closed_at,
+                    "base_price": float(closes[-1]),
+                    "horizons": [
+                        {
+                            "hours": int(h),
+                            "target_ts": closed_at + h * BAR_SECONDS,
+                            "price": float(points[k]),
+                            "lower": None if np.isnan(lower[k]) else float(lower[k]),
+                            "upper": None if np.isnan(upper[k]) else float(upper[k]),
+                        }
+                        for k, h in enumerate(horizons)
+                    ],
+                }
+
+            key = ("forecast", bars.symbol, bars.interval, int(timestamps[0]), last_ts, tuple(horizons), level)
+            return compute_cache.get(key, forecast)
+        except Exception as e:
+            print(f"Forecast error: {e}")
+            return None
+
+    @metrics.timed("backtest")
+    def get_backtest_data(self, n_points=6, period="5d"):
         """Generates backtested predictions for the last N hours."""
         try:
-            gold = yf.Ticker(self.ticker)
             # Fetch enough data for training + plotting
-            data = gold.history(period="5d", interval="1h")
-            if len(data) < n_points + 20: return [], []
+            data = self.data.history(self.ticker, period=period, interval="1h")
+            if len(data) < n_points + 20: return [], [], []
             
-            df = self.prepare_data(data)
-            # Ensure yfinance data is localized correctly and converted to UTC
-            if df.index.tz is not None:
-                df.index = df.index.tz_convert('UTC')
-            else:
-                df.index = df.index.tz_localize('UTC')
+            bars = closed_bars(self.bars(data))
 
-            actuals = []
-            predictions = []
-            labels = []
-            
-            # We want to see the last n_points
-            for i in range(n_points, 0, -1):
-                target_row = df.iloc[-(i)]
-                
-                # Simple Linear Regression for backtest point
-                train_data = df.iloc[:-(i)]
-                X_train = np.arange(len(train_data)).reshape(-1, 1)
-                y_train = train_data['Close'].values
-                
-                model = LinearRegression()
-                model.fit(X_train, y_train)
-                
-                pred = model.predict([[len(train_data)]])[0]
-                
-                # Get UTC timestamp
-                timestamp = target_row.name
-                actuals.append(target_row['Close'])
-                predictions.append(pred)
-                labels.append(timestamp.timestamp())
+            def backtest():
+                # Rows with a full SMA_20 window, read straight from the ring (timestamps are already UTC)
+                closes = bars.close[FEATURE_WARMUP:]
+                timestamps = bars.timestamps[FEATURE_WARMUP:]
+                if np.isnan(closes).any():
+                    keep = ~np.isnan(closes)
+                    closes, timestamps = closes[keep], timestamps[keep]
+
+                # Expanding-window regression for every point in one pass; the last
+                # n_points are the ones we want to see
+                predictions = walk_forward_predictions(closes)[-n_points:]
                 
-            return labels, actuals, predictions
+                # Get UTC timestamps
+                labels = (timestamps[-n_points:] / 1e9).tolist()
+                return labels, closes[-n_points:].tolist(), predictions.tolist()
+
+            return compute_cache.get(("backtest", bars_key(bars), n_points), backtest)
         except Exception as e:
             print(f"Backtest error: {e}")
             return [], [], []
 
-    def calculate_ema(self, data, period):
-        """Calculate Exponential Moving Average."""
-        return data['Close'].ewm(span=period, adjust=False).mean()
-    
     def check_ema_crossover(self, data, lookback=3):
-        """Check if 9 EMA crossed 21 EMA in the last N bars."""
-        ema_9 = self.calculate_ema(data, 9)
-        ema_21 = self.calculate_ema(data, 21)
-        
-        # Check for bullish crossover (9 crosses above 21)
-        for i in range(1, min(lookback + 1, len(data))):
-            if ema_9.iloc[-i] > ema_21.iloc[-i] and ema_9.iloc[-i-1] <= ema_21.iloc[-i-1]:
-                return "BULLISH", 50
-            # Check for bearish crossover (9 crosses below 21)
-            elif ema_9.iloc[-i] < ema_21.iloc[-i] and ema_9.iloc[-i-1] >= ema_21.iloc[-i-1]:
-                return "BEARISH", 50
-        
-        # No crossover, check current position
-        if ema_9.iloc[-1] > ema_21.iloc[-1]:
-            return "BULLISH", 0  # Bullish but no recent crossover
-        else:
-            return "BEARISH", 0  # Bearish but no recent crossover
+        """Check if 9 EMA crossed 21 EMA in the last N closed bars.
+
+        The still-forming bar is left out, so a crossover counts once its bar
+        has closed (one bar later than a scan that included it) and the result
+        holds for every tick until the next close. BatchAnalyzer does the same.
+        """
+        data = self.bars(data)
+        closed = closed_bars(data)
+        # Bars after the last closed one (the forming bar) that the streaming values skip
+        forming = len(data) - len(closed)
+
+        def scan():
+            engine = self.indicators(data)
+            ema_9 = lambda i: engine.ema(9, i - 1 + forming)
+            ema_21 = lambda i: engine.ema(21, i - 1 + forming)
+            
+            # Check for bullish crossover (9 crosses above 21)
+            for i in range(1, min(lookback + 1, len(closed))):
+                if ema_9(i) > ema_21(i) and ema_9(i + 1) <= ema_21(i + 1):
+                    return "BULLISH", 50
+                # Check for bearish crossover (9 crosses below 21)
+                elif ema_9(i) < ema_21(i) and ema_9(i + 1) >= ema_21(i + 1):
+                    return "BEARISH", 50
+            
+            # No crossover, check current position
+            if ema_9(1) > ema_21(1):
+                return "BULLISH", 0  # Bullish but no recent crossover
+            else:
+                return "BEARISH", 0  # Bearish but no recent crossover
+
+        return compute_cache.get(("ema_crossover", bars_key(closed), lookback), scan)
     
     def check_rsi_alignment(self, data, trend):
-        """Check if RSI is aligned with price trend (no divergence)."""
-        rsi = self.get_rsi(data)
-        prices = data['Close'].tail(5)
-        
-        # Simple alignment check: RSI moving in same direction as price
-        price_rising = prices.iloc[-1] > prices.iloc[-3]
-        rsi_values = []
-        
-        for i in range(5):
-            temp_data = data.iloc[:-(5-i)] if i < 4 else data
-            if len(temp_data) >= 20:
-                rsi_values.append(self.get_rsi(temp_data))
-        
-        if len(rsi_values) >= 3:
-            rsi_rising = rsi_values[-1] > rsi_values[-3]
+        """Check if RSI is aligned with price trend (no divergence), on closed bars like check_ema_crossover."""
+        data = self.bars(data)
+        closed = closed_bars(data)
+        forming = len(data) - len(closed)
+
+        def align():
+            engine = self.indicators(data)
+            
+            # Simple alignment check: RSI moving in same direction as price
+            price_rising = engine.close(forming) > engine.close(forming + 2)
+            rsi_values = []
+            
+            # RSI as of 5, 4, 3 and 2 closed bars ago and at the last closed bar, read from the streaming history
+            for back in (5, 4, 3, 2, 0):
+                if len(closed) - back >= 20:
+                    rsi_values.append(engine.rsi(back + forming))
             
-            # Check alignment
-            if trend == "BULLISH" and price_rising and rsi_rising:
-                return 20
-            elif trend == "BEARISH" and not price_rising and not rsi_rising:
-                return 20
-        
-        return 0
+            if len(rsi_values) >= 3:
+                rsi_rising = rsi_values[-1] > rsi_values[-3]
+                
+                # Check alignment
+                if trend == "BULLISH" and price_rising and rsi_rising:
+                    return 20
+                elif trend == "BEARISH" and not price_rising and not rsi_rising:
+                    return 20
+            
+            return 0
+
+        return compute_cache.get(("rsi_alignment", bars_key(closed), trend), align)
     
-    def institutional_grade_analysis(self, news_cache=None):
+    def institutional_grade_analysis(self, news_cache=None, deadline=TICK_DEADLINE):
         """Institutional scoring system: EMA + RSI + News + DXY (0-100 scale)."""
         try:
-            current_price, data, dxy_price = self.fetch_current_price()
+            # All sources are independent, so fetch them concurrently within one budget
+            tasks = {
+                "price": lambda: self.fetch_current_price(deadline=time.monotonic() + deadline),
+                "dxy": self.get_dxy_trend,
+                "regression": self.predict_next_price,
+            }
+            if not news_cache:
+                tasks["news"] = self.analyze_market_sentiment_premium
+            inputs, stale_inputs = self.fetch_inputs(tasks, time.monotonic() + deadline)
+
+            if inputs["price"] is None:
+                return None
+            current_price, data, dxy_price, source = inputs["price"]
             if data is None or len(data) < 12:
                 return None
+            data = self.bars(data)
             
             # 1. TREND ANALYSIS (50 points) - EMA Crossover
             trend_signal, trend_points = self.check_ema_crossover(data, lookback=3)
             
             # 2. RSI ALIGNMENT (20 points)
-            rsi = self.get_rsi(data)
+            rsi = self.indicators(data).rsi()
             rsi_points = self.check_rsi_alignment(data, trend_signal)
             
             # 3. NEWS SENTIMENT (15 points)
             if news_cache:
                 market_news = news_cache
             else:
-                market_news = self.analyze_market_sentiment_premium()
+                market_news = inputs["news"] or []
             pos_count = sum(1 for n in market_news if n['impact'] == "Positive" or n['impact'] == "Bullish")
             neg_count = sum(1 for n in market_news if n['impact'] == "Negative" or n['impact'] == "Caution/Bearish")
             
@@ -354,9 +688,7 @@ class GoldAgent:
                 sentiment = "Opposite"
             else:
                 # 4. DXY CORRELATION (15 points)
-                dxy = yf.Ticker("DX-Y.NYB")
-                dxy_hist = dxy.history(period="1d", interval="1h")
-                dxy_trend = "Down" if (len(dxy_hist) > 1 and dxy_hist['Close'].iloc[-1] < dxy_hist['Close'].iloc[-2]) else "Up"
+                dxy_trend = inputs["dxy"] or "N/A"
                 
                 # Gold and DXY are inversely correlated
                 if (trend_signal == "BULLISH" and dxy_trend == "Down") or \
@@ -372,7 +704,7 @@ class GoldAgent:
             prediction = "Strong UP" if trend_signal == "BULLISH" else "Strong DOWN"
             
             # Get predicted price from regression
-            reg_result = self.predict_next_price()
+            reg_result = inputs["regression"]
             predicted_price = reg_result['price'] if reg_result else current_price
             
             # Executive reasoning in Thai
@@ -394,10 +726,13 @@ class GoldAgent:
                 "headlines": [n['title'] for n in market_news],
                 "dxy_trend": dxy_trend if confidence_score > 0 else "N/A",
                 "price": current_price,
+                # Which series the price came from; "substitute" is set when GLD stood in for the ticker
+                "price_source": {"symbol": source[0], "interval": source[2], "substitute": source[0] != self.ticker},
                 "confidence": confidence_score,
                 "reasoning": reasoning,
                 "market_news": market_news,
                 "trend_signal": trend_signal,
+                "stale_inputs": stale_inputs,
                 "score_breakdown": {
                     "trend": trend_points,
                     "rsi": rsi_points,
@@ -409,31 +744,58 @@ class GoldAgent:
             print(f"Institutional analysis error: {e}")
             return None
 
-    def get_model_accuracy(self):
+    @metrics.timed("watchlist")
+    def analyze_watchlist(self, market_news=None, instruments=None, deadline=TICK_DEADLINE):
+        """Scores every watched instrument (metals, ETFs, gold in other currencies) in one batch.
+
+        The indicator pass only uses closed bars and is keyed on the ones
+        downloaded, so it runs again only when a bar closes or a closed bar is
+        revised; the ticks in between only apply the news. The download and
+        the pass run in the I/O pool within `deadline`; if they miss it or
+        fail, the last signals are scored instead.
+        """
+        try:
+            analyzer = BatchAnalyzer(self.data, instruments=instruments)
+            names = tuple(name for name, _, _ in analyzer.instruments)
+
+            def signals():
+                closes = analyzer.fetch()
+                key = ("watchlist", names, analyzer.period, analyzer.interval, closes_key(closes))
+                return compute_cache.get(key, lambda: analyzer.signals(closes))
+
+            inputs, _ = self.fetch_inputs({"watchlist": signals}, time.monotonic() + deadline)
+            return analyzer.score(inputs["watchlist"], market_news)
+        except Exception as e:
+            print(f"Watchlist analysis error: {e}")
+            return {}
+
+    def get_model_accuracy(self, window=12, period="5d"):
         """Calculates Directional Accuracy using Backtesting."""
         try:
-            gold = yf.Ticker(self.ticker)
-            data = gold.history(period="5d", interval="1h")
+            data = self.data.history(self.ticker, period=period, interval="1h")
             if len(data) < 20: return 0.0, None
-            df = self.prepare_data(data)
-            train_df = df.iloc[:-12]
-            test_df = df.tail(12)
-            if train_df.empty or test_df.empty: return 0.0, None
-            
-            X_train = np.arange(len(train_df)).reshape(-1, 1)
-            y_train = train_df['Close'].values
-            X_test = np.arange(len(train_df), len(df)).reshape(-1, 1)
-            y_test = test_df['Close'].values
-            
-            model = LinearRegression()
-            model.fit(X_train, y_train)
-            predictions = model.predict(X_test)
-            
-            actual_dir = np.sign(y_test - test_df['Lag_1'].values)
-            pred_dir = np.sign(predictions - test_df['Lag_1'].values)
-            correct = (actual_dir == pred_dir)
-            accuracy = (correct.sum() / len(correct)) * 100
-            return accuracy, bool(correct[-1])
+            bars = closed_bars(self.bars(data))
+
+            def score():
+                # Rows with a full SMA_20 window, and each one's previous close (Lag_1)
+                closes = bars.close
+                y = closes[FEATURE_WARMUP:]
+                lag_1 = closes[FEATURE_WARMUP - 1:-1]
+                train, y_test, lag_test = y[:-window], y[-window:], lag_1[-window:]
+                if len(train) == 0 or len(y_test) == 0: return 0.0, None
+                
+                X_test = np.arange(len(train), len(y))
+                
+                slope, intercept = ols_fit(train)
+                predictions = intercept + slope * X_test
+                
+                actual_dir = np.sign(y_test - lag_test)
+                pred_dir = np.sign(predictions - lag_test)
+                correct = (actual_dir == pred_dir)
+                accuracy = (correct.sum() / len(correct)) * 100
+                return accuracy, bool(correct[-1])
+
+            return compute_cache.get(("accuracy", bars_key(bars), window), score)
         except Exception as e:
             print(f"Accuracy error: {e}")
             return 0.0, None
@@ -467,18 +829,17 @@ class GoldAgent:
 Gold Price Agent (High-Precision Unit)
 รายงานเมื่อ: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         """
+        # RECIPIENT_EMAIL may list several addresses separated by commas
+        recipients = split_recipients(self.recipient_email)
         msg = MIMEMultipart()
         msg['From'] = self.email_address
-        msg['To'] = self.recipient_email
+        msg['To'] = ", ".join(recipients)
         msg['Subject'] = subject
         msg.attach(MIMEText(body, 'plain', 'utf-8'))
         try:
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(self.email_address, self.email_password)
             text = msg.as_string()
-            server.sendmail(self.email_address, self.recipient_email, text)
-            server.quit()
-            print(f"Executive Briefing Sent! Prediction: {precision_data['prediction']}")
+            # The live mailer is an outbox: this only queues the message, delivery happens in the background
+            self.mailer.send(self.email_address, self.email_password, recipients, text)
+            print(f"Executive Briefing Queued! Prediction: {precision_data['prediction']}")
         except Exception as e:
             print(f"Failed to send email: {e}")
@@ -0,0 +1,13 @@
+import os
+
+# gunicorn reads this file automatically: `gunicorn app:app`
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 2))
+# Each open /api/stream connection occupies a thread; MAX_STREAMS (app.py) keeps some free for other requests
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+
+def post_worker_init(worker):
+    # Every worker joins the leader election: one runs the analysis, the rest serve its shared snapshots
+    from app import start_background
+    start_background()
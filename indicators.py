@@ -0,0 +1,225 @@
+import copy
+import math
+from collections import deque
+
+
+class EMA:
+    """Exponential moving average, same recursion as ewm(span, adjust=False)."""
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = math.nan
+
+    def update(self, x):
+        if math.isnan(self.value):
+            self.value = x
+        else:
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+class SMA:
+    """Simple moving average over a fixed window; NaN until the window is full."""
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+
+    def update(self, x):
+        self.values.append(x)
+        return self.value
+
+    @property
+    def value(self):
+        if len(self.values) < self.window:
+            return math.nan
+        return sum(self.values) / self.window
+
+
+class RSI:
+    """Simple-average RSI: 100 - 100 / (1 + gain / loss), with gain and loss the means of the last `window` rises and falls."""
+    def __init__(self, window=14):
+        self.gain = SMA(window)
+        self.loss = SMA(window)
+        self.prev = None
+
+    def update(self, close):
+        # The first bar has no delta; pandas' where() turns that NaN into 0
+        delta = 0.0 if self.prev is None else close - self.prev
+        self.prev = close
+        self.gain.update(delta if delta > 0 else 0.0)
+        self.loss.update(-delta if delta < 0 else 0.0)
+        return self.value
+
+    @property
+    def value(self):
+        gain, loss = self.gain.value, self.loss.value
+        if math.isnan(gain) or math.isnan(loss) or (gain == 0 and loss == 0):
+            return math.nan
+        if loss == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+class IndicatorState:
+    """Read-only view of the indicator values as of one bar.
+
+    `reseed` maps an EMA period to (offset, alpha, bars) when the EMAs are to
+    read as if seeded at the first of the last `bars` bars (see
+    IndicatorEngine.sync) rather than at the first bar the engine saw.
+    """
+    def __init__(self, state, count, sma_windows, lags, reseed=None):
+        self._state = state
+        self.count = count
+        self.sma_windows = sma_windows
+        self.lags = lags
+        self._reseed = reseed or {}
+
+    def ema(self, period, back=0):
+        """EMA value `back` bars before the latest one."""
+        value = self._state["ema_history"][period][-1 - back]
+        if period in self._reseed:
+            # The seed's weight decays by (1 - alpha) per bar, so the difference between the two seeds does too
+            offset, alpha, bars = self._reseed[period]
+            value -= offset * (1.0 - alpha) ** (bars - 1 - back)
+        return value
+
+    def rsi(self, back=0):
+        """RSI value `back` bars before the latest one."""
+        return self._state["rsi_history"][-1 - back]
+
+    def sma(self, window):
+        return self._state["sma"][window].value
+
+    def close(self, back=0):
+        return self._state["closes"][-1 - back]
+
+    def features(self):
+        """Latest SMA_w (mean of the last w closes) and Lag_k (close k bars back) values."""
+        row = {f"SMA_{w}": self.sma(w) for w in self.sma_windows}
+        for lag in range(1, self.lags + 1):
+            row[f"Lag_{lag}"] = self.close(lag) if self.count > lag else math.nan
+        row["Close"] = self.close()
+        return row
+
+
+class IndicatorEngine:
+    """Streaming EMA/RSI/SMA state for one bar series, advanced one bar at a time.
+
+    Every bar costs O(1) and only the last few values of each indicator are
+    kept. Re-sending the last bar (a still-forming bar that changed) rolls the
+    state back to before that bar and applies the revision. Updates work on a
+    private copy that is swapped in at the end, so IndicatorState views handed
+    out earlier never change underneath their readers.
+
+    For the last `seed_history` bars (at least as many as the longest window
+    given to sync()) the engine also remembers how far each EMA was from the
+    close, which lets sync() report EMAs seeded at the
+    start of the window it was given, like ewm(adjust=False) over that window.
+    """
+    def __init__(self, ema_periods=(9, 21), rsi_window=14, sma_windows=(5, 20), lags=3, history=8, seed_history=4096):
+        self.ema_periods = tuple(ema_periods)
+        self.rsi_window = rsi_window
+        self.sma_windows = tuple(sma_windows)
+        self.lags = lags
+        self.history = history
+        self.seed_history = seed_history
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self._state = {
+            "ema": {p: EMA(p) for p in self.ema_periods},
+            "sma": {w: SMA(w) for w in self.sma_windows},
+            "rsi": RSI(self.rsi_window),
+            "closes": deque(maxlen=max(self.history, self.lags + 1)),
+            "ema_history": {p: deque(maxlen=self.history) for p in self.ema_periods},
+            "rsi_history": deque(maxlen=self.history),
+        }
+        self._previous = None
+        # Timestamp -> {period: EMA - close} after that bar, for the newest seed_history bars
+        self._seeds = {}
+        self._seed_order = deque()
+
+    @staticmethod
+    def _apply(state, close):
+        state["closes"].append(close)
+        for period, ema in state["ema"].items():
+            state["ema_history"][period].append(ema.update(close))
+        for sma in state["sma"].values():
+            sma.update(close)
+        state["rsi_history"].append(state["rsi"].update(close))
+
+    def advance(self, bars):
+        """Applies (timestamp, close) bars in time order; a repeated last timestamp is a revision."""
+        bars = list(bars)
+        state, previous = None, self._previous
+        count, first, last = self.count, self.first_timestamp, self.last_timestamp
+        seeds = []
+        for i, (timestamp, close) in enumerate(bars):
+            if last is not None and timestamp == last:
+                if previous is None:
+                    raise ValueError("Last bar cannot be revised")
+                state = copy.deepcopy(previous)
+                count -= 1
+            elif last is not None and timestamp < last:
+                raise ValueError("Bars must be added in time order")
+            elif state is None:
+                state = copy.deepcopy(self._state)
+            # Only the newest bar can still change, so only it needs a rollback copy
+            previous = copy.deepcopy(state) if i == len(bars) - 1 else None
+            self._apply(state, float(close))
+            seeds.append((timestamp, {p: ema.value - float(close) for p, ema in state["ema"].items()}))
+            count += 1
+            first = timestamp if first is None else first
+            last = timestamp
+        if state is not None:
+            self._state, self._previous = state, previous
+            self.count, self.first_timestamp, self.last_timestamp = count, first, last
+            for timestamp, seed in seeds:
+                if timestamp not in self._seeds:
+                    self._seed_order.append(timestamp)
+                self._seeds[timestamp] = seed
+            while len(self._seed_order) > self.seed_history:
+                del self._seeds[self._seed_order.popleft()]
+        return self.snapshot()
+
+    def update(self, timestamp, close):
+        """Advances the state by one bar, or revises the last bar if the timestamp repeats."""
+        return self.advance([(timestamp, close)])
+
+    def sync(self, bars):
+        """Feeds the bars of `bars` (a BarWindow or a DataFrame) that the engine has not seen yet.
+
+        The last known bar is re-applied in case it was revised. If the bars
+        do not contain the last known bar (a gap or a different source), or
+        start before the bars the engine remembers, the state is rebuilt from
+        them. Timestamps are UTC epoch nanoseconds.
+
+        The EMAs of the returned state are seeded at the first of `bars`, so
+        they equal ewm(span, adjust=False) over exactly these bars however
+        long the engine has been running.
+        """
+        if hasattr(bars, "timestamps"):
+            index, closes = bars.timestamps, bars.close
+        else:
+            index, closes = bars.index.as_unit("ns").asi8, bars["Close"].to_numpy()
+        start = None
+        self.seed_history = max(self.seed_history, len(index))
+        if self.last_timestamp is not None and len(index) and index[-1] >= self.last_timestamp:
+            pos = index.searchsorted(self.last_timestamp)
+            if pos < len(index) and index[pos] == self.last_timestamp and int(index[0]) in self._seeds:
+                start = pos
+        if start is None:
+            self.reset()
+            start = 0
+        self.advance(zip(index[start:].tolist(), closes[start:].tolist()))
+        if not len(index):
+            return self.snapshot()
+        seed = self._seeds[int(index[0])]
+        reseed = {p: (seed[p], ema.alpha, len(index)) for p, ema in self._state["ema"].items()}
+        return self.snapshot(reseed)
+
+    def snapshot(self, reseed=None):
+        """Returns a read-only view of the current values (EMAs re-seeded as described by IndicatorState)."""
+        return IndicatorState(self._state, self.count, self.sma_windows, self.lags, reseed)
@@ -0,0 +1,71 @@
+import datetime
+import os
+from zoneinfo import ZoneInfo
+
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+# CME Globex metals (GC=F): Sunday 18:00 to Friday 17:00 New York time,
+# with a daily maintenance break from 17:00 to 18:00
+SESSION_OPEN = datetime.time(18, 0)
+SESSION_CLOSE = datetime.time(17, 0)
+FRIDAY, SATURDAY, SUNDAY = 4, 5, 6
+
+DAY_NS = 86_400 * 10**9
+# A session is dated by the day it closes, so shifting by the time left after the open makes it one calendar day
+SESSION_SHIFT_NS = DAY_NS - (SESSION_OPEN.hour * 3600 + SESSION_OPEN.minute * 60) * 10**9
+
+
+def session_days(index, tz=NEW_YORK):
+    """Numbers the trading session of each bar in a DatetimeIndex, as days since the epoch.
+
+    Sessions run from the 18:00 New York open to the next day's close, as in
+    MarketCalendar, so bars either side of midnight share a session. A naive
+    index is taken as UTC.
+    """
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    local = index.tz_convert(tz).tz_localize(None).as_unit("ns").asi8
+    return (local + SESSION_SHIFT_NS) // DAY_NS
+
+
+def parse_holidays(spec=None):
+    """Returns the dates in a comma-separated YYYY-MM-DD list (default: GOLD_MARKET_HOLIDAYS)."""
+    spec = os.getenv("GOLD_MARKET_HOLIDAYS", "") if spec is None else spec
+    return frozenset(datetime.date.fromisoformat(d.strip()) for d in spec.split(",") if d.strip())
+
+
+class MarketCalendar:
+    """Trading hours of gold futures, so the scheduler can sleep while no bars can arrive.
+
+    `holidays` are New York dates with no session until it reopens at 18:00
+    that evening, which is how CME handles its full-day closures. Early
+    closes are not modelled; those bars simply stop changing.
+    """
+    def __init__(self, holidays=(), tz=NEW_YORK):
+        self.holidays = frozenset(holidays)
+        self.tz = tz
+
+    def is_open(self, ts):
+        now = datetime.datetime.fromtimestamp(ts, self.tz)
+        day, t = now.weekday(), now.time()
+        if day == SATURDAY:
+            return False
+        if day == FRIDAY:
+            return t < SESSION_CLOSE and now.date() not in self.holidays
+        if day == SUNDAY or now.date() in self.holidays:
+            return t >= SESSION_OPEN
+        return not (SESSION_CLOSE <= t < SESSION_OPEN)
+
+    def next_open(self, ts):
+        """Returns ts if the market is open, else the epoch time of the next session open."""
+        if self.is_open(ts):
+            return ts
+        now = datetime.datetime.fromtimestamp(ts, self.tz)
+        day = now.date()
+        if now.time() >= SESSION_OPEN:
+            day += datetime.timedelta(days=1)
+        # Sessions open in the evening Sunday to Thursday; a holiday keeps its evening open
+        while day.weekday() in (FRIDAY, SATURDAY):
+            day += datetime.timedelta(days=1)
+        return datetime.datetime.combine(day, SESSION_OPEN, self.tz).timestamp()
@@ -0,0 +1,244 @@
+import cProfile
+import os
+import resource
+import threading
+import time
+from contextlib import ContextDecorator
+
+
+# Upper bounds (seconds) of the stage latency histogram buckets
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value is None:
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def _recreate_cm(self):
+        # A decorated function may run on several threads at once
+        return _Timer(self.registry, self.stage)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.started
+        self.registry.observe(self.stage, self.elapsed)
+        if exc_type is not None:
+            self.registry.inc("stage_errors_total", "Stages that raised", stage=self.stage)
+        return False
+
+
+class Metrics:
+    """Thread-safe counters, gauges and per-stage timings in Prometheus text format.
+
+    Counters and timings are cheap enough to record on every tick: each update
+    is a dict lookup and a few additions under one lock. Gauges registered
+    with a callback are evaluated only when /metrics is scraped.
+    """
+    def __init__(self, namespace="gold_agent", buckets=STAGE_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._gauges = {}
+        self._callbacks = []
+        self._stages = {}
+
+    def inc(self, name, help=None, value=1, **labels):
+        with self._lock:
+            if help:
+                self._help[name] = help
+            key = (name, _labels(labels))
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, help=None, **labels):
+        with self._lock:
+            if help:
+                self._help[name] = help
+            self._gauges[(name, _labels(labels))] = value
+
+    def register(self, callback):
+        """Adds a callback returning [(name, help, value, labels)] gauges, read at scrape time."""
+        self._callbacks.append(callback)
+        return callback
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = {"count": 0, "sum": 0.0, "max": 0.0, "last": 0.0,
+                                               "buckets": [0] * len(self.buckets)}
+            entry["count"] += 1
+            entry["sum"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            entry["last"] = seconds
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+
+    def timed(self, stage):
+        """Times a block or a function (as a decorator) under `stage`."""
+        return _Timer(self, stage)
+
+    def stages(self):
+        """Returns {stage: {count, sum, max, last, mean}} in seconds."""
+        with self._lock:
+            return {stage: dict(entry, buckets=list(entry["buckets"]), mean=entry["sum"] / entry["count"])
+                    for stage, entry in self._stages.items()}
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        ns = self.namespace
+        lines = []
+
+        def family(name, kind, help_text):
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            help_texts = dict(self._help)
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            stages = {stage: dict(entry, buckets=list(entry["buckets"])) for stage, entry in self._stages.items()}
+
+        for callback in self._callbacks:
+            try:
+                for name, help_text, value, labels in callback():
+                    help_texts.setdefault(name, help_text)
+                    gauges.append(((name, _labels(labels)), value))
+            except Exception as e:
+                print(f"Metrics callback error: {e}")
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                family(f"{ns}_{name}", "counter", help_texts.get(name))
+                seen.add(name)
+            lines.append(f"{ns}_{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), value in sorted(gauges, key=lambda item: item[0]):
+            if name not in seen:
+                family(f"{ns}_{name}", "gauge", help_texts.get(name))
+                seen.add(name)
+            lines.append(f"{ns}_{name}{_format_labels(labels)} {_format_value(value)}")
+
+        if stages:
+            family(f"{ns}_stage_seconds", "histogram", "Time spent per pipeline stage")
+            for stage, entry in sorted(stages.items()):
+                labels = (("stage", stage),)
+                for bound, count in zip(self.buckets, entry["buckets"]):
+                    lines.append(f"{ns}_stage_seconds_bucket{_format_labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{ns}_stage_seconds_bucket{_format_labels(labels, [('le', '+Inf')])} {entry['count']}")
+                lines.append(f"{ns}_stage_seconds_sum{_format_labels(labels)} {entry['sum']!r}")
+                lines.append(f"{ns}_stage_seconds_count{_format_labels(labels)} {entry['count']}")
+            family(f"{ns}_stage_last_seconds", "gauge", "Duration of the most recent run of each stage")
+            for stage, entry in sorted(stages.items()):
+                lines.append(f"{ns}_stage_last_seconds{_format_labels((('stage', stage),))} {entry['last']!r}")
+            family(f"{ns}_stage_max_seconds", "gauge", "Slowest run of each stage since start")
+            for stage, entry in sorted(stages.items()):
+                lines.append(f"{ns}_stage_max_seconds{_format_labels((('stage', stage),))} {entry['max']!r}")
+        return "\n".join(lines) + "\n"
+
+
+def process_memory():
+    """Returns (resident bytes, peak resident bytes) of this process."""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = usage.ru_maxrss if os.uname().sysname == "Darwin" else usage.ru_maxrss * 1024
+    try:
+        with open("/proc/self/statm") as f:
+            resident = int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        resident = peak
+    return resident, peak
+
+
+def process_gauges():
+    resident, peak = process_memory()
+    return [
+        ("process_resident_memory_bytes", "Resident memory of the process", resident, {}),
+        ("process_peak_resident_memory_bytes", "Peak resident memory of the process", peak, {}),
+        ("process_cpu_seconds_total", "CPU time used by the process", time.process_time(), {}),
+        ("process_threads", "Live Python threads", threading.active_count(), {}),
+    ]
+
+
+class TickProfiler:
+    """Runs cProfile on a sample of ticks and keeps the dumps of the slow ones.
+
+    Every `sample_every`-th tick is profiled (0 disables profiling); a
+    profiled tick that takes at least `threshold` seconds is written to
+    `directory` as a .prof file, keeping only the newest `keep` dumps.
+    Only the calling thread is profiled, so fetches running on the I/O pool
+    show up as time spent waiting on their futures.
+    """
+    def __init__(self, directory="profiles", threshold=5.0, sample_every=0, keep=20):
+        self.directory = directory
+        self.threshold = threshold
+        self.sample_every = sample_every
+        self.keep = keep
+        self._ticks = 0
+
+    def run(self, fn, *args, **kwargs):
+        """Calls fn, profiling it if this tick is sampled; returns (result, dump path or None)."""
+        self._ticks += 1
+        if not self.sample_every or self._ticks % self.sample_every:
+            return fn(*args, **kwargs), None
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return fn(*args, **kwargs), None
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold:
+            return result, None
+        return result, self._dump(profiler, elapsed)
+
+    def _dump(self, profiler, elapsed):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"tick-{stamp}-{elapsed * 1000:.0f}ms.prof")
+        profiler.dump_stats(path)
+        dumps = sorted(
+            (os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".prof")),
+            key=os.path.getmtime,
+        )
+        for old in dumps[:-self.keep]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        return path
+
+
+# Process-wide registry shared by the agent and the web app
+metrics = Metrics()
+metrics.register(process_gauges)
@@ -0,0 +1,117 @@
+import io
+import re
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+
+
+# Substring keywords, checked against the lower-cased headline; positive wins over negative
+POSITIVE_KEYWORDS = ['up', 'rise', 'cut', 'war', 'tension', 'higher', 'gain', 'safe-haven', 'surge', 'bullish', 'buying']
+NEGATIVE_KEYWORDS = ['fall', 'strong dollar', 'inflation', 'lower', 'negative', 'rate hike', 'hawk', 'drop', 'bearish', 'selling']
+
+# Thai summaries by topic, in priority order; keywords are matched case-sensitively anywhere in the headline
+SUMMARY_RULES = [
+    (("Fed", "Federal Reserve"), "นโยบายดอกเบี้ยของ Fed กำลังส่งแรงกดดันต่อทิศทางราคาทองคำ"),
+    (("Dollar",), "การเคลื่อนไหวของค่าเงินดอลลาร์สหรัฐ (DXY) กระทบต่อความต้องการทองคำ"),
+    (("Central Bank",), "แรงซื้อจากธนาคารกลางต่างประเทศเป็นสัญญานเชิงบวกต่อราคา"),
+    (("Inflation", "CPI"), "ตัวเลขเงินเฟ้อสหรัฐฯ เป็นตัวแปรสำคัญที่นักลงทุนทองคำกำลังเฝ้าติดตาม"),
+    (("Geopolitical", "War", "Conflict"), "ความเสี่ยงทางภูมิรัฐศาสตร์หนุนแรงซื้อทองคำในฐานะสินทรัพย์ปลอดภัย"),
+    (("RSI", "Technical"), "สัญญาณทางเทคนิคบ่งชี้ถึงโอกาสการปรับฐานหรือการไปต่อในระยะสั้น"),
+]
+
+
+def _alternation(keywords):
+    return "|".join(re.escape(kw) for kw in keywords)
+
+
+_POSITIVE = re.compile(_alternation(POSITIVE_KEYWORDS))
+_NEGATIVE = re.compile(_alternation(NEGATIVE_KEYWORDS))
+# One pass over the headline finds every topic; the lowest-numbered group is the rule that wins
+_SUMMARY = re.compile("|".join(f"({_alternation(keywords)})" for keywords, _ in SUMMARY_RULES))
+
+
+@lru_cache(maxsize=4096)
+def classify_headline(title):
+    """Returns (clean_title, impact, summary_th) for one headline; memoized per title."""
+    h_low = title.lower()
+    if _POSITIVE.search(h_low):
+        impact = "Positive"
+    elif _NEGATIVE.search(h_low):
+        impact = "Negative"
+    else:
+        impact = "Neutral"
+
+    # Google News often adds the source at the end like "- Reuters"
+    clean_title = title.split(' - ')[0] if ' - ' in title else title
+
+    rules = [m.lastindex for m in _SUMMARY.finditer(title)]
+    if rules:
+        summary_th = SUMMARY_RULES[min(rules) - 1][1]
+    else:
+        summary_th = f"จับตาประเด็น: {clean_title} ส่งผลต่อความผันผวนของตลาด"
+    return clean_title, impact, summary_th
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _parse_items_soup(content, limit):
+    """Tolerant fallback for feeds that are not well-formed XML."""
+    from bs4 import BeautifulSoup
+    items = []
+    for entry in BeautifulSoup(content, "xml").find_all('item')[:limit]:
+        title = entry.find('title')
+        link = entry.find('link')
+        items.append((title.get_text() if title else "", link.get_text() if link else '#'))
+    return tuple(items)
+
+
+@lru_cache(maxsize=16)
+def parse_items(content, limit=5, chunk_size=16384):
+    """Returns ((title, link), ...) for the first `limit` RSS items.
+
+    The document is fed to a pull parser in chunks and parsing stops as soon
+    as enough items are complete, so the rest of a large feed is never
+    parsed. Results are memoized on the content, so an unchanged feed
+    (e.g. after a 304) costs one hash lookup.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    items = []
+    stream = io.BytesIO(content if isinstance(content, bytes) else content.encode("utf-8"))
+    try:
+        while len(items) < limit:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            for _, elem in parser.read_events():
+                if _local(elem.tag) != "item":
+                    continue
+                title, link = "", "#"
+                for child in elem:
+                    name = _local(child.tag)
+                    if name == "title":
+                        title = child.text or ""
+                    elif name == "link":
+                        link = child.text or ""
+                items.append((title, link))
+                elem.clear()
+                if len(items) >= limit:
+                    break
+    except ET.ParseError:
+        return _parse_items_soup(content, limit)
+    return tuple(items)
+
+
+def headlines(content, limit=5):
+    """Returns structured news dicts (title, impact, summary_th, link) for a feed."""
+    news = []
+    for title, link in parse_items(content, limit):
+        clean_title, impact, summary_th = classify_headline(title)
+        news.append({
+            "title": clean_title,
+            "impact": impact,
+            "summary_th": summary_th,
+            "link": link
+        })
+    return news
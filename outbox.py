@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+import uuid
+from metrics import metrics
+
+
+def split_recipients(recipients):
+    """Accepts a list or a comma-separated string of addresses."""
+    if isinstance(recipients, str):
+        return [r.strip() for r in recipients.split(",") if r.strip()]
+    return list(recipients)
+
+
+class Outbox:
+    """Sends mail from a background worker so callers never wait on SMTP.
+
+    Every queued message is first written to `spool_dir` as a JSON file, so
+    briefings that were not delivered survive a restart. Failed deliveries
+    are retried with exponential backoff; after `max_attempts` a message is
+    moved to `spool_dir/failed`. Passwords are never written to disk: queued
+    messages from an earlier run use `password_for(sender)`.
+    """
+    def __init__(self, mailer, spool_dir="outbox", max_attempts=8, base_delay=5.0, max_delay=900.0, password_for=None):
+        self.mailer = mailer
+        self.spool_dir = spool_dir
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.password_for = password_for or (lambda sender: os.getenv("EMAIL_PASSWORD"))
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._passwords = {}
+        self._sending = 0
+        self._thread = None
+        self._stopping = False
+
+    def _path(self, entry, folder=None):
+        directory = os.path.join(self.spool_dir, folder) if folder else self.spool_dir
+        return os.path.join(directory, f"{entry['id']}.json")
+
+    def _save(self, entry):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = self._path(entry)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def _load_spool(self):
+        if not os.path.isdir(self.spool_dir):
+            return
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.spool_dir, name)) as f:
+                    entry = json.load(f)
+                self._pending.setdefault(entry["id"], entry)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Outbox spool read error ({name}): {e}")
+        if self._pending:
+            print(f"Outbox: {len(self._pending)} unsent message(s) recovered")
+
+    def start(self):
+        """Starts the worker, picking up messages left in the spool by an earlier run."""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._load_spool()
+            self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+            self._thread.start()
+        metrics.register(self._gauges)
+
+    def stop(self, timeout=None):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+        close = getattr(self.mailer, "close", None)
+        if close is not None:
+            close()
+
+    def send(self, sender, password, recipients, message):
+        """Queues a message and returns its id without waiting for delivery."""
+        self.start()
+        entry = {
+            "id": f"{time.time_ns()}-{uuid.uuid4().hex[:8]}",
+            "sender": sender,
+            "recipients": split_recipients(recipients),
+            "message": message,
+            "attempts": 0,
+            "next_attempt": time.time(),
+        }
+        self._save(entry)
+        with self._cond:
+            self._passwords[sender] = password
+            self._pending[entry["id"]] = entry
+            self._cond.notify_all()
+        return entry["id"]
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def flush(self, timeout=None):
+        """Waits until every message due now has been delivered or rescheduled; returns True if the queue is empty."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._sending or any(e["next_attempt"] <= time.time() for e in self._pending.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return not self._pending
+
+    def _gauges(self):
+        return [("outbox_pending", "Emails waiting in the outbox", self.pending(), {})]
+
+    def _next_due(self):
+        """Returns the earliest due message, waiting for one; None once stopped. Caller holds _cond."""
+        while not self._stopping:
+            now = time.time()
+            if self._pending:
+                entry = min(self._pending.values(), key=lambda e: e["next_attempt"])
+                if entry["next_attempt"] <= now:
+                    return entry
+                self._cond.wait(entry["next_attempt"] - now)
+            else:
+                self._cond.wait()
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                entry = self._next_due()
+                if entry is None:
+                    return
+                password = self._passwords.get(entry["sender"]) or self.password_for(entry["sender"])
+                self._sending += 1
+            try:
+                self._deliver(entry, password)
+            finally:
+                with self._cond:
+                    self._sending -= 1
+                    self._cond.notify_all()
+
+    def _deliver(self, entry, password):
+        try:
+            with metrics.timed("email_send"):
+                refused = self.mailer.send(entry["sender"], password, entry["recipients"], entry["message"])
+        except Exception as e:
+            metrics.inc("email_failures_total", "Email delivery attempts that failed")
+            entry["attempts"] += 1
+            if entry["attempts"] >= self.max_attempts:
+                print(f"Outbox: giving up on {entry['id']} after {entry['attempts']} attempts: {e}")
+                self._discard(entry, failed=True)
+                return
+            delay = min(self.max_delay, self.base_delay * 2 ** (entry["attempts"] - 1))
+            entry["next_attempt"] = time.time() + delay
+            self._save(entry)
+            print(f"Outbox: send failed ({e}), retry {entry['attempts']}/{self.max_attempts - 1} in {delay:.0f}s")
+            return
+        if refused:
+            print(f"Outbox: recipients refused for {entry['id']}: {', '.join(refused)}")
+        metrics.inc("emails_sent_total", "Emails delivered")
+        self._discard(entry)
+
+    def _discard(self, entry, failed=False):
+        with self._cond:
+            self._pending.pop(entry["id"], None)
+        try:
+            if failed:
+                os.makedirs(os.path.join(self.spool_dir, "failed"), exist_ok=True)
+                os.replace(self._path(entry), self._path(entry, "failed"))
+            else:
+                os.remove(self._path(entry))
+        except OSError as e:
+            print(f"Outbox spool error ({entry['id']}): {e}")
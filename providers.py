@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import pickle
+import smtplib
+import threading
+import time
+from metrics import metrics
+from outbox import Outbox
+
+
+class YFinanceSource:
+    """Live price history from Yahoo Finance (yfinance is imported on first use)."""
+    def history(self, symbol, **kwargs):
+        import yfinance as yf
+        return yf.Ticker(symbol).history(**kwargs)
+
+    def download(self, tickers, **kwargs):
+        import yfinance as yf
+        return yf.download(tickers, **kwargs)
+
+
+class HttpNewsSource:
+    """Live RSS fetches over one pooled HTTP session.
+
+    Feeds are requested conditionally (If-None-Match / If-Modified-Since);
+    on 304 Not Modified the previously downloaded bytes are returned as the
+    same object, which lets the parse cache in news_feed skip the work.
+    """
+    def __init__(self, pool_size=4):
+        import requests
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._validators = {}
+
+    def fetch(self, url, headers=None, timeout=10):
+        headers = dict(headers or {})
+        with self._lock:
+            cached = self._validators.get(url)
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        resp = self.session.get(url, headers=headers, timeout=timeout)
+        if resp.status_code == 304 and cached is not None:
+            metrics.inc("news_not_modified_total", "News feeds that were unchanged since the last fetch")
+            return cached[2]
+        resp.raise_for_status()
+        with self._lock:
+            self._validators[url] = (resp.headers.get("ETag"), resp.headers.get("Last-Modified"), resp.content)
+        return resp.content
+
+
+class SmtpMailer:
+    """Sends mail over SMTP, reusing one authenticated connection between messages.
+
+    With `secure` (the default) the connection is upgraded with STARTTLS and
+    logged in; a local SMTP stand-in can be used with secure=False. A
+    connection idle for longer than `idle_timeout` seconds, or one the server
+    has dropped, is replaced transparently.
+    """
+    def __init__(self, host="smtp.gmail.com", port=587, secure=True, timeout=30, idle_timeout=240):
+        self.host = host
+        self.port = port
+        self.secure = secure
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._server = None
+        self._login = None
+        self._last_used = 0.0
+
+    def _connect(self, sender, password):
+        self.close()
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.secure:
+            server.starttls()
+            server.login(sender, password)
+        self._server, self._login = server, (sender, password)
+
+    def close(self):
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+    def send(self, sender, password, recipients, message):
+        """Sends one message; returns the recipients the server refused."""
+        with self._lock:
+            stale = time.monotonic() - self._last_used > self.idle_timeout
+            if self._server is None or self._login != (sender, password) or stale:
+                self._connect(sender, password)
+            try:
+                refused = self._server.sendmail(sender, recipients, message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # The server closed a connection we considered alive; one fresh attempt
+                self._connect(sender, password)
+                refused = self._server.sendmail(sender, recipients, message)
+            except smtplib.SMTPException:
+                self.close()
+                raise
+            self._last_used = time.monotonic()
+            return refused
+
+
+class FixtureStore:
+    """Recorded responses on disk, one directory per distinct request.
+
+    Every response to the same request is kept in order, so a replay walks
+    through the same sequence the live run saw and then repeats the last one.
+    """
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._recorded = {}
+        self._replayed = {}
+
+    def _dir(self, kind, request):
+        blob = json.dumps([kind, request], sort_keys=True, default=str)
+        key = hashlib.blake2b(blob.encode("utf-8"), digest_size=10).hexdigest()
+        return os.path.join(self.root, kind, key), blob
+
+    def save(self, kind, request, value):
+        path, blob = self._dir(kind, request)
+        with self._lock:
+            os.makedirs(path, exist_ok=True)
+            if path not in self._recorded:
+                with open(os.path.join(path, "request.json"), "w") as f:
+                    f.write(blob)
+                self._recorded[path] = len([n for n in os.listdir(path) if n.endswith(".pkl")])
+            seq = self._recorded[path]
+            self._recorded[path] = seq + 1
+        with open(os.path.join(path, f"{seq:05d}.pkl"), "wb") as f:
+            pickle.dump(value, f)
+
+    def load(self, kind, request):
+        path, blob = self._dir(kind, request)
+        with self._lock:
+            if path not in self._replayed:
+                if not os.path.isdir(path):
+                    raise KeyError(f"No recorded {kind} response for {blob}")
+                self._replayed[path] = [sorted(n for n in os.listdir(path) if n.endswith(".pkl")), 0]
+            files, pos = self._replayed[path]
+            if not files:
+                raise KeyError(f"No recorded {kind} response for {blob}")
+            name = files[min(pos, len(files) - 1)]
+            self._replayed[path][1] = pos + 1
+        with open(os.path.join(path, name), "rb") as f:
+            return pickle.load(f)
+
+    def rewind(self):
+        """Starts every replayed sequence from its first response again."""
+        with self._lock:
+            for entry in self._replayed.values():
+                entry[1] = 0
+
+
+class RecordingPriceSource:
+    def __init__(self, live, store):
+        self.live = live
+        self.store = store
+
+    def history(self, symbol, **kwargs):
+        frame = self.live.history(symbol, **kwargs)
+        self.store.save("history", [symbol, kwargs], frame)
+        return frame
+
+    def download(self, tickers, **kwargs):
+        frame = self.live.download(tickers, **kwargs)
+        self.store.save("download", [sorted(tickers), kwargs], frame)
+        return frame
+
+
+class ReplayPriceSource:
+    def __init__(self, store):
+        self.store = store
+
+    def history(self, symbol, **kwargs):
+        return self.store.load("history", [symbol, kwargs]).copy()
+
+    def download(self, tickers, **kwargs):
+        return self.store.load("download", [sorted(tickers), kwargs]).copy()
+
+
+class RecordingNewsSource:
+    def __init__(self, live, store):
+        self.live = live
+        self.store = store
+
+    def fetch(self, url, headers=None, timeout=10):
+        content = self.live.fetch(url, headers=headers, timeout=timeout)
+        self.store.save("news", [url], content)
+        return content
+
+
+class ReplayNewsSource:
+    def __init__(self, store):
+        self.store = store
+
+    def fetch(self, url, headers=None, timeout=10):
+        return self.store.load("news", [url])
+
+
+class CaptureMailer:
+    """Keeps messages in memory (and optionally on disk), also passing them to `live` if given."""
+    def __init__(self, live=None, store=None):
+        self.live = live
+        self.store = store
+        self.sent = []
+
+    def start(self):
+        """Starts the live mailer's worker if it has one (an Outbox delivering an earlier run's spool)."""
+        start = getattr(self.live, "start", None)
+        if start is not None:
+            start()
+
+    def send(self, sender, password, recipients, message):
+        if self.live is not None:
+            self.live.send(sender, password, recipients, message)
+        self.sent.append((sender, recipients, message))
+        if self.store is not None:
+            self.store.save("email", [sender, recipients], message)
+
+
+def smtp_from_env():
+    """SmtpMailer configured by SMTP_HOST, SMTP_PORT and SMTP_SECURE (0 for a plain local server)."""
+    return SmtpMailer(
+        host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+        port=int(os.getenv("SMTP_PORT", "587")),
+        secure=os.getenv("SMTP_SECURE", "1") != "0",
+    )
+
+
+def outbox_from_env():
+    """Outbox delivering through smtp_from_env(), spooling to OUTBOX_DIR."""
+    return Outbox(smtp_from_env(), spool_dir=os.getenv("OUTBOX_DIR", "outbox"))
+
+
+def build_providers(mode=None, root=None):
+    """Returns (price_source, news_source, mailer) for 'live', 'record' or 'replay' mode.
+
+    Defaults come from GOLD_PROVIDER_MODE and GOLD_FIXTURES_DIR.
+    """
+    mode = mode or os.getenv("GOLD_PROVIDER_MODE", "live")
+    root = root or os.getenv("GOLD_FIXTURES_DIR", "fixtures")
+    if mode == "live":
+        # Briefings are queued and delivered in the background
+        return YFinanceSource(), HttpNewsSource(), outbox_from_env()
+    store = FixtureStore(root)
+    if mode == "record":
+        # Recorded sessions still deliver, through the same outbox so SMTP never blocks a tick
+        return (RecordingPriceSource(YFinanceSource(), store),
+                RecordingNewsSource(HttpNewsSource(), store),
+                CaptureMailer(live=outbox_from_env(), store=store))
+    if mode == "replay":
+        return ReplayPriceSource(store), ReplayNewsSource(store), CaptureMailer()
+    raise ValueError(f"Unknown provider mode: {mode}")
@@ -0,0 +1,158 @@
+import numpy as np
+
+
+def _prefix(values):
+    """Prefix sums with a leading zero, so window sums are P[hi] - P[lo]."""
+    out = np.zeros(len(values) + 1)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def ols_fit(y, weights=None):
+    """Fits y = intercept + slope * x for x = 0..n-1 and returns (slope, intercept).
+
+    Matches LinearRegression().fit(X, y, sample_weight=weights) on a single
+    time-index feature, including the flat fit for a single sample.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    w = np.ones(len(y)) if weights is None else np.asarray(weights, dtype=np.float64)
+    x = np.arange(len(y), dtype=np.float64)
+    sw = w.sum()
+    x_mean = (w * x).sum() / sw
+    y_mean = (w * y).sum() / sw
+    sxx = (w * (x - x_mean) ** 2).sum()
+    slope = (w * (x - x_mean) * (y - y_mean)).sum() / sxx if sxx > 0 else 0.0
+    return slope, y_mean - slope * x_mean
+
+
+def walk_forward_predictions(y, weights=None, recent_weight=1.0, recent_count=0):
+    """One-step-ahead predictions of an expanding-window OLS trend in O(n).
+
+    preds[t] is the fit on y[:t] against x = 0..t-1, evaluated at x = t, which
+    is what refitting LinearRegression at every point produces. `weights` are
+    per-sample weights; additionally the last `recent_count` samples of every
+    window are multiplied by `recent_weight`, like predict_next_price does.
+    preds[0] is NaN because there is nothing to train on.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    preds = np.full(n, np.nan)
+    if n < 2:
+        return preds
+    # Centering y keeps the running sums small and well conditioned
+    offset = y[0]
+    yc = y - offset
+    x = np.arange(n, dtype=np.float64)
+    w = np.ones(n) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    columns = (w, w * x, w * x * x, w * yc, w * x * yc)
+    prefixes = [_prefix(c) for c in columns]
+    t = np.arange(1, n)
+    sums = [p[t] for p in prefixes]
+    if recent_count > 0 and recent_weight != 1.0:
+        lo = np.maximum(t - recent_count, 0)
+        for i, p in enumerate(prefixes):
+            sums[i] = sums[i] + (recent_weight - 1.0) * (p[t] - p[lo])
+    s0, s1, s2, sy, sxy = sums
+
+    denom = s0 * s2 - s1 * s1
+    safe = denom > 0
+    slope = np.where(safe, (s0 * sxy - s1 * sy) / np.where(safe, denom, 1.0), 0.0)
+    intercept = (sy - slope * s1) / s0
+    preds[1:] = intercept + slope * t + offset
+    return preds
+
+
+def rolling_slopes(y, window, recent_count=0, recent_weight=1.0):
+    """Slope of the weighted OLS trend over every trailing `window` samples.
+
+    out[t] is the slope fitted to y[t-window+1:t+1] against x = 0..window-1,
+    with the last `recent_count` samples weighted by `recent_weight` as in
+    predict_next_price. The design is the same for every window, so the
+    slope is a fixed linear filter of y and all of them come from one
+    correlation. The first window-1 entries are NaN.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    out = np.full(len(y), np.nan)
+    if window < 2 or len(y) < window:
+        return out
+    w = np.ones(window)
+    if recent_count > 0:
+        w[-recent_count:] = recent_weight
+    x = np.arange(window, dtype=np.float64)
+    x_mean = (w * x).sum() / w.sum()
+    kernel = w * (x - x_mean)
+    kernel /= (kernel * (x - x_mean)).sum()
+    out[window - 1:] = np.correlate(y, kernel, mode="valid")
+    return out
+
+
+def rolling_forecasts(y, window):
+    """One-step-ahead predictions of an OLS trend over a sliding `window`.
+
+    out[t] is the fit on y[t-window:t] against x = 0..window-1, evaluated at
+    x = window, so it can be compared with y[t] like walk_forward_predictions
+    but without the expanding window. Like rolling_slopes this is a fixed
+    linear filter of y. The first `window` entries are NaN.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    out = np.full(len(y), np.nan)
+    if window < 2 or len(y) <= window:
+        return out
+    x = np.arange(window, dtype=np.float64)
+    xc = x - x.mean()
+    kernel = 1.0 / window + (window - x.mean()) * xc / (xc * xc).sum()
+    out[window:] = np.correlate(y[:-1], kernel, mode="valid")
+    return out
+
+
+def horizon_kernels(window, horizons, recent_count=0, recent_weight=1.0):
+    """Linear filters for the weighted OLS trend over `window` samples, extrapolated.
+
+    Row k applied to the last `window` samples gives the fitted trend
+    `horizons[k]` steps past the last sample, with the last `recent_count`
+    samples weighted by `recent_weight` as in rolling_slopes.
+    """
+    w = np.ones(window)
+    if recent_count > 0:
+        w[-recent_count:] = recent_weight
+    x = np.arange(window, dtype=np.float64)
+    x_mean = (w * x).sum() / w.sum()
+    xc = x - x_mean
+    targets = window - 1 + np.asarray(horizons, dtype=np.float64)
+    return w / w.sum() + np.outer(targets - x_mean, w * xc / (w * xc * xc).sum())
+
+
+def trend_forecasts(y, window, horizons, recent_count=0, recent_weight=1.0, level=0.8, min_errors=10):
+    """Point forecasts and empirical prediction intervals for several horizons at once.
+
+    The trend is fitted to the last `window` samples and extrapolated to
+    every horizon. The interval for horizon h is the central `level` range
+    of the errors the same fit made h steps ahead over the rest of `y`; all
+    past fits come from one matrix product over sliding windows. Horizons
+    with fewer than `min_errors` past errors use the errors of the first
+    (shortest) horizon scaled by sqrt(h / h0). Returns (points, lower,
+    upper), with NaN bounds when even the first horizon has too few errors.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    horizons = np.asarray(horizons, dtype=np.int64)
+    kernels = horizon_kernels(window, horizons, recent_count, recent_weight)
+    points = kernels @ y[-window:]
+    lower = np.full(len(horizons), np.nan)
+    upper = np.full(len(horizons), np.nan)
+
+    # Every past window's forecasts for all horizons, and the sample each one aimed at
+    past = np.lib.stride_tricks.sliding_window_view(y, window) @ kernels.T
+    targets = np.arange(len(past))[:, None] + window - 1 + horizons
+    reached = targets < len(y)
+    errors = np.where(reached, y[np.minimum(targets, len(y) - 1)] - past, np.nan)
+
+    counts = (~np.isnan(errors)).sum(axis=0)
+    if counts[0] < min_errors:
+        return points, lower, upper
+    # Horizons with too little history borrow the shortest horizon's errors, random-walk scaled
+    short = counts < min_errors
+    errors[:, short] = errors[:, :1] * np.sqrt(horizons[short] / horizons[0])
+    tail = (1.0 - level) / 2
+    lo, hi = np.nanquantile(errors, [tail, 1.0 - tail], axis=0)
+    return points, points + lo, points + hi
@@ -0,0 +1,140 @@
+import fcntl
+import mmap
+import os
+import struct
+import time
+
+
+# magic, sequence number, payload length
+HEADER = struct.Struct("<4s4xQQ")
+MAGIC = b"GSS1"
+_U64 = struct.Struct("<Q")
+SEQ_OFFSET, LENGTH_OFFSET = 8, 16
+
+
+class LeaderLock:
+    """Exclusive, non-blocking flock on a file: the holder is the one process that computes.
+
+    The kernel drops the lock when the holding process exits, however it
+    exits, so any process still calling try_acquire() takes over.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def try_acquire(self):
+        """Returns True if this process holds (or just took) the lock."""
+        if self._fd is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode("ascii"))
+        self._fd = fd
+        return True
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+class SharedRegion:
+    """One byte blob in a memory-mapped file, replaced by one writer and read by any number of processes.
+
+    Writes follow a seqlock: the sequence number is odd while the payload is
+    being replaced and even once it is complete, so a reader that sees the
+    same even number before and after copying has a consistent payload.
+    Checking for a new version reads only the 24-byte header, and an
+    unchanged payload is returned from the reader's own copy.
+    """
+    def __init__(self, path, capacity=1 << 20):
+        self.path = path
+        self.capacity = capacity
+        self._mm = None
+        self._seq = 0
+        self._payload = None
+
+    def _map(self, size=0):
+        """(Re)maps the file, growing it to at least `size` bytes when writing."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if size:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        elif not os.path.exists(self.path):
+            return False
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            length = os.fstat(fd).st_size
+            if length < size:
+                os.ftruncate(fd, size)
+                length = size
+            if length < HEADER.size:
+                return False
+            self._mm = mmap.mmap(fd, length)
+        finally:
+            os.close(fd)
+        return True
+
+    def _header(self):
+        magic, seq, length = HEADER.unpack_from(self._mm, 0)
+        return (seq, length) if magic == MAGIC else (0, 0)
+
+    def write(self, payload):
+        """Replaces the payload (single writer only)."""
+        needed = HEADER.size + len(payload)
+        if self._mm is None or len(self._mm) < needed:
+            size = self.capacity
+            while size < needed:
+                size *= 2
+            self._map(size)
+        seq, _ = self._header()
+        # Odd while writing; continues from a crashed writer's odd value too
+        seq = (seq + 1) | 1
+        self._mm[0:4] = MAGIC
+        _U64.pack_into(self._mm, SEQ_OFFSET, seq)
+        self._mm[HEADER.size:needed] = payload
+        # Length before sequence: a reader that sees the new number also sees the new length
+        _U64.pack_into(self._mm, LENGTH_OFFSET, len(payload))
+        _U64.pack_into(self._mm, SEQ_OFFSET, seq + 1)
+        self._seq, self._payload = seq + 1, bytes(payload)
+
+    def version(self):
+        """Sequence number of the current payload; 0 if nothing was written yet."""
+        if self._mm is None and not self._map():
+            return 0
+        return self._header()[0]
+
+    def read(self, retries=100):
+        """Returns (version, payload); payload is None if nothing was written yet."""
+        for _ in range(retries):
+            if self._mm is None and not self._map():
+                return 0, None
+            seq, length = self._header()
+            if seq == self._seq:
+                return seq, self._payload
+            if seq == 0:
+                return 0, None
+            if seq & 1:
+                time.sleep(0.0005)
+                continue
+            if HEADER.size + length > len(self._mm):
+                # The writer grew the file since we mapped it
+                self._map()
+                continue
+            payload = bytes(self._mm[HEADER.size:HEADER.size + length])
+            if self._header()[0] == seq:
+                self._seq, self._payload = seq, payload
+                return seq, payload
+        return self._seq, self._payload
@@ -0,0 +1,233 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# A locked hour counts as a hit when the prediction was within 0.5% of the actual price
+HIT_TOLERANCE = 0.005
+
+DAY = 86400
+# Bucket length of each rollup tier, and the offset that aligns weekly buckets to Monday 00:00 UTC
+ROLLUP_PERIODS = {"daily": DAY, "weekly": 7 * DAY}
+ROLLUP_OFFSETS = {"daily": 0, "weekly": 4 * DAY}
+
+
+def bucket_start(period, ts):
+    """Start (UTC epoch) of the `period` rollup bucket that contains ts."""
+    size, offset = ROLLUP_PERIODS[period], ROLLUP_OFFSETS[period]
+    return ts - (ts - offset) % size
+
+
+class SnapshotStore:
+    """SQLite storage for locked hourly snapshots and the locked forecast.
+
+    Snapshots are indexed by their UTC hour timestamp, so appends and
+    time-range queries cost O(log n) no matter how many hours are stored.
+    WAL journaling keeps every write atomic and crash-safe. Existing
+    snapshots.json / locked_forecast.json files are imported on first use.
+
+    Every snapshot is also folded into daily and weekly rollups (sums of
+    prices and errors, so a bucket is updated in place). evict() drops raw
+    hours older than `raw_days` and daily rollups older than `daily_days`;
+    weekly rollups are kept, at 52 rows a year. None keeps a tier forever.
+    """
+    def __init__(self, path="gold_agent.db", legacy_snapshots="snapshots.json", legacy_forecast="locked_forecast.json",
+                 raw_days=None, daily_days=None):
+        self.path = path
+        self.raw_days = raw_days
+        self.daily_days = daily_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # Lets evict() return freed pages to the OS; only takes effect on a new database
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots (ts REAL PRIMARY KEY, actual REAL NOT NULL, predicted REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollups ("
+                "period TEXT NOT NULL, start REAL NOT NULL, count INTEGER NOT NULL, "
+                "sum_actual REAL NOT NULL, sum_predicted REAL NOT NULL, sum_abs_error REAL NOT NULL, "
+                "sum_sq_error REAL NOT NULL, max_abs_error REAL NOT NULL, hits INTEGER NOT NULL, "
+                "PRIMARY KEY (period, start))"
+            )
+        self._import_legacy(legacy_snapshots, legacy_forecast)
+        self._build_rollups()
+
+    def _import_legacy(self, snapshots_file, forecast_file):
+        """Moves data from the old JSON files into the database once."""
+        with self._lock, self._conn:
+            if self._conn.execute("SELECT value FROM state WHERE key = 'legacy_imported'").fetchone():
+                return
+            if snapshots_file and os.path.exists(snapshots_file):
+                try:
+                    with open(snapshots_file, "r") as f:
+                        data = json.load(f)
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO snapshots (ts, actual, predicted) VALUES (?, ?, ?)",
+                        [(float(k), v["actual"], v["predicted"]) for k, v in data.items()],
+                    )
+                    print(f"Imported {len(data)} snapshots from {snapshots_file}")
+                except Exception as e:
+                    print(f"Error importing snapshots: {e}")
+            if forecast_file and os.path.exists(forecast_file):
+                try:
+                    with open(forecast_file, "r") as f:
+                        forecast = json.load(f)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO state (key, value) VALUES ('locked_forecast', ?)", (json.dumps(forecast),)
+                    )
+                except Exception as e:
+                    print(f"Error importing forecast: {e}")
+            # OR IGNORE: several worker processes may open the database at the same time
+            self._conn.execute("INSERT OR IGNORE INTO state (key, value) VALUES ('legacy_imported', '1')")
+
+    def _build_rollups(self):
+        """Rolls up snapshots stored before rollups existed, once."""
+        with self._lock, self._conn:
+            if self._conn.execute("SELECT value FROM state WHERE key = 'rollups_built'").fetchone():
+                return
+            for period, size in ROLLUP_PERIODS.items():
+                offset = ROLLUP_OFFSETS[period]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rollups "
+                    "SELECT ?, CAST(ts AS INTEGER) - ((CAST(ts AS INTEGER) - ?) % ?), COUNT(*), SUM(actual), SUM(predicted), "
+                    "SUM(ABS(actual - predicted)), SUM((actual - predicted) * (actual - predicted)), "
+                    "MAX(ABS(actual - predicted)), SUM(ABS(actual - predicted) < actual * ?) "
+                    "FROM snapshots GROUP BY 2",
+                    (period, offset, size, HIT_TOLERANCE),
+                )
+            self._conn.execute("INSERT OR IGNORE INTO state (key, value) VALUES ('rollups_built', '1')")
+
+    def add(self, ts, actual, predicted):
+        """Stores a snapshot for an hour unless one is already locked, and folds it into the rollups; returns True if stored."""
+        ts, actual, predicted = float(ts), float(actual), float(predicted)
+        error = abs(actual - predicted)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO snapshots (ts, actual, predicted) VALUES (?, ?, ?)", (ts, actual, predicted)
+            )
+            if cursor.rowcount != 1:
+                return False
+            self._conn.executemany(
+                "INSERT INTO rollups VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (period, start) DO UPDATE SET count = count + 1, "
+                "sum_actual = sum_actual + excluded.sum_actual, sum_predicted = sum_predicted + excluded.sum_predicted, "
+                "sum_abs_error = sum_abs_error + excluded.sum_abs_error, sum_sq_error = sum_sq_error + excluded.sum_sq_error, "
+                "max_abs_error = MAX(max_abs_error, excluded.max_abs_error), hits = hits + excluded.hits",
+                [(period, bucket_start(period, ts), actual, predicted, error, error * error, error,
+                  int(error < actual * HIT_TOLERANCE)) for period in ROLLUP_PERIODS],
+            )
+            return True
+
+    def get(self, ts):
+        """Returns the snapshot for an hour, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT actual, predicted FROM snapshots WHERE ts = ?", (float(ts),)).fetchone()
+        return {"actual": row[0], "predicted": row[1]} if row else None
+
+    def recent(self, n):
+        """Returns the latest n snapshots as (ts, snapshot) pairs, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts, actual, predicted FROM snapshots ORDER BY ts DESC LIMIT ?", (n,)
+            ).fetchall()
+        return [(ts, {"actual": actual, "predicted": predicted}) for ts, actual, predicted in rows]
+
+    def range(self, start, end):
+        """Returns {ts: snapshot} for start <= ts <= end."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts, actual, predicted FROM snapshots WHERE ts BETWEEN ? AND ? ORDER BY ts", (float(start), float(end))
+            ).fetchall()
+        return {ts: {"actual": actual, "predicted": predicted} for ts, actual, predicted in rows}
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+
+    def rollups(self, period, start=None, end=None, limit=None):
+        """Returns `period` ("daily" or "weekly") aggregates, oldest first, optionally the latest `limit` only.
+
+        Each entry has the bucket start, the number of locked hours, mean
+        actual and predicted prices, mean absolute and RMS error, the largest
+        error and the hit rate in percent.
+        """
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"Unknown rollup period: {period}")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM (SELECT start, count, sum_actual, sum_predicted, sum_abs_error, sum_sq_error, "
+                "max_abs_error, hits FROM rollups WHERE period = ? AND start BETWEEN ? AND ? ORDER BY start DESC LIMIT ?) "
+                "ORDER BY start",
+                (period, float("-inf") if start is None else float(start), float("inf") if end is None else float(end),
+                 -1 if limit is None else int(limit)),
+            ).fetchall()
+        return [{
+            "start": start,
+            "count": count,
+            "actual": sum_actual / count,
+            "predicted": sum_predicted / count,
+            "mae": sum_abs_error / count,
+            "rmse": (sum_sq_error / count) ** 0.5,
+            "max_error": max_abs_error,
+            "hit_rate": hits / count * 100,
+        } for start, count, sum_actual, sum_predicted, sum_abs_error, sum_sq_error, max_abs_error, hits in rows]
+
+    def rollup_count(self):
+        """Returns {period: stored buckets}."""
+        with self._lock:
+            rows = self._conn.execute("SELECT period, COUNT(*) FROM rollups GROUP BY period").fetchall()
+        return {**dict.fromkeys(ROLLUP_PERIODS, 0), **dict(rows)}
+
+    def evict(self, now=None):
+        """Drops raw snapshots and daily rollups past their retention; returns (snapshots, daily rollups) removed.
+
+        Snapshots are rolled up when they are added, so nothing is lost from
+        the daily and weekly history.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            with self._conn:
+                raw = daily = 0
+                if self.raw_days is not None:
+                    raw = self._conn.execute(
+                        "DELETE FROM snapshots WHERE ts < ?", (now - self.raw_days * DAY,)
+                    ).rowcount
+                if self.daily_days is not None:
+                    daily = self._conn.execute(
+                        "DELETE FROM rollups WHERE period = 'daily' AND start < ?", (now - self.daily_days * DAY,)
+                    ).rowcount
+            if raw or daily:
+                # execute() would only step it once, releasing a single page
+                self._conn.executescript("PRAGMA incremental_vacuum;")
+        return raw, daily
+
+    def load_forecast(self):
+        """Returns the locked forecast, or an empty one."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = 'locked_forecast'").fetchone()
+        if row:
+            try:
+                return json.loads(row[0])
+            except ValueError:
+                pass
+        return {
+            "price": None,
+            "target_hour": None,
+            "raw_trend": None,
+            "confidence": None
+        }
+
+    def save_forecast(self, forecast):
+        """Replaces the locked forecast in one transaction."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (key, value) VALUES ('locked_forecast', ?)",
+                (json.dumps(forecast, default=float),),
+            )
@@ -0,0 +1,211 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from metrics import metrics
+
+
+class SourceHealth:
+    """Latency and success statistics of one source, plus its circuit breaker.
+
+    Latency and success rate are exponentially weighted, so a source that
+    recovers is trusted again within a few requests. After
+    `failure_threshold` consecutive failures the breaker opens and the
+    source is skipped for `cooldown` seconds; then one trial request is let
+    through, and each failed trial doubles the cooldown up to `max_cooldown`.
+    """
+    def __init__(self, name, failure_threshold=3, cooldown=30.0, max_cooldown=600.0, alpha=0.2):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.alpha = alpha
+        self.latency = None
+        self.deviation = 0.0
+        self.success_rate = 1.0
+        self.consecutive_failures = 0
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self.trial_running = False
+
+    def allow(self, now):
+        """True if a request may be sent now; claims the trial slot of a half-open breaker."""
+        if self.consecutive_failures < self.failure_threshold:
+            return True
+        if now < self.open_until or self.trial_running:
+            return False
+        self.trial_running = True
+        return True
+
+    def record(self, ok, seconds, now):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.deviation += self.alpha * (abs(seconds - self.latency) - self.deviation)
+            self.latency += self.alpha * (seconds - self.latency)
+        self.success_rate += self.alpha * ((1.0 if ok else 0.0) - self.success_rate)
+        was_trial, self.trial_running = self.trial_running, False
+        if ok:
+            self.consecutive_failures = 0
+            self.cooldown = self.base_cooldown
+            return
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            if was_trial:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self.open_until = now + self.cooldown
+
+    @property
+    def state(self):
+        if self.consecutive_failures < self.failure_threshold:
+            return "closed"
+        return "half_open" if time.monotonic() >= self.open_until else "open"
+
+    def hedge_delay(self, floor, ceiling):
+        """Seconds to wait on this source before also asking the next one: its usual latency plus some slack."""
+        if self.latency is None:
+            return ceiling
+        if self.success_rate < 0.5:
+            return floor
+        return min(max(self.latency + 3 * self.deviation, floor), ceiling)
+
+
+class SourceChain:
+    """Fetches from the first usable of several sources in priority order, hedging slow ones.
+
+    The primary source gets a head start of about its normal latency; if it
+    has not produced a usable result by then (or fails, or returns too
+    little data) the next source is started as well. A usable result from a
+    lower-priority source only wins at once if every source above it has
+    failed; while a higher one is still running it is held for up to
+    `grace` seconds (never past the deadline) in case the better source
+    answers after all. Sources behind an open circuit breaker are skipped.
+    Requests that lose the race still finish in the background and update
+    their source's statistics.
+    """
+    def __init__(self, sources, label=None, min_hedge=0.25, max_hedge=2.0, grace=1.0, max_workers=4, **breaker):
+        self.sources = list(sources)
+        self.label = label or (lambda source: " ".join(str(part) for part in source))
+        self.min_hedge = min_hedge
+        self.max_hedge = max_hedge
+        self.grace = grace
+        self.health = {source: SourceHealth(self.label(source), **breaker) for source in self.sources}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="source-chain")
+        metrics.register(self._gauges)
+
+    def submit(self, fn, *args, **kwargs):
+        """Runs a side request on the chain's own threads, e.g. alongside fetch()."""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def _call(self, fetch, accept, source):
+        started = time.monotonic()
+        try:
+            result = fetch(source)
+            ok = accept(result)
+            outcome = "ok" if ok else "insufficient"
+        except Exception as e:
+            print(f"Source {self.label(source)} failed: {e}")
+            result, ok, outcome = None, False, "error"
+        now = time.monotonic()
+        with self._lock:
+            self.health[source].record(ok, now - started, now)
+        metrics.inc("source_requests_total", "Requests per data source and outcome", source=self.label(source), outcome=outcome)
+        return result if ok else None
+
+    def fetch(self, fetch, accept, deadline=None):
+        """Returns (source, result) from the highest-priority source whose result passes `accept`, or (None, None).
+
+        `fetch(source)` performs the request; `deadline` is a time.monotonic()
+        value after which no further source is waited on.
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [source for source in self.sources if self.health[source].allow(now)]
+        if not candidates:
+            # Every breaker is open: try the primary rather than return nothing
+            candidates = self.sources[:1]
+        running = {}
+        next_index = 0
+        launch = True
+        last = None
+        # Usable result of a lower-priority source, as (rank, source, result), held while a better one runs
+        best = None
+        grace_until = None
+        while running or next_index < len(candidates):
+            # The next source is started when the last one failed or has run past its usual latency
+            if best is None and next_index < len(candidates) and (launch or not running or time.monotonic() >= self._hedge_at(*last[1:])):
+                source = candidates[next_index]
+                if next_index:
+                    metrics.inc("source_hedges_total", "Requests sent because the previous source was slow or failed", source=self.label(source))
+                last = (next_index, source, time.monotonic())
+                running[self._pool.submit(self._call, fetch, accept, source)] = last
+                next_index += 1
+                launch = False
+                continue
+            timeouts = []
+            if best is None and next_index < len(candidates):
+                timeouts.append(self._hedge_at(*last[1:]))
+            if deadline is not None:
+                timeouts.append(deadline)
+            if grace_until is not None:
+                timeouts.append(grace_until)
+            timeout = min(timeouts) - time.monotonic() if timeouts else None
+            if timeout is not None and timeout <= 0 and (best is not None or (deadline is not None and time.monotonic() >= deadline)):
+                if best is not None:
+                    metrics.inc("source_grace_expired_total", "Lower-priority results used because a better source was still running",
+                                source=self.label(best[1]))
+                break
+            done, _ = wait(running, timeout=max(0.0, timeout) if timeout is not None else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                rank, source, _ = running.pop(future)
+                result = future.result()
+                if result is None:
+                    # A failed source hands over to the next one at once
+                    launch = True
+                elif best is None or rank < best[0]:
+                    best = (rank, source, result)
+                    if grace_until is None:
+                        grace_until = time.monotonic() + self.grace
+            if best is not None and not any(rank < best[0] for rank, _, _ in running.values()):
+                break
+        self._release(candidates[next_index:])
+        return (best[1], best[2]) if best is not None else (None, None)
+
+    def _release(self, sources):
+        """Gives back the trial slots claimed by allow() for sources that were never asked."""
+        with self._lock:
+            for source in sources:
+                self.health[source].trial_running = False
+
+    def reset(self):
+        """Forgets all statistics and closes every breaker."""
+        with self._lock:
+            for source, health in self.health.items():
+                breaker = dict(failure_threshold=health.failure_threshold, cooldown=health.base_cooldown,
+                               max_cooldown=health.max_cooldown, alpha=health.alpha)
+                self.health[source] = SourceHealth(health.name, **breaker)
+
+    def _hedge_at(self, source, started):
+        with self._lock:
+            return started + self.health[source].hedge_delay(self.min_hedge, self.max_hedge)
+
+    def stats(self):
+        """Returns {source label: {state, latency, success_rate, consecutive_failures}}."""
+        with self._lock:
+            return {
+                health.name: {
+                    "state": health.state,
+                    "latency": health.latency,
+                    "success_rate": health.success_rate,
+                    "consecutive_failures": health.consecutive_failures,
+                }
+                for health in self.health.values()
+            }
+
+    def _gauges(self):
+        gauges = []
+        for name, entry in self.stats().items():
+            gauges.append(("source_latency_seconds", "Smoothed request latency per data source", entry["latency"], {"source": name}))
+            gauges.append(("source_success_ratio", "Smoothed share of usable results per data source", entry["success_rate"], {"source": name}))
+            gauges.append(("source_breaker_open", "1 while a source is skipped by its circuit breaker", int(entry["state"] == "open"), {"source": name}))
+        return gauges
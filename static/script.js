@@ -17,17 +17,43 @@ setInterval(() => {
         console.log(`New hour detected (${currentHour}:00). Refreshing History Table...`);
         lastTableRefreshHour = currentHour;
         fetchData(); // Trigger immediate fetch to sync new hourly data
+        if (chartView !== 'live') loadRangeChart(chartView); // Range views gain the hour that just closed
     }
 }, 1000);
 
+// Latest full state; stream deltas are applied on top of it
+let dashboardState = null;
+let dashboardVersion = null;
+
 async function fetchData() {
     try {
         const response = await fetch('/api/latest');
+        if (!response.ok) {
+            // 503 until the first analysis succeeds; the next poll tries again
+            console.warn('Data not available yet:', response.status);
+            return;
+        }
         const data = await response.json();
         console.log("Data fetched:", data.last_updated);
+        dashboardState = data;
+        renderData(data);
+    } catch (error) {
+        console.error('Error fetching data:', error);
+    }
+}
 
+function renderData(data) {
+    try {
         if (data.price) {
             document.getElementById('current-price').innerText = `$${data.price.toFixed(2)}`;
+            // Flag prices that came from a stand-in series (GLD) instead of GC=F
+            const source = data.price_source;
+            if (source && source.substitute) {
+                const sourceEl = document.createElement('span');
+                sourceEl.className = 'price-source';
+                sourceEl.innerText = `via ${source.symbol} ${source.interval}`;
+                document.getElementById('current-price').appendChild(sourceEl);
+            }
 
             // Handle raw prediction string or numbers
             const predEl = document.getElementById('prediction-price');
@@ -131,6 +157,14 @@ async function fetchData() {
                 }
             }
 
+            if (data.instruments) {
+                updateWatchlist(data.instruments);
+            }
+
+            if (data.forecast) {
+                updateForecast(data.forecast);
+            }
+
             // Update percentage
             if (data.pct_change !== undefined) {
                 const sign = data.pct_change >= 0 ? '+' : '';
@@ -146,7 +180,7 @@ async function fetchData() {
             updateChart(data);
         }
     } catch (error) {
-        console.error('Error fetching data:', error);
+        console.error('Error rendering data:', error);
     }
 }
 
@@ -474,6 +508,135 @@ function updateChart(data, currentPrice, currentPrediction) {
     updateHistoryTable(fullLabels, fullActuals, fullPredictions, data.price, data.prediction);
 }
 
+// Day/week/month views: stored history from /api/chart, downsampled on the server
+// to about one point per two pixels and drawn on their own canvas
+const rangeCanvas = document.getElementById('rangeChart');
+let rangeChart;
+let chartView = 'live';
+
+async function loadRangeChart(view) {
+    const points = Math.max(50, Math.round(rangeCanvas.parentElement.clientWidth / 2));
+    try {
+        // The browser revalidates with the ETag, so an unchanged range is a 304
+        const response = await fetch(`/api/chart?range=${view}&points=${points}`);
+        const series = await response.json();
+        if (view !== chartView) return;
+        renderRangeChart(series, view);
+    } catch (error) {
+        console.error('Error fetching chart range:', error);
+    }
+}
+
+function renderRangeChart(series, view) {
+    const labels = series.labels.map(ts => ts * 1000);
+    const unit = view === 'day' ? 'hour' : 'day';
+    if (rangeChart) {
+        rangeChart.data.labels = labels;
+        rangeChart.data.datasets[0].data = series.prices;
+        rangeChart.data.datasets[1].data = series.locked_prediction;
+        rangeChart.data.datasets[2].data = series.backtest_prediction;
+        rangeChart.options.scales.x.time.unit = unit;
+        rangeChart.update();
+        return;
+    }
+    rangeChart = new Chart(rangeCanvas.getContext('2d'), {
+        type: 'line',
+        data: {
+            labels: labels,
+            datasets: [
+                { label: 'Actual Price', data: series.prices, borderColor: '#FFD700', backgroundColor: 'rgba(255, 215, 0, 0.1)', borderWidth: 2, pointRadius: 0, fill: true, spanGaps: true },
+                { label: 'Locked Forecast', data: series.locked_prediction, borderColor: '#4dFF4d', backgroundColor: '#4dFF4d', borderWidth: 0, pointRadius: 2, showLine: false },
+                { label: 'Backtest Model', data: series.backtest_prediction, borderColor: '#00d2ff', borderDash: [5, 5], borderWidth: 1.5, pointRadius: 0, spanGaps: true }
+            ]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            animation: { duration: 0 },
+            interaction: { mode: 'index', intersect: false },
+            plugins: {
+                legend: { labels: { color: '#a1a1a1', font: { size: 12, weight: '600' } } },
+                datalabels: { display: false },
+                tooltip: {
+                    callbacks: {
+                        label: (context) => context.parsed.y === null ? null : `${context.dataset.label}: $${context.parsed.y.toFixed(2)}`
+                    }
+                }
+            },
+            scales: {
+                y: {
+                    grid: { color: 'rgba(255,255,255,0.05)' },
+                    ticks: { color: '#a1a1a1', callback: (value) => '$' + value }
+                },
+                x: {
+                    type: 'time',
+                    time: { unit: unit, displayFormats: { hour: 'h a', day: 'MMM d' } },
+                    grid: { display: false },
+                    ticks: { color: '#a1a1a1', maxRotation: 0, autoSkip: true, maxTicksLimit: 8 }
+                }
+            }
+        }
+    });
+}
+
+function setChartView(view) {
+    chartView = view;
+    document.querySelectorAll('#chart-views .chart-view').forEach(button => {
+        button.classList.toggle('active', button.dataset.view === view);
+    });
+    const live = view === 'live';
+    document.getElementById('priceChart').style.display = live ? '' : 'none';
+    rangeCanvas.style.display = live ? 'none' : '';
+    if (!live) loadRangeChart(view);
+}
+
+document.querySelectorAll('#chart-views .chart-view').forEach(button => {
+    button.addEventListener('click', () => setChartView(button.dataset.view));
+});
+
+function updateWatchlist(instruments) {
+    const tableBody = document.getElementById('watchlist-body');
+    if (!tableBody) return;
+
+    tableBody.innerHTML = '';
+    Object.entries(instruments).forEach(([symbol, inst]) => {
+        const isUp = inst.trend_signal === 'BULLISH';
+        const signalColor = isUp ? 'var(--green)' : 'var(--red)';
+        const sign = inst.pct_change >= 0 ? '+' : '';
+
+        const row = document.createElement('tr');
+        row.innerHTML = `
+            <td style="font-weight: 600;">${symbol}</td>
+            <td>${inst.price.toFixed(2)}</td>
+            <td style="color: ${signalColor}; font-weight: 700;">${isUp ? '▲' : '▼'} ${sign}${inst.pct_change.toFixed(2)}%</td>
+            <td>${inst.confidence}%</td>
+        `;
+        tableBody.appendChild(row);
+    });
+}
+
+function updateForecast(forecast) {
+    const tableBody = document.getElementById('forecast-body');
+    if (!tableBody) return;
+
+    document.getElementById('forecast-level').innerText = `${Math.round(forecast.level * 100)}% interval`;
+    tableBody.innerHTML = '';
+    forecast.horizons.forEach(h => {
+        const isUp = h.price >= forecast.base_price;
+        const range = h.lower !== null && h.upper !== null
+            ? `${h.lower.toFixed(2)} – ${h.upper.toFixed(2)}`
+            : '--';
+
+        const row = document.createElement('tr');
+        row.innerHTML = `
+            <td style="font-weight: 600;">${h.hours}h</td>
+            <td style="color: ${isUp ? 'var(--green)' : 'var(--red)'}; font-weight: 700;">$${h.price.toFixed(2)}</td>
+            <td style="color: #a1a1a1;">${range}</td>
+        `;
+        tableBody.appendChild(row);
+    });
+}
+
 function updateHistoryTable(labels, actuals, predictions, currentPrice, currentPrediction) {
     const tableBody = document.getElementById('history-body');
     if (!tableBody) return;
@@ -568,6 +731,57 @@ function updateHistoryTable(labels, actuals, predictions, currentPrice, currentP
     });
 }
 
-// Fetch immediately and then every 2.5 seconds for real-time movement
-fetchData();
-setInterval(fetchData, 2500);
+// Live updates: the server pushes the full state once, then only changed fields
+// whenever the scheduler publishes. Falls back to polling if streaming is unavailable.
+let pollTimer = null;
+
+function startPolling() {
+    if (pollTimer) return;
+    fetchData();
+    pollTimer = setInterval(fetchData, 10000); // Backend recomputes every 10 seconds
+}
+
+function startStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    const source = new EventSource('/api/stream');
+    let failures = 0;
+
+    source.addEventListener('snapshot', (event) => {
+        failures = 0;
+        dashboardState = JSON.parse(event.data);
+        dashboardVersion = Number(event.lastEventId);
+        console.log("Snapshot received:", dashboardState.last_updated);
+        renderData(dashboardState);
+    });
+
+    source.addEventListener('delta', (event) => {
+        failures = 0;
+        const delta = JSON.parse(event.data);
+        if (!dashboardState || delta.base !== dashboardVersion) {
+            // Missed an update; reconnecting makes the server resend the full state
+            source.close();
+            dashboardVersion = null;
+            setTimeout(startStream, 1000);
+            return;
+        }
+        Object.assign(dashboardState, delta.changed);
+        dashboardVersion = delta.version;
+        console.log("Delta received:", Object.keys(delta.changed));
+        renderData(dashboardState);
+    });
+
+    source.onerror = () => {
+        failures += 1;
+        // A refused stream (e.g. 503 when the server is at its stream limit) is not retried by the browser
+        if (source.readyState === EventSource.CLOSED || failures >= 3) {
+            console.warn('Stream unavailable, falling back to polling');
+            source.close();
+            startPolling();
+        }
+    };
+}
+
+startStream();
@@ -0,0 +1,361 @@
+"""Walk-forward parameter sweep of the institutional scoring over stored bars.
+
+Replays GoldAgent.institutional_grade_analysis on every bar of a stored
+series (see bar_store.py) for each parameter combination in a grid, and
+ranks the combinations by out-of-sample signal quality:
+
+    python sweep.py --grid ema_fast=5,9,12 --grid ema_slow=21,34 --grid signal_threshold=65,75
+    python sweep.py --checkpoint sweep.jsonl --output sweep.csv   # resumable
+
+Bars are placed in shared memory once; the worker processes read them in
+place. Every finished combination is appended to the checkpoint file, and a
+rerun with the same checkpoint skips combinations already evaluated on the
+same data.
+
+Historical headlines are not stored, so news counts as Neutral (it earns
+news_points and never triggers the hard stop).
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from multiprocessing import shared_memory
+import numpy as np
+
+from batch_analysis import ema_matrix, rolling_mean_matrix, rsi_matrix
+from regression import rolling_slopes
+
+
+# The values hardcoded in GoldAgent
+DEFAULT_PARAMS = {
+    "ema_fast": 9,
+    "ema_slow": 21,
+    "crossover_lookback": 3,
+    "rsi_window": 14,
+    "sma_fast": 5,
+    "sma_slow": 20,
+    "fit_window": 48,
+    "recent_count": 6,
+    "recent_weight": 3.0,
+    "trend_points": 50,
+    "rsi_points": 20,
+    "news_points": 15,
+    "dxy_points": 15,
+    "signal_threshold": 75,
+    "horizon": 1,
+}
+
+RANK_METRICS = ("signal_hit_rate", "worst_fold_hit_rate", "signal_return", "direction_accuracy", "regression_mae")
+
+
+def parse_grid(specs):
+    """Turns ["ema_fast=5,9", ...] into a list of full parameter dicts."""
+    axes = {}
+    for spec in specs or []:
+        name, _, values = spec.partition("=")
+        if name not in DEFAULT_PARAMS:
+            raise ValueError(f"Unknown parameter: {name}")
+        kind = type(DEFAULT_PARAMS[name])
+        axes[name] = [kind(v) for v in values.split(",") if v]
+    names = list(axes)
+    combos = []
+    for values in itertools.product(*(axes[n] for n in names)):
+        params = dict(DEFAULT_PARAMS, **dict(zip(names, values)))
+        if params["ema_fast"] >= params["ema_slow"] or params["sma_fast"] >= params["sma_slow"]:
+            continue
+        if params["fit_window"] - (params["sma_slow"] - 1) < 2:
+            continue
+        combos.append(params)
+    return combos
+
+
+# Worker side: bars live in shared memory, indicators are cached per process
+_shm = None
+_bars = None
+
+
+def _attach(name, shape):
+    global _shm, _bars
+    _shm = shared_memory.SharedMemory(name=name)
+    _bars = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+
+
+def _closes():
+    return _bars[0]
+
+
+@lru_cache(maxsize=32)
+def _ema(span):
+    return ema_matrix(_closes()[:, None], span)[:, 0]
+
+
+@lru_cache(maxsize=32)
+def _sma(window):
+    closes = _closes()
+    return rolling_mean_matrix(closes[:, None], window, np.array([len(closes)]))[:, 0]
+
+
+@lru_cache(maxsize=32)
+def _rsi(window):
+    closes = _closes()
+    return rsi_matrix(closes[:, None], np.array([len(closes)]), window)[:, 0]
+
+
+@lru_cache(maxsize=32)
+def _slopes(window, recent_count, recent_weight):
+    return rolling_slopes(_closes(), window, recent_count, recent_weight)
+
+
+def _lag(a, n, fill=np.nan):
+    """a shifted n bars later: out[t] = a[t-n]."""
+    if n == 0:
+        return a
+    out = np.empty_like(a)
+    out[:n] = fill
+    out[n:] = a[:-n]
+    return out
+
+
+def score_bars(p):
+    """Per-bar (bullish, confidence, predicted_price) for one parameter set.
+
+    Mirrors check_ema_crossover, check_rsi_alignment, the DXY rule and
+    predict_next_price evaluated as of every bar.
+    """
+    closes = _closes()
+    dxy_down = _bars[1]
+    with np.errstate(invalid="ignore"):
+        # EMA crossover: the most recent cross within the lookback decides, else the current side
+        d = _ema(p["ema_fast"]) - _ema(p["ema_slow"])
+        d_prev = _lag(d, 1)
+        up = (d > 0) & (d_prev <= 0)
+        down = (d < 0) & (d_prev >= 0)
+        bullish = d > 0
+        crossed = np.zeros(len(closes), dtype=bool)
+        for i in reversed(range(p["crossover_lookback"])):
+            up_i, down_i = _lag(up, i, False), _lag(down, i, False)
+            bullish = np.where(up_i, True, np.where(down_i, False, bullish))
+            crossed |= up_i | down_i
+        trend = np.where(crossed, p["trend_points"], 0)
+
+        # RSI moving with price over the last bars
+        rsi = _rsi(p["rsi_window"])
+        price_rising = closes > _lag(closes, 2)
+        rsi_rising = rsi > _lag(rsi, 3)
+        aligned = (bullish & price_rising & rsi_rising) | (~bullish & ~price_rising & ~rsi_rising)
+        rsi_pts = np.where(aligned, p["rsi_points"], 0)
+
+        # Gold and DXY are inversely correlated; no DXY bar yet means no points
+        have_dxy = ~np.isnan(dxy_down)
+        dxy_pts = np.where(have_dxy & (bullish == (dxy_down == 1.0)), p["dxy_points"], 0)
+
+        confidence = trend + rsi_pts + p["news_points"] + dxy_pts
+
+        # Weighted trend over the last fit_window bars, less the leading rows without a full slow SMA
+        slope = _slopes(p["fit_window"] - (p["sma_slow"] - 1), p["recent_count"], p["recent_weight"])
+        is_up = (slope > 0) & (_sma(p["sma_fast"]) > _sma(p["sma_slow"]))
+        predicted = closes + np.where(is_up, slope, np.where(slope < 0, -np.abs(slope), -1.0))
+    return bullish, confidence, predicted
+
+
+def evaluate(p, fold_bars):
+    """Walk-forward metrics for one parameter set over consecutive out-of-sample folds."""
+    closes = _closes()
+    bullish, confidence, predicted = score_bars(p)
+    h = p["horizon"]
+    start = max(p["fit_window"], p["ema_slow"], p["sma_slow"] + p["rsi_window"], p["crossover_lookback"] + 3)
+    end = len(closes) - h
+    if end - start < 2:
+        return None
+
+    t = np.arange(start, end)
+    future_ret = closes[t + h] / closes[t] - 1.0
+    side = np.where(bullish[t], 1.0, -1.0)
+    signal = confidence[t] >= p["signal_threshold"]
+    hit = (side * future_ret) > 0
+    next_move = np.sign(closes[t + 1] - closes[t])
+    pred_move = np.sign(predicted[t] - closes[t])
+    abs_err = np.abs(predicted[t] - closes[t + 1])
+
+    fold_hits = []
+    for lo in range(0, len(t), fold_bars):
+        mask = signal[lo:lo + fold_bars]
+        if mask.any():
+            fold_hits.append(float(hit[lo:lo + fold_bars][mask].mean() * 100))
+
+    n_signals = int(signal.sum())
+    return {
+        "bars": int(len(t)),
+        "folds": len(fold_hits),
+        "signals": n_signals,
+        "signal_hit_rate": float(np.mean(fold_hits)) if fold_hits else float("nan"),
+        "worst_fold_hit_rate": float(min(fold_hits)) if fold_hits else float("nan"),
+        "signal_return": float((side * future_ret)[signal].mean() * 100) if n_signals else float("nan"),
+        "direction_accuracy": float((next_move == pred_move).mean() * 100),
+        "regression_mae": float(abs_err.mean()),
+    }
+
+
+def evaluate_batch(params_list, fold_bars):
+    return [(p, evaluate(p, fold_bars)) for p in params_list]
+
+
+def load_bars(store_root, symbol, interval, dxy_symbol, days=None):
+    """Returns (timestamps ns, closes, dxy_down aligned to the bars) from a BarStore directory."""
+    from bar_store import BarStore
+    store = BarStore(store_root)
+    frame = store.read(symbol, interval)
+    if frame is None or frame.empty:
+        raise SystemExit(f"No stored bars for {symbol} {interval} in {store_root}")
+    frame = frame[frame["Close"].notna()]
+    if days:
+        frame = frame[frame.index >= frame.index[-1] - np.timedelta64(days, "D")]
+    index = frame.index.as_unit("ns").asi8
+    closes = frame["Close"].to_numpy(dtype=np.float64)
+
+    dxy_down = np.full(len(closes), np.nan)
+    dxy = store.read(dxy_symbol, interval) if dxy_symbol else None
+    if dxy is not None and len(dxy) > 1:
+        dxy = dxy[dxy["Close"].notna()]
+        dxy_index = dxy.index.as_unit("ns").asi8
+        dxy_close = dxy["Close"].to_numpy(dtype=np.float64)
+        # The last two DXY bars known at each gold bar, like get_dxy_trend
+        pos = np.searchsorted(dxy_index, index, side="right") - 1
+        ok = pos >= 1
+        dxy_down[ok] = (dxy_close[pos[ok]] < dxy_close[pos[ok] - 1]).astype(np.float64)
+    return index, closes, dxy_down
+
+
+def fingerprint(index, closes):
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(index.tobytes())
+    digest.update(closes.tobytes())
+    return digest.hexdigest()
+
+
+def result_key(params, data_id):
+    blob = json.dumps([params, data_id], sort_keys=True)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=10).hexdigest()
+
+
+def load_checkpoint(path):
+    done = {}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                    done[row["key"]] = row
+                except ValueError:
+                    # A line cut short by an interrupted run
+                    continue
+    return done
+
+
+def rank(rows, metric):
+    reverse = metric != "regression_mae"
+
+    def key(row):
+        value = (row["metrics"] or {}).get(metric)
+        if value is None or value != value:
+            return (1, 0.0)
+        return (0, -value if reverse else value)
+    return sorted(rows, key=key)
+
+
+def run_sweep(combos, bars, fold_bars=120, workers=None, checkpoint=None, data_id="", chunk=8):
+    """Evaluates every combination, reusing checkpointed results; returns rows of {params, metrics}."""
+    done = load_checkpoint(checkpoint)
+    rows = [done[k] for k in (result_key(p, data_id) for p in combos) if k in done]
+    todo = [p for p in combos if result_key(p, data_id) not in done]
+    if rows:
+        print(f"Resuming: {len(rows)} of {len(combos)} combinations already in {checkpoint}")
+    if not todo:
+        return rows
+
+    shm = shared_memory.SharedMemory(create=True, size=bars.nbytes)
+    try:
+        np.ndarray(bars.shape, dtype=np.float64, buffer=shm.buf)[:] = bars
+        batches = [todo[i:i + chunk] for i in range(0, len(todo), chunk)]
+        started = time.perf_counter()
+        out = open(checkpoint, "a") if checkpoint else None
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(shm.name, bars.shape)) as pool:
+                futures = [pool.submit(evaluate_batch, batch, fold_bars) for batch in batches]
+                for n, future in enumerate(as_completed(futures), 1):
+                    for params, metrics in future.result():
+                        row = {"key": result_key(params, data_id), "params": params, "metrics": metrics}
+                        rows.append(row)
+                        if out:
+                            out.write(json.dumps(row) + "\n")
+                    if out:
+                        out.flush()
+                    print(f"\r{n}/{len(batches)} batches, {time.perf_counter() - started:.1f}s", end="", file=sys.stderr)
+            print(file=sys.stderr)
+        finally:
+            if out:
+                out.close()
+    finally:
+        shm.close()
+        shm.unlink()
+    return rows
+
+
+def print_table(rows, metric, top):
+    varied = [k for k in DEFAULT_PARAMS if len({r["params"][k] for r in rows}) > 1] or ["ema_fast", "ema_slow"]
+    cols = ["signals", "signal_hit_rate", "worst_fold_hit_rate", "signal_return", "direction_accuracy", "regression_mae"]
+    print(f"Ranked by {metric}")
+    print("  ".join([f"{'#':>3}"] + [f"{k:>12.12}" for k in varied] + [f"{c:>12.12}" for c in cols]))
+    for i, row in enumerate(rows[:top], 1):
+        m = row["metrics"] or {}
+        cells = [f"{row['params'][k]:>12}" for k in varied]
+        cells += [f"{m.get(c, float('nan')):>12.4g}" for c in cols]
+        print("  ".join([f"{i:>3}"] + cells))
+
+
+def write_csv(rows, path):
+    fields = list(DEFAULT_PARAMS) + ["bars", "folds", "signals"] + list(RANK_METRICS)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict(row["params"], **(row["metrics"] or {})))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bar-store", default=os.getenv("BAR_STORE_DIR", "bar_store"))
+    parser.add_argument("--symbol", default="GC=F")
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--dxy", default="DX-Y.NYB", help="DXY symbol in the bar store ('' to ignore)")
+    parser.add_argument("--days", type=int, help="use only the last N days of bars")
+    parser.add_argument("--grid", action="append", help="name=v1,v2,... (repeatable); unlisted parameters keep their defaults")
+    parser.add_argument("--fold-bars", type=int, default=120, help="bars per walk-forward fold")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--checkpoint", help="JSONL file to append results to and resume from")
+    parser.add_argument("--rank-by", default="signal_hit_rate", choices=RANK_METRICS)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--output", help="write the full ranked table as CSV")
+    args = parser.parse_args()
+
+    combos = parse_grid(args.grid)
+    index, closes, dxy_down = load_bars(args.bar_store, args.symbol, args.interval, args.dxy, args.days)
+    bars = np.vstack([closes, dxy_down])
+    data_id = [args.symbol, args.interval, fingerprint(index, closes), args.fold_bars]
+    print(f"{len(combos)} combinations over {len(closes)} {args.interval} bars of {args.symbol}")
+
+    rows = rank(run_sweep(combos, bars, args.fold_bars, args.workers, args.checkpoint, data_id), args.rank_by)
+    print_table(rows, args.rank_by, args.top)
+    if args.output:
+        write_csv(rows, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+"""Points app's module-level stores at a scratch directory before any test imports app."""
+import os
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix="gold-agent-tests-")
+os.environ["GOLD_DB_PATH"] = os.path.join(_scratch, "gold_agent.db")
+os.environ["SHARED_STATE_DIR"] = os.path.join(_scratch, "shared_state")
+os.environ["BAR_STORE_DIR"] = os.path.join(_scratch, "bar_store")
+os.environ["PROFILE_DIR"] = os.path.join(_scratch, "profiles")
@@ -0,0 +1,52 @@
+"""Only the computing leader, or a process without leader election, runs a job for a cold-start request."""
+import threading
+
+import pytest
+
+import app
+from shared_state import SharedRegion
+
+
+@pytest.fixture
+def cold(monkeypatch, tmp_path):
+    """A process with no snapshot yet, whose tick() only records that it ran."""
+    ticks = []
+    monkeypatch.setattr(app, "tick", lambda: ticks.append(1))
+    monkeypatch.setattr(app, "current_snapshot", None)
+    monkeypatch.setattr(app, "shared_snapshot", SharedRegion(str(tmp_path / "snapshot.mmap")))
+    monkeypatch.setattr(app, "COLD_START_WAIT", 0.01)
+    return ticks
+
+
+def test_followers_never_compute(cold, monkeypatch):
+    monkeypatch.setattr(app, "role", "follower")
+    assert app.cold_start_snapshot() is None
+    assert cold == []
+
+
+@pytest.mark.parametrize("role", ["leader", None])
+def test_leader_or_no_election_computes(cold, monkeypatch, role):
+    monkeypatch.setattr(app, "role", role)
+    app.cold_start_snapshot()
+    assert cold == [1]
+
+
+def test_web_only_without_election_never_computes(cold, monkeypatch):
+    monkeypatch.setattr(app, "role", None)
+    monkeypatch.setattr(app, "WEB_ONLY", True)
+    assert app.cold_start_snapshot() is None
+    assert cold == []
+
+
+def test_role_is_follower_before_the_election_thread_runs(cold, monkeypatch):
+    monkeypatch.setattr(app, "role", None)
+    release = threading.Event()
+    monkeypatch.setattr(app, "run_background", release.wait)
+    thread = app.start_background()
+    try:
+        assert app.role == "follower"
+        assert app.cold_start_snapshot() is None
+        assert cold == []
+    finally:
+        release.set()
+        thread.join()
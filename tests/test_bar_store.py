@@ -0,0 +1,74 @@
+"""BarStore sessions follow the 18:00 New York open, and tick updates write into the in-memory window."""
+import numpy as np
+import pandas as pd
+
+from bar_store import BarStore
+from gold_agent import MIN_PRICE_ROWS
+
+
+def minute_bars(start, n):
+    index = pd.date_range(start, periods=n, freq="min", tz="America/New_York")
+    closes = 2000 + np.arange(n, dtype=float)
+    return pd.DataFrame({"Open": closes, "High": closes + 1, "Low": closes - 1, "Close": closes, "Volume": 0.0},
+                        index=index)
+
+
+class Fetcher:
+    """Serves a fixed frame like Ticker.history: the whole frame for a period, or the bars from `start`."""
+    def __init__(self, frame):
+        self.frame = frame
+
+    def __call__(self, symbol, period=None, start=None, interval=None):
+        if start is None:
+            return self.frame.copy()
+        return self.frame[self.frame.index >= pd.Timestamp(start)].copy()
+
+
+def test_session_spans_midnight(tmp_path):
+    # Eight hours from the 18:00 open; only 10 of them fall after midnight
+    bars = minute_bars("2026-10-13 18:00", 6 * 60 + 10)
+    store = BarStore(str(tmp_path), fetcher=Fetcher(bars))
+    history = store.history("GC=F", period="1d", interval="1m")
+    assert len(history) == len(bars) > MIN_PRICE_ROWS
+    assert history.index[0] == bars.index[0]
+
+
+def test_period_counts_sessions_not_days(tmp_path):
+    bars = minute_bars("2026-10-13 16:30", 4 * 60)
+    store = BarStore(str(tmp_path), fetcher=Fetcher(bars))
+    history = store.history("GC=F", period="1d", interval="1m")
+    # The bars up to the 17:00 close belong to the session before the one opened at 18:00
+    assert history.index[0] == pd.Timestamp("2026-10-13 18:00", tz="America/New_York")
+
+
+def test_forming_bar_is_revised_in_place(tmp_path):
+    bars = minute_bars("2026-10-13 18:00", 120)
+    fetcher = Fetcher(bars)
+    store = BarStore(str(tmp_path), fetcher=fetcher)
+    first = store.update("GC=F", "1d", "1m")
+
+    fetcher.frame = bars.copy()
+    fetcher.frame.iloc[-1, fetcher.frame.columns.get_loc("Close")] = 1.0
+    revised = store.update("GC=F", "1d", "1m")
+    assert revised is first
+    assert revised["Close"].iloc[-1] == 1.0
+
+    newer = minute_bars("2026-10-13 20:00", 2)
+    fetcher.frame = pd.concat([fetcher.frame, newer])
+    grown = store.update("GC=F", "1d", "1m")
+    assert len(grown) == 122
+    assert np.shares_memory(grown["Close"].to_numpy(), first["Close"].to_numpy())
+    np.testing.assert_array_equal(grown["Close"].to_numpy()[-3:], [1.0, *newer["Close"]])
+
+
+def test_window_keeps_the_newest_bars(tmp_path):
+    bars = minute_bars("2026-10-13 18:00", 50)
+    fetcher = Fetcher(bars.iloc[:5])
+    store = BarStore(str(tmp_path), max_bars=8, fetcher=fetcher)
+    store.update("GC=F", "1d", "1m")
+    for end in range(6, 51):
+        fetcher.frame = bars.iloc[:end]
+        frame = store.update("GC=F", "1d", "1m")
+        pd.testing.assert_frame_equal(frame, bars.iloc[max(end - 8, 0):end], check_freq=False, check_index_type=False)
+    # The file keeps every completed bar, not just the window
+    assert len(store.read("GC=F", "1m")) == 49
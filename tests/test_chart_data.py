@@ -0,0 +1,41 @@
+"""LTTB downsampling guarantees and chart range parsing."""
+import numpy as np
+import pytest
+
+from chart_data import MAX_POINTS, lttb, parse_range
+
+
+def series(n, seed=5):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=np.float64) * 3600, 2000 + np.cumsum(rng.normal(0, 4, n))
+
+
+@pytest.mark.parametrize("n,threshold", [(10, 3), (10, 9), (100, 7), (1000, 300), (2161, 2000), (5000, 299)])
+def test_keeps_endpoints_and_exact_point_count(n, threshold):
+    x, y = series(n)
+    picked = lttb(x, y, threshold)
+    assert len(picked) == threshold
+    assert picked[0] == 0 and picked[-1] == n - 1
+    assert (np.diff(picked) > 0).all()
+
+
+@pytest.mark.parametrize("threshold", [0, 2, 50, 51, 80])
+def test_short_series_and_tiny_thresholds_keep_every_point(threshold):
+    x, y = series(50)
+    np.testing.assert_array_equal(lttb(x, y, threshold), np.arange(50))
+
+
+def test_keeps_an_isolated_spike():
+    x, y = series(1000)
+    y[437] += 500
+    assert 437 in lttb(x, y, 50)
+
+
+def test_parse_range_clamps_points_and_rejects_bad_ranges():
+    assert parse_range({"range": "week"}, now=1_000_000) == (1_000_000 - 7 * 86400, 1_000_000, 300)
+    assert parse_range({"start": "10", "end": "20", "points": "99999"})[2] == MAX_POINTS
+    assert parse_range({"start": "10", "end": "20", "points": "1"})[2] == 3
+    for args in ({"start": "nan", "end": "20"}, {"start": "-inf", "end": "20"}, {"start": "20", "end": "10"},
+                 {"range": "year"}):
+        with pytest.raises(ValueError):
+            parse_range(args, now=1_000_000)
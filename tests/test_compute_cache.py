@@ -0,0 +1,140 @@
+"""Results cached on closed bars stay hits while the forming bar moves between ticks."""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_analysis import BatchAnalyzer
+from compute_cache import bars_key, closed_bars
+from gold_agent import GoldAgent, compute_cache
+
+
+def hourly_history(symbol, n=115, seed=3):
+    """n hourly bars whose last one opened half an hour ago and is still forming."""
+    rng = np.random.default_rng(seed)
+    closes = 2000 + np.cumsum(rng.normal(0, 4, n))
+    last = pd.Timestamp(time.time() - 1800, unit="s", tz="UTC").floor("min")
+    index = pd.date_range(end=last, periods=n, freq="h")
+    frame = pd.DataFrame({"Open": closes, "High": closes + 1, "Low": closes - 1, "Close": closes, "Volume": 0.0},
+                         index=index)
+    frame.attrs.update(symbol=symbol, interval="1h")
+    return frame
+
+
+class History:
+    """A data provider whose forming bar takes the next close on every call."""
+    def __init__(self, frame, closes):
+        self.frame = frame
+        self.closes = list(closes)
+
+    def history(self, symbol, period="1d", interval="1d"):
+        frame = self.frame.copy()
+        frame.attrs.update(self.frame.attrs)
+        frame.iloc[-1, frame.columns.get_loc("Close")] = self.closes.pop(0)
+        return frame
+
+
+def hits(kind):
+    return compute_cache.stats().get(kind, {}).get("hits", 0)
+
+
+def test_closed_bars_drops_only_a_forming_bar():
+    agent = GoldAgent(data_provider=object())
+    bars = agent.bars(hourly_history("TEST-CLOSED"))
+    assert len(closed_bars(bars)) == len(bars) - 1
+    assert len(closed_bars(bars, now=bars.timestamps[-1] / 1e9 + 3600)) == len(bars)
+
+
+def test_forming_close_does_not_change_the_key():
+    agent = GoldAgent(data_provider=object())
+    frame = hourly_history("TEST-KEY")
+    keys = set()
+    for close in (1990.0, 2010.0, 2005.5):
+        frame.iloc[-1, frame.columns.get_loc("Close")] = close
+        keys.add(bars_key(closed_bars(agent.bars(frame))))
+    assert len(keys) == 1
+
+
+def test_ticks_within_a_bar_are_hits():
+    frame = hourly_history("TEST-TICKS")
+    closes = (1990.0, 2010.0, 2005.5)
+    agent = GoldAgent(data_provider=History(frame, closes), ticker="TEST-TICKS")
+    before = hits("regression"), hits("ema_crossover"), hits("rsi_alignment")
+
+    prices = []
+    for close in closes:
+        prices.append(agent.predict_next_price()["price"])
+        data = agent.data.frame.copy()
+        data.attrs.update(agent.data.frame.attrs)
+        data.iloc[-1, data.columns.get_loc("Close")] = close
+        agent.check_ema_crossover(data)
+        agent.check_rsi_alignment(data, "UP")
+
+    after = hits("regression"), hits("ema_crossover"), hits("rsi_alignment")
+    assert [a - b for a, b in zip(after, before)] == [2, 2, 2]
+    # The live price is applied to the cached fit, so each tick still sees its own close
+    steps = [price - close for price, close in zip(prices, closes)]
+    assert steps == pytest.approx([steps[0]] * 3)
+
+
+class Watchlist:
+    """Bulk closes for BatchAnalyzer from the same frame the agent sees."""
+    def __init__(self, frame):
+        self.frame = frame
+
+    def bulk_history(self, symbols, period="5d", interval="1h"):
+        return {symbol: self.frame["Close"] for symbol in symbols}
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_batch_signals_match_the_agent_on_closed_bars(seed):
+    frame = hourly_history(f"TEST-BATCH-{seed}", seed=seed)
+    # A forming bar far enough off to flip the signals if it were counted
+    frame.iloc[-1, frame.columns.get_loc("Close")] += 60.0 if seed % 2 else -60.0
+    agent = GoldAgent(data_provider=object())
+    trend, trend_points = agent.check_ema_crossover(frame)
+    rsi_points = agent.check_rsi_alignment(frame, trend)
+
+    result = BatchAnalyzer(Watchlist(frame), instruments=[("GC=F", ["GC=F"], None)]).analyze()["GC=F"]
+    assert (result["trend_signal"], result["score_breakdown"]["trend"]) == (trend, trend_points)
+    assert result["score_breakdown"]["rsi"] == rsi_points
+
+
+class SlowWatchlist(Watchlist):
+    """Counts bulk downloads; blocks each one until `release` is set."""
+    def __init__(self, frame):
+        super().__init__(frame)
+        self.downloads = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def bulk_history(self, symbols, period="5d", interval="1h"):
+        self.downloads += 1
+        self.release.wait()
+        return super().bulk_history(symbols, period, interval)
+
+
+def test_watchlist_signals_follow_the_downloaded_bars_and_keep_the_last_result():
+    compute_cache.clear()
+    instruments = [("TEST-WATCH", ["TEST-WATCH"], None)]
+    data = SlowWatchlist(hourly_history("TEST-WATCH"))
+    agent = GoldAgent(data_provider=data)
+    first = agent.analyze_watchlist(instruments=instruments)
+    # Only the forming bar moves: the same closed bars are not analyzed again
+    data.frame.iloc[-1, data.frame.columns.get_loc("Close")] += 40.0
+    assert agent.analyze_watchlist(instruments=instruments) == first
+    assert hits("watchlist") == 1
+
+    # A revised closed bar is analyzed again even though no bar boundary passed
+    data.frame.iloc[-2, data.frame.columns.get_loc("Close")] += 40.0
+    revised = agent.analyze_watchlist(instruments=instruments)
+    assert revised["TEST-WATCH"]["price"] == first["TEST-WATCH"]["price"] + 40.0
+    assert hits("watchlist") == 1
+
+    # A download that misses the deadline leaves the last scores in place
+    data.release.clear()
+    assert agent.analyze_watchlist(instruments=instruments, deadline=0.05) == revised
+    assert data.downloads == 4
+    data.release.set()
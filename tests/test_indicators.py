@@ -0,0 +1,64 @@
+"""Parity of the streaming IndicatorEngine with the batch pandas indicators GoldAgent used to compute."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import IndicatorEngine
+
+# Hourly bars in the 5-day window the agent analyses
+WINDOW = 115
+
+
+def hourly_bars(n, seed=7):
+    rng = np.random.default_rng(seed)
+    closes = 2000 + np.cumsum(rng.normal(0, 4, n))
+    index = pd.date_range("2026-01-05", periods=n, freq="h", tz="UTC")
+    return pd.DataFrame({"Close": closes}, index=index)
+
+
+def batch_rsi(closes, window=14):
+    delta = closes.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+    return 100 - 100 / (1 + gain / loss)
+
+
+def assert_matches_batch(state, window):
+    closes = window["Close"]
+    for period in (9, 21):
+        expected = closes.ewm(span=period, adjust=False).mean().to_numpy()
+        actual = [state.ema(period, back) for back in range(8)]
+        np.testing.assert_allclose(actual, expected[::-1][:8], rtol=1e-10, atol=0)
+    np.testing.assert_allclose([state.rsi(back) for back in range(8)], batch_rsi(closes).to_numpy()[::-1][:8], rtol=1e-10)
+    for w in (5, 20):
+        assert state.sma(w) == pytest.approx(closes.iloc[-w:].mean(), rel=1e-12)
+
+
+def test_sliding_window_matches_ewm_over_the_window():
+    bars = hourly_bars(WINDOW + 400)
+    engine = IndicatorEngine()
+    for end in range(WINDOW, len(bars) + 1):
+        window = bars.iloc[end - WINDOW:end]
+        assert_matches_batch(engine.sync(window), window)
+
+
+def test_revised_last_bar_matches_batch():
+    bars = hourly_bars(WINDOW + 50)
+    engine = IndicatorEngine()
+    engine.sync(bars.iloc[:WINDOW])
+    for end in range(WINDOW + 1, len(bars) + 1):
+        window = bars.iloc[end - WINDOW:end].copy()
+        # A forming bar is seen a few times with different closes before it completes
+        for move in (-3.0, 1.5, 0.0):
+            forming = window.copy()
+            forming.iloc[-1, 0] += move
+            assert_matches_batch(engine.sync(forming), forming)
+
+
+def test_window_reaching_further_back_rebuilds():
+    bars = hourly_bars(WINDOW * 3)
+    engine = IndicatorEngine(seed_history=WINDOW)
+    engine.sync(bars.iloc[WINDOW:2 * WINDOW])
+    # A longer window starts before any bar the engine remembers
+    window = bars.iloc[:2 * WINDOW]
+    assert_matches_batch(engine.sync(window), window)
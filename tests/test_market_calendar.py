@@ -0,0 +1,63 @@
+"""MarketCalendar hours of GC=F around the Friday close, the daily break, Sunday reopen and holidays."""
+import datetime
+
+import pytest
+
+from market_calendar import NEW_YORK, MarketCalendar, parse_holidays
+
+
+def ny(text):
+    return datetime.datetime.fromisoformat(text).replace(tzinfo=NEW_YORK).timestamp()
+
+
+# Week of Monday 2026-10-12; Thursday 2026-11-26 is Thanksgiving
+calendar = MarketCalendar(holidays=parse_holidays("2026-11-26, 2026-12-25"))
+
+
+@pytest.mark.parametrize("when,is_open", [
+    ("2026-10-16T16:59:59", True),
+    ("2026-10-16T17:00", False),
+    ("2026-10-16T18:30", False),
+    ("2026-10-17T12:00", False),
+    ("2026-10-18T17:59:59", False),
+    ("2026-10-18T18:00", True),
+    ("2026-10-19T00:30", True),
+    ("2026-10-20T16:59", True),
+    ("2026-10-20T17:30", False),
+    ("2026-10-20T18:00", True),
+])
+def test_weekly_hours_and_daily_break(when, is_open):
+    assert calendar.is_open(ny(when)) is is_open
+
+
+@pytest.mark.parametrize("when,is_open", [
+    ("2026-11-25T23:00", True),
+    ("2026-11-26T00:00", False),
+    ("2026-11-26T12:00", False),
+    ("2026-11-26T18:00", True),
+    ("2026-12-25T09:00", False),
+])
+def test_holiday_closes_until_its_evening_open(when, is_open):
+    assert calendar.is_open(ny(when)) is is_open
+
+
+@pytest.mark.parametrize("when,reopens", [
+    ("2026-10-16T17:00", "2026-10-18T18:00"),
+    ("2026-10-17T03:00", "2026-10-18T18:00"),
+    ("2026-10-20T17:15", "2026-10-20T18:00"),
+    ("2026-11-26T08:00", "2026-11-26T18:00"),
+    # Christmas falls on a Friday: no session until Sunday evening
+    ("2026-12-25T09:00", "2026-12-27T18:00"),
+])
+def test_next_open(when, reopens):
+    assert calendar.next_open(ny(when)) == ny(reopens)
+
+
+def test_next_open_is_now_while_open():
+    ts = ny("2026-10-14T10:00")
+    assert calendar.next_open(ts) == ts
+
+
+def test_parse_holidays_skips_blanks():
+    assert parse_holidays(" 2026-01-01,, 2026-07-03 ") == {datetime.date(2026, 1, 1), datetime.date(2026, 7, 3)}
+    assert parse_holidays("") == frozenset()
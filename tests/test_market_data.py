@@ -0,0 +1,49 @@
+"""MarketDataProvider downloads each series at most once per tick, however long the tick runs."""
+import time
+
+import pandas as pd
+import pytest
+
+from gold_agent import MarketDataProvider
+
+
+class Source:
+    def __init__(self):
+        self.calls = []
+
+    def history(self, symbol, **kwargs):
+        self.calls.append((symbol, kwargs["period"], kwargs["interval"]))
+        return pd.DataFrame({"Close": [2000.0]}, index=pd.DatetimeIndex(["2026-10-12 09:00"], tz="UTC"))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_calls_more_than_a_ttl_apart_in_one_tick_share_a_download(clock):
+    source = Source()
+    provider = MarketDataProvider(source=source)
+    provider.begin_tick()
+    first = provider.history("GC=F", period="5d", interval="1h")
+    clock[0] += provider.ttls["1h"] + 3
+    assert provider.history("GC=F", period="5d", interval="1h") is first
+    assert source.calls == [("GC=F", "5d", "1h")]
+
+    provider.begin_tick()
+    provider.history("GC=F", period="5d", interval="1h")
+    assert len(source.calls) == 2
+
+
+def test_without_ticks_entries_expire_after_their_ttl(clock):
+    source = Source()
+    provider = MarketDataProvider(source=source)
+    provider.history("GC=F", period="5d", interval="1h")
+    clock[0] += provider.ttls["1h"] - 1
+    provider.history("GC=F", period="5d", interval="1h")
+    assert len(source.calls) == 1
+    clock[0] += 2
+    provider.history("GC=F", period="5d", interval="1h")
+    assert len(source.calls) == 2
@@ -0,0 +1,199 @@
+"""Outbox delivery through SmtpMailer against a local SMTP stand-in (no network, no TLS)."""
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from outbox import Outbox
+from providers import SmtpMailer
+
+
+class SmtpStandIn(socketserver.ThreadingTCPServer):
+    """Just enough SMTP for smtplib: records every connection, DATA attempt and accepted message.
+
+    The first `reject_data` DATA commands are answered with a temporary
+    451 error, as a busy server would.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, reject_data=0):
+        super().__init__(("127.0.0.1", 0), SmtpSession)
+        self.reject_data = reject_data
+        self.connections = 0
+        self.data_attempts = []
+        self.messages = []
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class SmtpSession(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-stand-in")
+                self.reply("250 8BITMIME")
+            elif verb in ("HELO", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "RSET":
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "MAIL":
+                sender, recipients = command.split(":", 1)[1].strip().strip("<>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip().strip("<>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                with server.lock:
+                    server.data_attempts.append(time.monotonic())
+                    reject = server.reject_data > 0
+                    server.reject_data -= reject
+                if reject:
+                    self.reply("451 try again later")
+                    continue
+                self.reply("354 end with <CRLF>.<CRLF>")
+                body = []
+                while True:
+                    data = self.rfile.readline()
+                    if data in (b".\r\n", b""):
+                        break
+                    body.append(data)
+                with server.lock:
+                    server.messages.append((sender, recipients, b"".join(body).decode("utf-8")))
+                self.reply("250 queued")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+def wait_until(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spooled(spool_dir):
+    return sorted(n for n in os.listdir(spool_dir) if n.endswith(".json"))
+
+
+@pytest.fixture
+def smtp():
+    servers = []
+
+    def start(**kwargs):
+        server = SmtpStandIn(**kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def make_outbox(port, spool_dir, **kwargs):
+    mailer = SmtpMailer("127.0.0.1", port, secure=False, timeout=5)
+    return Outbox(mailer, spool_dir=str(spool_dir), password_for=lambda sender: "secret", **kwargs)
+
+
+def test_messages_share_one_connection(smtp, tmp_path):
+    server = smtp()
+    outbox = make_outbox(server.port, tmp_path)
+    try:
+        for n in range(3):
+            outbox.send("agent@example.com", "secret", "a@example.com, b@example.com", f"Subject: {n}\r\n\r\nbody {n}")
+        assert wait_until(lambda: len(server.messages) == 3)
+        assert outbox.flush(5)
+    finally:
+        outbox.stop(5)
+    assert server.connections == 1
+    assert [m[1] for m in server.messages] == [["a@example.com", "b@example.com"]] * 3
+    assert [m[2].splitlines()[-1] for m in server.messages] == ["body 0", "body 1", "body 2"]
+    assert spooled(tmp_path) == []
+
+
+def test_temporary_failures_are_retried_with_backoff(smtp, tmp_path):
+    server = smtp(reject_data=2)
+    outbox = make_outbox(server.port, tmp_path, base_delay=0.2)
+    try:
+        outbox.send("agent@example.com", "secret", "a@example.com", "Subject: retry\r\n\r\nbody")
+        assert wait_until(lambda: len(server.messages) == 1)
+        assert wait_until(lambda: outbox.pending() == 0)
+    finally:
+        outbox.stop(5)
+    first, second, third = server.data_attempts
+    # base_delay, then twice that
+    assert second - first >= 0.2
+    assert third - second >= 0.4
+    assert spooled(tmp_path) == []
+
+
+def test_undeliverable_message_moves_to_failed(smtp, tmp_path):
+    server = smtp(reject_data=10)
+    outbox = make_outbox(server.port, tmp_path, base_delay=0.01, max_attempts=3)
+    try:
+        message_id = outbox.send("agent@example.com", "secret", "a@example.com", "Subject: lost\r\n\r\nbody")
+        assert wait_until(lambda: outbox.pending() == 0)
+    finally:
+        outbox.stop(5)
+    assert len(server.data_attempts) == 3
+    assert server.messages == []
+    assert spooled(tmp_path) == []
+    assert os.listdir(tmp_path / "failed") == [f"{message_id}.json"]
+
+
+def test_spooled_message_is_delivered_after_restart(smtp, tmp_path):
+    # The first run cannot reach its server and stops with the message still queued
+    down = make_outbox(closed_port(), tmp_path, base_delay=0.05)
+    message_id = down.send("agent@example.com", "secret", "a@example.com", "Subject: later\r\n\r\nbody")
+    assert wait_until(lambda: json.loads((tmp_path / f"{message_id}.json").read_text())["attempts"] >= 1)
+    down.stop(5)
+    entry = json.loads((tmp_path / f"{message_id}.json").read_text())
+    assert "secret" not in json.dumps(entry)
+
+    server = smtp()
+    restarted = make_outbox(server.port, tmp_path, base_delay=0.05)
+    try:
+        restarted.start()
+        assert wait_until(lambda: len(server.messages) == 1)
+        assert wait_until(lambda: restarted.pending() == 0)
+    finally:
+        restarted.stop(5)
+    assert server.messages[0][:2] == ("agent@example.com", ["a@example.com"])
+    assert spooled(tmp_path) == []
@@ -0,0 +1,107 @@
+"""Closed-form regressions against least squares solved directly with numpy.linalg.lstsq."""
+import numpy as np
+import pytest
+
+from regression import ols_fit, rolling_forecasts, rolling_slopes, trend_forecasts, walk_forward_predictions
+
+
+def closes(n, seed=11):
+    rng = np.random.default_rng(seed)
+    return 2000 + np.cumsum(rng.normal(0, 4, n))
+
+
+def lstsq_fit(y, weights=None):
+    """(slope, intercept) of the weighted fit of y on x = 0..n-1, solved by lstsq."""
+    x = np.arange(len(y), dtype=np.float64)
+    w = np.ones(len(y)) if weights is None else weights
+    root = np.sqrt(w)
+    (intercept, slope), *_ = np.linalg.lstsq(np.column_stack([np.ones_like(x), x]) * root[:, None], y * root, rcond=None)
+    return slope, intercept
+
+
+def lstsq_walk_forward(y, weights=None, recent_weight=1.0, recent_count=0):
+    preds = np.full(len(y), np.nan)
+    for t in range(1, len(y)):
+        w = np.ones(t) if weights is None else weights[:t].copy()
+        if recent_count:
+            w[-recent_count:] *= recent_weight
+        slope, intercept = lstsq_fit(y[:t], w) if t > 1 else (0.0, float(y[0]))
+        preds[t] = intercept + slope * t
+    return preds
+
+
+def test_ols_fit_matches_lstsq():
+    y = closes(48)
+    weights = np.ones(48)
+    weights[-6:] = 3.0
+    for w in (None, weights):
+        assert ols_fit(y, w) == pytest.approx(lstsq_fit(y, w), rel=1e-12, abs=1e-9)
+
+
+def test_single_sample_is_a_flat_fit():
+    assert ols_fit([2000.0]) == (0.0, 2000.0)
+
+
+@pytest.mark.parametrize("n", [2, 3, 25, 96, 400])
+def test_walk_forward_matches_lstsq(n):
+    y = closes(n)
+    expected = lstsq_walk_forward(y)
+    actual = walk_forward_predictions(y)
+    assert np.isnan(actual[0])
+    np.testing.assert_allclose(actual[1:], expected[1:], rtol=1e-11)
+
+
+def test_weighted_walk_forward_matches_lstsq():
+    y = closes(120, seed=4)
+    weights = np.random.default_rng(4).uniform(0.5, 2.0, 120)
+    expected = lstsq_walk_forward(y, weights, recent_weight=3.0, recent_count=6)
+    actual = walk_forward_predictions(y, weights, recent_weight=3.0, recent_count=6)
+    np.testing.assert_allclose(actual[1:], expected[1:], rtol=1e-11)
+
+
+def recent_weights(window, recent_count=6, recent_weight=3.0):
+    w = np.ones(window)
+    w[-recent_count:] = recent_weight
+    return w
+
+
+def test_rolling_slopes_and_forecasts_match_lstsq():
+    y, window = closes(200), 29
+    slopes = rolling_slopes(y, window, recent_count=6, recent_weight=3.0)
+    forecasts = rolling_forecasts(y, window)
+    assert np.isnan(slopes[:window - 1]).all() and np.isnan(forecasts[:window]).all()
+    for t in (window - 1, 100, 199):
+        slope, _ = lstsq_fit(y[t - window + 1:t + 1], recent_weights(window))
+        assert slopes[t] == pytest.approx(slope, rel=1e-9)
+    for t in (window, 100, 199):
+        slope, intercept = lstsq_fit(y[t - window:t])
+        assert forecasts[t] == pytest.approx(intercept + slope * window, rel=1e-12)
+
+
+def test_trend_forecasts_extrapolate_the_weighted_fit():
+    y, window, horizons = closes(115), 29, (1, 2, 4, 8, 12, 24)
+    points, lower, upper = trend_forecasts(y, window, horizons, recent_count=6, recent_weight=3.0)
+    slope, intercept = lstsq_fit(y[-window:], recent_weights(window))
+    np.testing.assert_allclose(points, intercept + slope * (window - 1 + np.array(horizons)), rtol=1e-12)
+    assert (lower <= points).all() and (points <= upper).all()
+    # Errors grow with the horizon on a random walk
+    assert upper[-1] - lower[-1] > upper[0] - lower[0]
+
+
+def test_trend_forecast_intervals_use_past_errors():
+    y, window, level = closes(300, seed=8), 29, 0.8
+    points, lower, upper = trend_forecasts(y, window, (1,), level=level)
+    # The same fit one step ahead at every earlier window, solved directly
+    errors = []
+    for s in range(len(y) - window):
+        slope, intercept = lstsq_fit(y[s:s + window])
+        errors.append(y[s + window] - (intercept + slope * window))
+    lo, hi = np.quantile(errors, [0.1, 0.9])
+    assert lower[0] == pytest.approx(points[0] + lo, rel=1e-9)
+    assert upper[0] == pytest.approx(points[0] + hi, rel=1e-9)
+
+
+def test_trend_forecasts_without_history_have_no_interval():
+    points, lower, upper = trend_forecasts(closes(35), 29, (1, 24))
+    assert np.isfinite(points).all()
+    assert np.isnan(lower).all() and np.isnan(upper).all()
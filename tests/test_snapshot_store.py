@@ -0,0 +1,114 @@
+"""SnapshotStore storage and retention: hourly queries, legacy import, daily/weekly rollups and eviction."""
+import datetime
+import json
+
+import pytest
+
+from snapshot_store import DAY, HIT_TOLERANCE, SnapshotStore, bucket_start
+
+
+def utc(text):
+    return datetime.datetime.fromisoformat(text).replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "gold.db"), legacy_snapshots=None, legacy_forecast=None)
+
+
+def test_weeks_start_on_monday_midnight_utc():
+    sunday_night, monday = utc("2026-10-11T23:00"), utc("2026-10-12T00:00")
+    assert bucket_start("weekly", sunday_night) == utc("2026-10-05T00:00")
+    assert bucket_start("weekly", monday) == monday
+    assert bucket_start("weekly", utc("2026-10-18T23:00")) == monday
+    assert bucket_start("daily", utc("2026-10-12T13:00")) == monday
+
+
+def test_rollups_aggregate_each_bucket(store):
+    # Sunday evening and Monday morning: one weekly bucket each, one daily bucket each
+    hours = [("2026-10-11T22:00", 2000.0, 2004.0), ("2026-10-11T23:00", 2010.0, 1990.0),
+             ("2026-10-12T00:00", 2020.0, 2020.5), ("2026-10-12T01:00", 2030.0, 2060.0)]
+    for when, actual, predicted in hours:
+        assert store.add(utc(when), actual, predicted)
+
+    weekly = store.rollups("weekly")
+    assert [w["start"] for w in weekly] == [utc("2026-10-05T00:00"), utc("2026-10-12T00:00")]
+    assert [w["count"] for w in weekly] == [2, 2]
+    sunday, monday = weekly
+    assert sunday["actual"] == pytest.approx(2005.0)
+    assert sunday["mae"] == pytest.approx(12.0)
+    assert sunday["rmse"] == pytest.approx(((16 + 400) / 2) ** 0.5)
+    assert sunday["max_error"] == pytest.approx(20.0)
+    # 4 is within 0.5% of 2000, 20 is not within 0.5% of 2010
+    assert sunday["hit_rate"] == pytest.approx(50.0)
+    assert monday["hit_rate"] == pytest.approx(50.0)
+    assert [d["start"] for d in store.rollups("daily")] == [utc("2026-10-11T00:00"), utc("2026-10-12T00:00")]
+
+
+def test_a_locked_hour_is_rolled_up_once(store):
+    ts = utc("2026-10-12T09:00")
+    assert store.add(ts, 2000.0, 2001.0)
+    assert not store.add(ts, 2100.0, 2101.0)
+    assert store.get(ts) == {"actual": 2000.0, "predicted": 2001.0}
+    assert store.rollups("daily")[0]["count"] == 1
+
+
+def test_eviction_keeps_the_rollups(tmp_path):
+    store = SnapshotStore(str(tmp_path / "gold.db"), legacy_snapshots=None, legacy_forecast=None,
+                          raw_days=7, daily_days=30)
+    now = utc("2026-10-14T12:00")
+    for days_ago in (60, 20, 2):
+        store.add(now - days_ago * DAY, 2000.0, 2000.0 * (1 + HIT_TOLERANCE / 2))
+    weekly_before = store.rollups("weekly")
+
+    assert store.evict(now=now) == (2, 1)
+    assert store.count() == 1
+    assert [d["start"] for d in store.rollups("daily")] == [bucket_start("daily", now - 20 * DAY),
+                                                           bucket_start("daily", now - 2 * DAY)]
+    assert store.rollups("weekly") == weekly_before
+    assert store.evict(now=now) == (0, 0)
+
+
+def test_rollups_are_built_for_snapshots_stored_before_them(tmp_path):
+    path = str(tmp_path / "gold.db")
+    store = SnapshotStore(path, legacy_snapshots=None, legacy_forecast=None)
+    store.add(utc("2026-10-12T09:00"), 2000.0, 2002.0)
+    store.add(utc("2026-10-13T09:00"), 2010.0, 1990.0)
+    # As a database written before rollups existed
+    with store._conn:
+        store._conn.execute("DELETE FROM rollups")
+        store._conn.execute("DELETE FROM state WHERE key = 'rollups_built'")
+
+    reopened = SnapshotStore(path, legacy_snapshots=None, legacy_forecast=None)
+    assert [d["count"] for d in reopened.rollups("daily")] == [1, 1]
+    week, = reopened.rollups("weekly")
+    assert (week["count"], week["mae"], week["hit_rate"]) == (2, pytest.approx(11.0), pytest.approx(50.0))
+
+
+def test_range_and_recent_query_by_hour(store):
+    hours = [utc(f"2026-10-12T{h:02d}:00") for h in range(6)]
+    for i, ts in enumerate(hours):
+        store.add(ts, 2000.0 + i, 2001.0 + i)
+    assert list(store.range(hours[1], hours[3])) == hours[1:4]
+    assert [ts for ts, _ in store.recent(2)] == [hours[5], hours[4]]
+    assert store.recent(1)[0][1] == {"actual": 2005.0, "predicted": 2006.0}
+    assert store.get(hours[0] + 1800) is None
+
+
+def test_legacy_json_files_are_imported_once(tmp_path):
+    snapshots, forecast = tmp_path / "snapshots.json", tmp_path / "locked_forecast.json"
+    ts = utc("2026-10-12T09:00")
+    snapshots.write_text(json.dumps({str(ts): {"actual": 2000.0, "predicted": 2003.0}}))
+    forecast.write_text(json.dumps({"price": 2010.0, "target_hour": ts, "raw_trend": "UP", "confidence": 80}))
+
+    store = SnapshotStore(str(tmp_path / "gold.db"), legacy_snapshots=str(snapshots), legacy_forecast=str(forecast))
+    assert store.get(ts) == {"actual": 2000.0, "predicted": 2003.0}
+    assert store.load_forecast()["price"] == 2010.0
+    assert store.rollups("daily")[0]["count"] == 1
+
+    # Later edits to the old files are not imported again
+    snapshots.write_text(json.dumps({str(ts + 3600): {"actual": 1.0, "predicted": 1.0}}))
+    store.save_forecast({"price": 2020.0, "target_hour": ts + 3600, "raw_trend": "DOWN", "confidence": 60})
+    reopened = SnapshotStore(str(tmp_path / "gold.db"), legacy_snapshots=str(snapshots), legacy_forecast=str(forecast))
+    assert reopened.count() == 1
+    assert reopened.load_forecast()["price"] == 2020.0